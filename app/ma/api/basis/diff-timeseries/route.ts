@@ -2,6 +2,9 @@ import { NextResponse } from "next/server"
 import { spawn } from "child_process"
 import fs from "fs"
 import path from "path"
+import { runPooled } from "@/lib/server/python-pool"
+import { serveBasisRange } from "@/lib/server/basis-engine"
+import { readColumnarPayload } from "@/lib/server/columnar-cache"
 
 export const runtime = "nodejs"
 export const dynamic = "force-dynamic"
@@ -32,6 +35,8 @@ function expectedTradeDate(): string {
 }
 
 async function runPython(args: string[], env: NodeJS.ProcessEnv): Promise<any> {
+  const pooled = await runPooled(args, env)
+  if (pooled) return pooled
   return new Promise((resolve) => {
     try {
       const proc = spawn(args[0], args.slice(1), { env })
@@ -92,6 +97,20 @@ export async function GET(req: Request) {
     return [exe as string, script, ...(arg1 ? [arg1] : []), ...(arg2 ? [arg2] : [])]
   }
 
+  // Date-range requests are sliced from the columnar copy instead of parsing the whole cache
+  let rangeStart: string | null = null
+  let rangeEnd: string | null = null
+  try {
+    const url = new URL(req.url)
+    rangeStart = url.searchParams.get("start")
+    rangeEnd = url.searchParams.get("end")
+  } catch {}
+  if (rangeStart || rangeEnd) {
+    const sliced = await readColumnarPayload("basis_diff_timeseries_cache", rangeStart, rangeEnd)
+    const slicedEnd: string | undefined = sliced?.end_date
+    if (sliced?.data && (preferCache || (!forceRecompute && slicedEnd && slicedEnd >= expectedYmd))) return json(sliced, 200)
+  }
+
   // Cache-first: if preferCache, return any cache; otherwise require freshness
   try {
     await fs.promises.mkdir(cacheDir, { recursive: true })
@@ -115,6 +134,13 @@ export async function GET(req: Request) {
   const startIso = ymdToIso(startYmd)
   const endIso = ymdToIso(endYmd)
 
+  // Engine, then the one-process fetch (lib/server/basis-engine.ts); the
+  // two-script fetch below only runs when neither can start, or for ?debug=1
+  if (!debugFlag) {
+    const served = await serveBasisRange({ kind: "diff-timeseries", cachePath, env, startYmd, endYmd })
+    if (served) return json(served.payload, served.status)
+  }
+
   const futRes = await runPython(runArgs(futScript, startYmd, endYmd), { ...env, TUSHARE_TOKEN: process.env.TUSHARE_TOKEN || "" })
   if (futRes?.error) {
     try {
@@ -2,6 +2,8 @@ import { NextResponse } from "next/server"
 import { spawn } from "child_process"
 import fs from "fs"
 import path from "path"
+import { runPooled } from "@/lib/server/python-pool"
+import { basisEngineEnabled, refreshBasisCaches } from "@/lib/server/basis-engine"
 import { promisify } from "util"
 
 const readFile = promisify(fs.readFile)
@@ -76,6 +78,8 @@ function daysBetween(aIso: string, bDate: Date): number {
 }
 
 async function runPython(scriptPath: string, args: string[], env: NodeJS.ProcessEnv): Promise<any> {
+  const pooled = await runPooled(args, env)
+  if (pooled) return pooled
   return new Promise((resolve) => {
     try {
       const proc = spawn(args[0], args.slice(1), { env })
@@ -194,6 +198,15 @@ export async function GET(req: Request) {
     }
   }
 
+  // One engine run rebuilds every basis cache; the per-route fetch below is the fallback
+  if (!debugFlag && basisEngineEnabled()) {
+    const engineRes = await refreshBasisCaches(env)
+    if (engineRes?.error) console.warn("[basis-near] engine failed:", engineRes.error)
+    const rebuilt = await readBasisCache(cachePath)
+    const rebuiltKey = latestDateKey(rebuilt.entries)
+    if (rebuiltKey && hasCompleteData(rebuilt.entries[rebuiltKey])) return json(rebuilt.entries[rebuiltKey], 200)
+  }
+
   // Futures latest (for near-month settle)
   const futRes = await runPython(futScript, runPyArgs(futScript), { ...env, TUSHARE_TOKEN: process.env.TUSHARE_TOKEN })
   if (futRes?.error) {
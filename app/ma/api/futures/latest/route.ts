@@ -2,6 +2,7 @@ import { NextResponse } from "next/server"
 import { spawn } from "child_process"
 import fs from "fs/promises"
 import path from "path"
+import { runPooled } from "@/lib/server/python-pool"
 
 export const runtime = "nodejs"
 export const dynamic = "force-dynamic"
@@ -87,8 +88,9 @@ export async function GET(req: Request) {
     }
   } catch {}
 
-  // Otherwise, call Python script once and upsert results to DB
-  const result: any = await new Promise((resolve) => {
+  // Otherwise, call Python script once (warm pool when available) and upsert results to DB
+  const pooled = await runPooled([pythonExe as string, ...args], env)
+  const result: any = pooled ?? await new Promise((resolve) => {
     try {
       const proc = spawn(pythonExe as string, args, { env })
       let stdout = ""
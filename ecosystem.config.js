@@ -27,6 +27,41 @@ module.exports = {
 
         // Ensure client uses same-origin Nginx alias for MOM report in production
         NEXT_PUBLIC_MOM_REPORT_URL: process.env.NEXT_PUBLIC_MOM_REPORT_URL || "/mom_report/report.html",
+
+        // Local EmQuant session broker (scripts fall back to direct login if it is down)
+        EMQ_BROKER_PORT: process.env.EMQ_BROKER_PORT || "9731",
+
+        // Warm Tushare worker pool; routes spawn python directly if it is down
+        TUSHARE_POOL_PORT: process.env.TUSHARE_POOL_PORT || "9732",
+      },
+    },
+    {
+      // Holds one logged-in EmQuant session and queues css/csd calls from all scripts
+      name: "emq_broker",
+      cwd: ".",
+      script: "scripts/ma/emq_broker.py",
+      interpreter: process.env.PYTHON_EXE || "/root/new_market_project/.venv/bin/python3",
+      autorestart: true,
+      env: {
+        EMQ_USERNAME: process.env.EMQ_USERNAME || "",
+        EMQ_PASSWORD: process.env.EMQ_PASSWORD || "",
+        EMQ_OPTIONS_EXTRA: process.env.EMQ_OPTIONS_EXTRA || "LoginType=2",
+        EMQ_BROKER_PORT: process.env.EMQ_BROKER_PORT || "9731",
+        LD_LIBRARY_PATH:
+          process.env.LD_LIBRARY_PATH || "/root/new_market_project/EMQuantAPI_Python/EMQuantAPI_Python/python3/libs/linux/x64",
+      },
+    },
+    {
+      // Pre-forked Python workers with pandas/tushare imported and one pro_api client each
+      name: "tushare_pool",
+      cwd: ".",
+      script: "scripts/ma/tushare_worker_pool.py",
+      interpreter: process.env.PYTHON_EXE || "/root/new_market_project/.venv/bin/python3",
+      autorestart: true,
+      env: {
+        TUSHARE_TOKEN: process.env.TUSHARE_TOKEN || "",
+        TUSHARE_POOL_PORT: process.env.TUSHARE_POOL_PORT || "9732",
+        TUSHARE_POOL_WORKERS: process.env.TUSHARE_POOL_WORKERS || "4",
       },
     },
   ],
@@ -0,0 +1,147 @@
+import { spawn } from "child_process"
+import fs from "fs"
+import path from "path"
+import { parseScriptOutput } from "@/lib/server/python-pool"
+
+// scripts/ma/build_basis_caches.py rebuilds all seven data/basis_*cache.json files
+// from one set of upstream calls. Routes that find their cache stale share the
+// in-flight run instead of each fetching futures and spot data on their own.
+let inflight: Promise<any> | null = null
+
+// marketdata.runtime.EXIT_IMPORT_FAILED: pandas/numpy/tushare missing
+const IMPORT_FAILED_EXIT = 5
+
+export function basisEngineEnabled(): boolean {
+  return process.env.BASIS_ENGINE !== "0"
+}
+
+function runScript(name: string, args: string[], env: NodeJS.ProcessEnv): Promise<any> {
+  const script = path.join(process.cwd(), "scripts/ma", name)
+  const pythonExe = process.env.PYTHON_EXE
+  const argv = process.platform === "win32" && !pythonExe ? ["py", "-3", script, ...args] : [pythonExe || "python", script, ...args]
+  return new Promise((resolve) => {
+    try {
+      const proc = spawn(argv[0], argv.slice(1), { env })
+      let stdout = ""
+      let stderr = ""
+      proc.stdout.on("data", (d) => (stdout += d.toString()))
+      proc.stderr.on("data", (d) => (stderr += d.toString()))
+      proc.on("error", (err) => resolve({ error: `spawn failed: ${err.message}`, unavailable: true }))
+      proc.on("close", (code) => {
+        // Only the scripts' import-failure exit means the engine cannot run
+        // here; any other failure (tracebacks included) happened upstream of it
+        if (code !== 0) return resolve({ error: `python exited ${code}`, stderr, stdout, unavailable: code === IMPORT_FAILED_EXIT })
+        try {
+          resolve(parseScriptOutput((stdout || "").trim()))
+        } catch (e: any) {
+          resolve({ error: `json parse failed: ${e?.message}`, stdout, stderr })
+        }
+      })
+    } catch (e: any) {
+      resolve({ error: e?.message || "unknown", unavailable: true })
+    }
+  })
+}
+
+// True when a run never got as far as asking upstream (spawn failed, python
+// or its imports missing). Only then is another fetch path worth trying; an
+// upstream error would just be hit again.
+export function engineUnavailable(res: any): boolean {
+  return !!res?.unavailable
+}
+
+// The upstream failure a run reported, or null: a script error, or the
+// futures/spot side of build_basis_caches.py's errors
+export function upstreamError(res: any): any {
+  if (!res || res.unavailable) return null
+  if (res.error) return res.error
+  const errors = res.errors || {}
+  return errors.fut || errors.spot ? errors : null
+}
+
+export function refreshBasisCaches(env: NodeJS.ProcessEnv): Promise<any> {
+  if (!inflight) {
+    inflight = runScript("build_basis_caches.py", [], env).finally(() => {
+      inflight = null
+    })
+  }
+  return inflight
+}
+
+// One route's series from scripts/ma/get_basis_timeseries.py: futures and spot
+// are fetched concurrently in one process. The payload has the cache file's
+// shape plus partial/errors/timings_ms.
+export function fetchBasisTimeseries(env: NodeJS.ProcessEnv, kind: string, startYmd: string, endYmd: string): Promise<any> {
+  return runScript("get_basis_timeseries.py", [startYmd, endYmd, "--kind", kind], env)
+}
+
+async function readCache(cachePath: string): Promise<any | null> {
+  try {
+    const obj = JSON.parse(await fs.promises.readFile(cachePath, "utf-8"))
+    return obj?.data ? obj : null
+  } catch {
+    return null
+  }
+}
+
+export type BasisRangeOptions = {
+  kind: string // get_basis_timeseries.py --kind, also the route name
+  cachePath: string
+  env: NodeJS.ProcessEnv
+  startYmd: string
+  endYmd: string
+  // Extra condition for a cache to count as fresh (e.g. calc === "settle")
+  fresh?: (obj: any) => boolean
+  // Applied to every payload served (e.g. a single-code filter)
+  view?: (obj: any) => any
+}
+
+// Refresh ladder of the basis time-series routes once their cache is stale:
+// the engine (every cache in one run), else this route's series from
+// get_basis_timeseries.py. The first path that reaches upstream decides the
+// answer: its payload, or on an upstream error the last cache (a 500 when
+// there is none). Resolves to null only when neither path could start, so
+// the route falls back to its two-script fetch.
+export async function serveBasisRange(opts: BasisRangeOptions): Promise<{ payload: any; status: number } | null> {
+  const { kind, cachePath, env, startYmd, endYmd } = opts
+  const tag = `[basis-${kind}]`
+  const fresh = opts.fresh || (() => true)
+  const view = opts.view || ((obj: any) => obj)
+  const stale = async (error: any) => {
+    const obj = await readCache(cachePath)
+    return obj ? { payload: view(obj), status: 200 } : { payload: error, status: 500 }
+  }
+
+  if (basisEngineEnabled()) {
+    const engineRes = await refreshBasisCaches(env)
+    const engineFailed = upstreamError(engineRes)
+    if (engineFailed) console.warn(`${tag} engine failed:`, engineFailed)
+    if (!engineUnavailable(engineRes)) {
+      const obj = await readCache(cachePath)
+      const end: string | undefined = obj?.end_date || obj?.end
+      if (obj && end && end >= endYmd && fresh(obj)) return { payload: view(obj), status: 200 }
+      // Upstream already answered this run; serve what it left, stale or not
+      return stale({ error: "basis engine failed", errors: engineFailed })
+    }
+  }
+
+  const res = await fetchBasisTimeseries(env, kind, startYmd, endYmd)
+  if (res?.data) {
+    const { partial, errors, timings_ms, ...payload } = res
+    if (!partial) {
+      try {
+        await fs.promises.writeFile(cachePath, JSON.stringify(payload, null, 2), "utf-8")
+      } catch (e) {
+        console.warn(`${tag} failed to write cache:`, (e as any)?.message)
+      }
+      return { payload: view(payload), status: 200 }
+    }
+    console.warn(`${tag} partial fetch:`, errors)
+    // One side failed: a stale cache beats a half-empty series
+    const obj = await readCache(cachePath)
+    return { payload: view(obj || { ...payload, partial, errors }), status: 200 }
+  }
+  if (res?.error) console.warn(`${tag} orchestrator failed:`, res.error)
+  if (!engineUnavailable(res)) return stale(res)
+  return null
+}
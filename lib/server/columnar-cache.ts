@@ -0,0 +1,113 @@
+import fs from "fs"
+import path from "path"
+
+// Reader for data/columnar/<name>/ written by scripts/ma/marketdata/columnar.py:
+// meta.json, dates.i4 (sorted int32 YYYYMMDD) and one little-endian column per
+// (series, field). Only the byte ranges of the requested dates are read. Files
+// of generation `gen` > 0 carry a ".<gen>" suffix.
+type Field = { name: string; dtype: string; missing?: "null" | "omit"; int?: boolean }
+type Meta = { version: number; gen?: number; rows: number; series: string[]; fields: Field[]; nested?: boolean; head?: Record<string, any> }
+
+const DTYPE_SIZE: Record<string, number> = { "<f8": 8, "<i4": 4, u1: 1 }
+
+function columnarDir(name: string) {
+  const base = process.env.MA_DATA_DIR || path.join(process.cwd(), "data")
+  return path.join(base, "columnar", name)
+}
+
+function genFile(dir: string, name: string, meta: Meta) {
+  return path.join(dir, meta.gen ? `${name}.${meta.gen}` : name)
+}
+
+function lowerBound(dates: Int32Array, v: number): number {
+  let lo = 0
+  let hi = dates.length
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1
+    if (dates[mid] < v) lo = mid + 1
+    else hi = mid
+  }
+  return lo
+}
+
+async function readColumn(file: string, dtype: string, i0: number, i1: number): Promise<number[]> {
+  const size = DTYPE_SIZE[dtype]
+  const buf = Buffer.alloc((i1 - i0) * size)
+  const fh = await fs.promises.open(file, "r")
+  try {
+    await fh.read(buf, 0, buf.length, i0 * size)
+  } finally {
+    await fh.close()
+  }
+  const out: number[] = new Array(i1 - i0)
+  for (let i = 0; i < out.length; i++) {
+    out[i] = dtype === "<f8" ? buf.readDoubleLE(i * 8) : dtype === "<i4" ? buf.readInt32LE(i * 4) : buf.readUInt8(i)
+  }
+  return out
+}
+
+function toYmdNumber(v?: string | null): number | null {
+  const s = (v || "").replace(/-/g, "")
+  return /^\d{8}$/.test(s) ? Number(s) : null
+}
+
+// Payload in the same shape as the JSON cache, limited to start..end (YYYYMMDD or
+// YYYY-MM-DD, both optional). Resolves to null when there is no columnar copy.
+export async function readColumnarPayload(name: string, start?: string | null, end?: string | null): Promise<any | null> {
+  const dir = columnarDir(name)
+  let meta: Meta
+  let dates: Int32Array
+  try {
+    meta = JSON.parse(await fs.promises.readFile(path.join(dir, "meta.json"), "utf-8"))
+    if (!meta || meta.version !== 1) return null
+    const raw = await fs.promises.readFile(genFile(dir, "dates.i4", meta))
+    const n = Math.min(meta.rows || 0, Math.floor(raw.length / 4))
+    dates = new Int32Array(n)
+    for (let i = 0; i < n; i++) dates[i] = raw.readInt32LE(i * 4)
+  } catch {
+    return null
+  }
+  const s = toYmdNumber(start)
+  const e = toYmdNumber(end)
+  const i0 = s === null ? 0 : lowerBound(dates, s)
+  const i1 = e === null ? dates.length : lowerBound(dates, e + 1)
+  const isos: string[] = []
+  for (let i = i0; i < i1; i++) {
+    const d = String(dates[i])
+    isos.push(`${d.slice(0, 4)}-${d.slice(4, 6)}-${d.slice(6, 8)}`)
+  }
+
+  const data: any = {}
+  const valueFields = meta.fields.slice(1)
+  try {
+    for (const series of meta.series) {
+      const flags = await readColumn(genFile(dir, `${series}._row`, meta), "u1", i0, i1)
+      const cols = await Promise.all(valueFields.map((f) => readColumn(genFile(dir, `${series}.${f.name}`, meta), f.dtype, i0, i1)))
+      const rows: any[] = []
+      for (let i = 0; i < isos.length; i++) {
+        if (!flags[i]) continue
+        const row: any = { date: isos[i] }
+        valueFields.forEach((f, j) => {
+          const v = cols[j][i]
+          if (!Number.isFinite(v)) {
+            if (f.missing === "null") row[f.name] = null
+            return
+          }
+          row[f.name] = f.int ? Math.round(v) : v
+        })
+        rows.push(row)
+      }
+      if (meta.nested) {
+        const [code, leg] = series.split(".")
+        data[code] = data[code] || {}
+        data[code][leg] = rows
+      } else {
+        data[series] = rows
+      }
+    }
+  } catch {
+    return null
+  }
+  const { calc, ...head } = meta.head || {}
+  return calc === undefined ? { ...head, data } : { ...head, data, calc }
+}
@@ -0,0 +1,79 @@
+import net from "net"
+import path from "path"
+
+// Scripts served by scripts/ma/tushare_worker_pool.py (warm interpreters, shared pro_api)
+const POOLED_SCRIPTS = new Set([
+  "get_cffex_index_futures_range.py",
+  "get_cffex_index_futures_near_range.py",
+  "get_cffex_index_futures_continuous_range.py",
+  "get_cffex_index_futures_latest.py",
+  "get_spot_indices_close_tushare.py",
+])
+
+export function parseScriptOutput(text: string): any {
+  try {
+    return JSON.parse(text)
+  } catch (_e) {
+    const first = text.indexOf("{")
+    const last = text.lastIndexOf("}")
+    if (first !== -1 && last !== -1 && last > first) return JSON.parse(text.substring(first, last + 1))
+    throw _e
+  }
+}
+
+// Run a script through the worker pool when TUSHARE_POOL_PORT is set.
+// `argv` is the same array handed to spawn(). Resolves to null when the script
+// is not pooled or the pool is unreachable, so callers fall back to spawn. A
+// job the pool accepted but did not finish in time resolves to an error with
+// `timeout: true` instead: the job may still be running, and spawning a second
+// copy would only double the upstream load.
+export async function runPooled(argv: string[], env: NodeJS.ProcessEnv): Promise<any | null> {
+  const port = Number(process.env.TUSHARE_POOL_PORT || "")
+  if (!port) return null
+  const idx = argv.findIndex((a) => a.endsWith(".py"))
+  if (idx === -1) return null
+  const script = path.basename(argv[idx])
+  if (!POOLED_SCRIPTS.has(script)) return null
+  const overrides: Record<string, string> = {}
+  for (const [k, v] of Object.entries(env)) {
+    if (typeof v === "string" && process.env[k] !== v) overrides[k] = v
+  }
+  const host = process.env.TUSHARE_POOL_HOST || "127.0.0.1"
+  const payload = JSON.stringify({ script, args: argv.slice(idx + 1), env: overrides }) + "\n"
+  // The pool answers with its own timeout error first (TUSHARE_POOL_JOB_TIMEOUT, default 110 s)
+  const jobTimeout = Number(process.env.TUSHARE_POOL_JOB_TIMEOUT || "") || 110
+
+  const reply: any = await new Promise((resolve) => {
+    let buf = ""
+    let sent = false
+    const sock = net.createConnection({ host, port }, () => {
+      sent = true
+      sock.write(payload)
+    })
+    sock.setTimeout((jobTimeout + 10) * 1000)
+    sock.on("data", (d) => (buf += d.toString()))
+    sock.on("end", () => {
+      try {
+        resolve(JSON.parse(buf))
+      } catch {
+        resolve(null)
+      }
+    })
+    sock.on("timeout", () => {
+      sock.destroy()
+      resolve(sent ? { code: 124, timeout: true, stdout: "", stderr: "" } : null)
+    })
+    sock.on("error", () => resolve(null))
+  })
+  if (!reply) return null
+
+  const stdout: string = reply.stdout || ""
+  const stderr: string = reply.stderr || ""
+  if (reply.timeout) return { error: `pool job timed out after ${jobTimeout}s`, timeout: true, stderr, stdout }
+  if (reply.code !== 0) return { error: `python exited ${reply.code}`, stderr, stdout }
+  try {
+    return parseScriptOutput(stdout.trim())
+  } catch (e: any) {
+    return { error: `json parse failed: ${e?.message}`, stdout, stderr }
+  }
+}
@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from marketdata.board_history import CFFEX_INCEPTION, BoardHistory
+from marketdata.futures_store import max_workers
+from marketdata.runtime import load_env
+from marketdata.scheduler import PRIORITY_BACKFILL
+from marketdata.trade_calendar import get_calendar
+from marketdata.tushare_client import get_pro
+
+# Backfills the daily CFFEX board (every IH/IF/IC/IM contract plus T/TF/TS/
+# TL and the continuous codes) into data/cffex_history/, one fut_daily call
+# per trading day and a month per chunk. Months already checkpointed are
+# skipped, so an interrupted run picks up where it stopped. Calls run at
+# backfill priority: dashboard fetches sharing the Tushare quota go first.
+#   python scripts/ma/backfill_cffex_history.py [--start 20100416] [--end YYYYMMDD] [--workers 4]
+# Progress goes to stderr; the summary (rows, rows/s, errors) to stdout.
+
+
+def main():
+    load_env()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", default=CFFEX_INCEPTION)
+    ap.add_argument("--end", default=datetime.today().strftime("%Y%m%d"))
+    ap.add_argument("--workers", type=int, default=None, help="months fetched in parallel (default TUSHARE_MAX_WORKERS or 4)")
+    ap.add_argument("--status", action="store_true", help="only report checkpointed and pending months")
+    args = ap.parse_args()
+
+    history = BoardHistory()
+    if args.status:
+        done = history.completed()
+        pending = history.pending(args.start, args.end)
+        print(json.dumps({
+            "completed": len(done),
+            "rows": sum(v.get("rows", 0) for v in done.values()),
+            "pending": [p[0][:6] for p in pending],
+        }, ensure_ascii=False))
+        return
+
+    token = os.environ.get("TUSHARE_TOKEN")
+    if not token:
+        print(json.dumps({"error": "Missing TUSHARE_TOKEN in environment"}))
+        sys.exit(2)
+    try:
+        pro = get_pro(token, priority=PRIORITY_BACKFILL)
+    except Exception as e:
+        print(json.dumps({"error": f"Tushare import/init failed: {e}"}))
+        sys.exit(1)
+
+    # Trading days from the SSE calendar; weekdays if it cannot be loaded
+    open_days = None
+    cal = get_calendar(pro, years_back=datetime.today().year - int(args.start[:4]))
+    if cal is not None:
+        open_days = cal.open_days_between
+
+    def progress(msg):
+        sys.stderr.write(msg + "\n")
+        sys.stderr.flush()
+
+    try:
+        summary = history.backfill(pro, args.start, args.end, open_days, args.workers or max_workers(), progress)
+    except KeyboardInterrupt:
+        print(json.dumps({"ok": False, "error": "interrupted; rerun to resume", "completed": len(history.completed())}))
+        sys.exit(130)
+    print(json.dumps(dict(summary, ok=not summary["errors"], start_date=args.start, end_date=args.end), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
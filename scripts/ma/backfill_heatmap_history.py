@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+from marketdata.choice_amount import fetch_amounts, heatmap_codes, normalize_items
+from marketdata.clients import emquant_client
+from marketdata.contract_registry import categorize
+from marketdata.emq import connect_broker
+from marketdata.heatmap_history import HeatmapHistory, weekdays
+from marketdata.runtime import load_env
+
+# Fills data/heatmap_history/ with one css per historical TradeDate for the
+# heatmap codes. Days already sealed in the store are skipped, so reruns
+# only ask for what is missing. Trading days come from the SSE calendar when
+# TUSHARE_TOKEN is set, weekdays otherwise (holidays are then stored empty).
+#   python scripts/ma/backfill_heatmap_history.py [--start YYYYMMDD] [--end YYYYMMDD] [--workers 2]
+# Progress goes to stderr; the summary to stdout.
+
+
+def trading_days(start: str, end: str):
+    token = os.environ.get("TUSHARE_TOKEN")
+    if token:
+        try:
+            from marketdata.trade_calendar import get_calendar
+            from marketdata.tushare_client import get_pro
+
+            pro = get_pro(token)
+            cal = get_calendar(pro, years_back=datetime.today().year - int(start[:4]))
+            if cal is not None and cal.covers(start, end):
+                return cal.open_days_between(start, end)
+        except Exception:
+            pass
+    return weekdays(start, end)
+
+
+def main():
+    load_env()
+    today = datetime.today()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", default=(today - timedelta(days=90)).strftime("%Y%m%d"))
+    ap.add_argument("--end", default=today.strftime("%Y%m%d"))
+    ap.add_argument("--workers", type=int, default=int(os.environ.get("HEATMAP_BACKFILL_WORKERS", "2")), help="css requests in flight (default 2)")
+    ap.add_argument("--status", action="store_true", help="only report stored and missing days")
+    args = ap.parse_args()
+
+    history = HeatmapHistory()
+    days = trading_days(args.start, args.end)
+    if args.status:
+        stored = set(history.dates(args.start, args.end))
+        print(json.dumps({
+            "stored": len(stored),
+            "missing": [d for d in days if not history.is_sealed(d)],
+        }, ensure_ascii=False))
+        return
+
+    # Prefer the long-lived session broker; log in directly only without one
+    c = connect_broker()
+    if c is None:
+        try:
+            c = emquant_client()
+        except Exception as e:
+            print(json.dumps({"error": f"EmQuantAPI import failed: {e}"}))
+            sys.exit(1)
+
+        username = os.environ.get("EMQ_USERNAME")
+        password = os.environ.get("EMQ_PASSWORD")
+        if not username or not password:
+            print(json.dumps({"error": "Missing EMQ_USERNAME/EMQ_PASSWORD"}))
+            sys.exit(2)
+
+        options = f"UserName={username},PassWord={password},TestLatency=1,ForceLogin=1"
+        login = c.start(options, None, None)
+        if login.ErrorCode != 0:
+            print(json.dumps({"error": f"login failed: {getattr(login,'ErrorMsg','unknown')}"}))
+            sys.exit(3)
+
+    codes = heatmap_codes()
+
+    def fetch_day(trade_date):
+        data, items = fetch_amounts(c, codes, f"TradeDate={trade_date}", normalize_items)
+        if items is None:
+            raise RuntimeError(f"css error: {getattr(data, 'ErrorCode', 'unknown')}")
+        return [dict(it, sector=categorize(it['code'])) for it in items]
+
+    def progress(msg):
+        sys.stderr.write(msg + "\n")
+        sys.stderr.flush()
+
+    try:
+        summary = history.backfill(fetch_day, days, args.workers, progress)
+    except KeyboardInterrupt:
+        print(json.dumps({"ok": False, "error": "interrupted; rerun to resume"}))
+        sys.exit(130)
+    finally:
+        try:
+            c.stop()
+        except Exception:
+            pass
+    print(json.dumps(dict(summary, ok=not summary["errors"], start_date=args.start, end_date=args.end), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import json
+import sys
+
+from marketdata.basis_cache import BASIS_CACHES, load_payload, store_payload
+from marketdata.paths import data_dir
+
+# Columnar basis caches (data/columnar/<name>/) next to the JSON ones.
+#   python scripts/ma/basis_cache_tool.py convert [name ...]      JSON -> columnar
+#   python scripts/ma/basis_cache_tool.py to-json name [out.json]  columnar -> JSON
+#   python scripts/ma/basis_cache_tool.py slice name start end     one date range as JSON
+
+
+def _name(arg: str) -> str:
+    name = arg[:-5] if arg.endswith(".json") else arg
+    if name not in BASIS_CACHES:
+        print(json.dumps({"error": f"unknown cache: {arg}", "known": sorted(BASIS_CACHES)}))
+        sys.exit(2)
+    return name
+
+
+def convert(names):
+    done = {}
+    for name in names or sorted(BASIS_CACHES):
+        name = _name(name)
+        src = data_dir() / f"{name}.json"
+        try:
+            payload = json.loads(src.read_text(encoding="utf-8"))
+        except Exception as e:
+            done[name] = f"skipped: {e}"
+            continue
+        done[name] = store_payload(name, payload)
+    print(json.dumps({"ok": True, "converted": done}, ensure_ascii=False))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(json.dumps({"error": "usage: basis_cache_tool.py convert|to-json|slice ..."}))
+        sys.exit(2)
+    cmd, args = sys.argv[1], sys.argv[2:]
+    if cmd == "convert":
+        convert(args)
+        return
+    if cmd == "to-json" and args:
+        payload = load_payload(_name(args[0]))
+        text = json.dumps(payload, ensure_ascii=False, indent=2)
+        if len(args) > 1:
+            with open(args[1], "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            print(text)
+        return
+    if cmd == "slice" and len(args) == 3:
+        payload = load_payload(_name(args[0]), args[1].replace("-", ""), args[2].replace("-", ""))
+        print(json.dumps(payload, ensure_ascii=False))
+        return
+    print(json.dumps({"error": f"bad command: {' '.join(sys.argv[1:])}"}))
+    sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+# Startup cost per entry point, from `python -X importtime` (cumulative
+# import of the script module, and whether pandas/numpy/tushare came with
+# it) and from wall time of the credential-error path. The latest-futures
+# script is also timed on a result-cache hit. `--ref <git rev>` measures the
+# same entry points at another revision for comparison.
+#   python scripts/ma/bench/bench_startup.py [--repeats 5] [--ref HEAD~1]
+
+ENTRY_POINTS = [
+    "build_basis_caches",
+    "build_choice_amount_heatmap",
+    "get_cffex_index_futures_continuous_range",
+    "get_cffex_index_futures_latest",
+    "get_cffex_index_futures_near_range",
+    "get_cffex_index_futures_range",
+    "get_choice_all_futures_latest",
+    "get_nanhua_index",
+    "get_spot_indices_close",
+    "get_spot_indices_close_tushare",
+    "get_spot_indices_timeseries",
+]
+HEAVY = ("pandas", "numpy", "tushare")
+
+
+def _env(data_dir, **extra):
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("TUSHARE_", "EMQ_"))}
+    env.update({"MA_DOTENV": "0", "MA_DATA_DIR": str(data_dir), "EMQ_BROKER_DISABLE": "1", "RESULT_CACHE_DISABLE": "0"})
+    env.update(extra)
+    return env
+
+
+def import_profile(scripts_dir: Path, module: str, env):
+    # (cumulative import ms of the module, heavy packages it pulled in)
+    code = f"import sys; sys.path.insert(0, {str(scripts_dir)!r}); import {module}"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env)
+    total = None
+    heavy = set()
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[0].startswith("import time:"):
+            continue
+        name = parts[2].strip()
+        if name.split(".")[0] in HEAVY:
+            heavy.add(name.split(".")[0])
+        if name == module:
+            total = int(parts[1]) / 1000.0
+    return total, sorted(heavy)
+
+
+def wall_ms(cmd, env, repeats: int, cwd):
+    times = []
+    code = None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        proc = subprocess.run(cmd, capture_output=True, env=env, cwd=cwd)
+        times.append((time.perf_counter() - t0) * 1000)
+        code = proc.returncode
+    return round(statistics.median(times), 1), code
+
+
+def seed_latest_cache(data_dir: Path):
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    os.environ["MA_DATA_DIR"] = str(data_dir)
+    from marketdata.result_cache import _root, _write, cache_key
+
+    today = time.strftime("%Y%m%d")
+    _root().mkdir(parents=True, exist_ok=True)
+    _write(_root() / f"{cache_key('cffex_index_futures_latest', [], today)}.json", today, {"exchange": "CFFEX", "trade_date": today, "data": {}})
+
+
+def checkout(rev: str, dest: Path) -> Path:
+    blob = subprocess.run(["git", "archive", rev, "scripts/ma"], capture_output=True, cwd=SCRIPTS_DIR.parent.parent, check=True).stdout
+    with tarfile.open(fileobj=BytesIO(blob)) as tar:
+        tar.extractall(dest)
+    return dest / "scripts" / "ma"
+
+
+def profile(scripts_dir: Path, repeats: int, data_dir: Path):
+    env = _env(data_dir)
+    rows = {}
+    for module in ENTRY_POINTS:
+        if not (scripts_dir / f"{module}.py").exists():
+            continue
+        imp, heavy = import_profile(scripts_dir, module, env)
+        err, code = wall_ms([sys.executable, str(scripts_dir / f"{module}.py")], env, repeats, data_dir)
+        rows[module] = {"import_ms": imp, "heavy_imports": heavy, "error_path_ms": err, "exit_code": code}
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeats", type=int, default=5)
+    ap.add_argument("--ref", help="also profile scripts/ma at this git revision")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        env = _env(tmp)
+        floor, _ = wall_ms([sys.executable, "-c", "import pandas"], env, args.repeats, tmp)
+        bare, _ = wall_ms([sys.executable, "-c", "pass"], env, args.repeats, tmp)
+        out = {"python_ms": bare, "pandas_import_floor_ms": floor, "current": profile(SCRIPTS_DIR, args.repeats, tmp)}
+
+        seed_latest_cache(tmp)
+        hit_env = _env(tmp, TUSHARE_TOKEN="bench")
+        out["latest_cache_hit_ms"], _ = wall_ms(
+            [sys.executable, str(SCRIPTS_DIR / "get_cffex_index_futures_latest.py")], hit_env, args.repeats, tmp
+        )
+        if args.ref:
+            out["ref"] = args.ref
+            out["at_ref"] = profile(checkout(args.ref, tmp / "ref"), args.repeats, tmp)
+    print(json.dumps(out, indent=1))
+
+
+if __name__ == "__main__":
+    main()
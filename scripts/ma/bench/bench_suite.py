@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from marketdata.fakes import latest_weekday  # noqa: E402
+
+# Offline benchmark suite. Every entry point's main() runs in a subprocess
+# against the fake clients in marketdata.fakes (or recorded fixtures), and a
+# few hot helpers are timed in-process. Reported per case: wall time,
+# upstream calls by api and peak memory (max RSS for scripts, tracemalloc
+# peak for helpers).
+#   python scripts/ma/bench/bench_suite.py [--latency 0.05] [--error-rate 0.1]
+#       [--fixtures dir] [--save baseline.json] [--compare baseline.json]
+# --compare exits 1 when a case makes more upstream calls than the baseline,
+# or is slower / uses more memory beyond --tolerance.
+
+# The fakes' data ends on the latest weekday, so the latest-day scripts take
+# their normal path; range windows keep a fixed length relative to it
+LAST = latest_weekday(date.today())
+LAST_DATE = LAST.strftime("%Y%m%d")
+LAST_ISO = LAST.isoformat()
+START_DATE = (LAST - timedelta(days=226)).strftime("%Y%m%d")
+SCRIPTS = {
+    "build_basis_caches": [START_DATE, LAST_DATE],
+    "build_choice_amount_heatmap": [LAST_ISO],
+    "get_cffex_index_futures_continuous_range": [START_DATE, LAST_DATE],
+    "get_cffex_index_futures_latest": [],
+    "get_cffex_index_futures_near_range": [START_DATE, LAST_DATE],
+    "get_cffex_index_futures_range": [START_DATE, LAST_DATE],
+    "get_choice_all_futures_latest": [LAST_ISO],
+    "get_nanhua_index": [],
+    "get_spot_indices_close": [LAST_ISO],
+    "get_spot_indices_close_tushare": [LAST_ISO],
+    "get_spot_indices_timeseries": [(LAST - timedelta(days=226)).isoformat(), LAST_ISO],
+}
+
+
+def fake_env(tmp: Path, args, call_log: Path):
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("TUSHARE_", "EMQ_", "MA_"))}
+    env.update({
+        "PYTHONPATH": str(SCRIPTS_DIR),
+        "MA_DOTENV": "0",
+        "MA_DATA_DIR": str(tmp / "data"),
+        "MA_TUSHARE_FACTORY": "marketdata.fakes:fake_pro",
+        "MA_EMQ_FACTORY": "marketdata.fakes:fake_emquant",
+        "MA_FAKE_LAST_DATE": LAST_DATE,
+        "MA_FAKE_LATENCY": str(args.latency),
+        "MA_FAKE_ERROR_RATE": str(args.error_rate),
+        "MA_FAKE_CALL_LOG": str(call_log),
+        "TUSHARE_TOKEN": "bench",
+        "EMQ_USERNAME": "bench",
+        "EMQ_PASSWORD": "bench",
+        "EMQ_BROKER_DISABLE": "1",
+        "RESULT_CACHE_DISABLE": "1",
+    })
+    if args.fixtures:
+        env["MA_FAKE_FIXTURES"] = str(Path(args.fixtures).resolve())
+    return env
+
+
+def run_script(name: str, argv, args):
+    # Fresh data dir and cwd per run so stores and caches start cold
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        call_log = tmp / "calls.log"
+        env = fake_env(tmp, args, call_log)
+        with open(tmp / "stdout", "wb") as out:
+            t0 = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, str(SCRIPTS_DIR / f"{name}.py"), *argv], stdout=out, stderr=subprocess.DEVNULL, env=env, cwd=tmp)
+            _, status, usage = os.wait4(proc.pid, 0)
+            wall = time.perf_counter() - t0
+        calls = Counter()
+        if call_log.exists():
+            calls.update(line.strip() for line in call_log.read_text(encoding="utf-8").splitlines() if line.strip())
+        return {
+            "wall_ms": round(wall * 1000, 1),
+            "exit_code": os.waitstatus_to_exitcode(status),
+            "calls": dict(sorted(calls.items())),
+            "peak_kb": usage.ru_maxrss,
+        }
+
+
+def measure(fn, repeats: int):
+    # Median wall time and tracemalloc peak of the first run
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return {"wall_ms": round(times[len(times) // 2], 2), "peak_kb": peak // 1024}
+
+
+def helper_cases(args):
+    from marketdata import clients, fakes
+
+    config = fakes.FakeConfig(latency=0, error_rate=0, last_date=LAST_DATE, fixtures=args.fixtures, call_log="")
+    pro = fakes.FakePro(config)
+    emq = fakes.FakeEmq(config)
+    out = {}
+
+    from marketdata import spot_csd
+
+    csd = emq.csd("000300.SH", "CLOSE", (LAST - timedelta(days=3650)).isoformat(), LAST_ISO, "")
+    out["normalize_csd"] = measure(lambda: spot_csd.normalize_csd(csd), args.repeats)
+
+    from marketdata.contract_select import select_contracts
+
+    board = pro.fut_daily(start_date=(LAST - timedelta(days=45)).strftime("%Y%m%d"), end_date=LAST_DATE)
+    days = [g for _, g in board.groupby("trade_date")]
+    out["select_contracts"] = measure(lambda: [select_contracts(g) for g in days], args.repeats)
+
+    from marketdata import choice_amount as heatmap
+
+    codes = ",".join(f"{p}{i:02d}.{ex}" for p, ex in (("cu", "SHF"), ("m", "DCE"), ("SR", "CZC"), ("sc", "INE"), ("IF", "CFE")) for i in range(120))
+    css = emq.css(codes, "NAME,CLEARDIFFERRANGE,AMOUNT", "")
+    out["heatmap_grouping"] = measure(lambda: heatmap.build_payload(LAST_ISO, heatmap.normalize_items(css)), args.repeats)
+
+    # fetch_range against the fake, cold (empty store) and warm
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["MA_DATA_DIR"] = tmp
+        counted = fakes.FakePro(config)
+        clients.set_factory("tushare", lambda token: counted)
+        try:
+            from marketdata import futures_store
+
+            start = (LAST - timedelta(days=2000)).strftime("%Y%m%d")
+            out["fetch_range_cold"] = measure_once(lambda: futures_store.fetch_range("IFL.CFX", start, LAST_DATE), counted)
+            out["fetch_range_warm"] = measure_once(lambda: futures_store.fetch_range("IFL.CFX", start, LAST_DATE), counted)
+        finally:
+            clients.set_factory("tushare", None)
+    return out
+
+
+def measure_once(fn, client):
+    before = dict(client.calls)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    calls = {f"tushare {k}": v - before.get(k, 0) for k, v in client.calls.items() if v - before.get(k, 0)}
+    return {"wall_ms": round(wall * 1000, 2), "peak_kb": peak // 1024, "calls": calls}
+
+
+def regressions(current, baseline, tolerance: float):
+    out = []
+    for group in ("scripts", "helpers"):
+        for name, base in baseline.get(group, {}).items():
+            cur = current.get(group, {}).get(name)
+            if cur is None:
+                continue
+            for api, n in cur.get("calls", {}).items():
+                if n > base.get("calls", {}).get(api, 0):
+                    out.append(f"{name}: {api} calls {base.get('calls', {}).get(api, 0)} -> {n}")
+            for key in ("wall_ms", "peak_kb"):
+                if base.get(key) and cur.get(key, 0) > base[key] * (1 + tolerance):
+                    out.append(f"{name}: {key} {base[key]} -> {cur[key]}")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--latency", default="0", help="seconds per fake upstream call, or uniform:a,b / lognormal:median,sigma / exp:mean")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake calls that fail")
+    ap.add_argument("--fixtures", help="directory with recorded tushare.jsonl / emquant.jsonl")
+    ap.add_argument("--repeats", type=int, default=5, help="runs per in-process helper")
+    ap.add_argument("--only", help="comma-separated script/helper names")
+    ap.add_argument("--save", help="write results to this JSON file")
+    ap.add_argument("--compare", help="baseline JSON from --save")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed time/memory growth vs baseline")
+    args = ap.parse_args()
+    only = set(args.only.split(",")) if args.only else None
+
+    result = {"latency": args.latency, "error_rate": args.error_rate, "scripts": {}, "helpers": {}}
+    for name, argv in SCRIPTS.items():
+        if only is None or name in only:
+            result["scripts"][name] = run_script(name, argv, args)
+    helpers = helper_cases(args)
+    result["helpers"] = {k: v for k, v in helpers.items() if only is None or k in only or k.rsplit("_", 1)[0] in only}
+    print(json.dumps(result, indent=1, ensure_ascii=False))
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(result, indent=1, ensure_ascii=False), encoding="utf-8")
+    if args.compare:
+        found = regressions(result, json.loads(Path(args.compare).read_text(encoding="utf-8")), args.tolerance)
+        for line in found:
+            print(line, file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+import argparse
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from marketdata.fakes import FakeConfig, latest_weekday, serve_tushare  # noqa: E402
+
+# Load test of the fetch layer as the dashboard drives it. Each simulated
+# user opens /ma/dashboard: every route below fires at once, and each route
+# runs its scripts one after another (futures, then spot) the way the
+# Next.js handlers do on a cache miss. Tushare is a local HTTP stand-in
+# (marketdata.fakes.serve_tushare) shared by every process, so latency and
+# call counts are server-side; EmQuant is the in-process fake.
+# Reported: throughput, p50/p90/p99 per script, route and page load, peak
+# live processes and their summed RSS, per-process max RSS, upstream calls
+# and failed runs.
+#   python scripts/ma/bench/load_test.py --users 20 \
+#       --tushare-latency lognormal:0.15,0.5 --emq-latency lognormal:0.3,0.4
+# --cache cold disables the result cache and futures store (every process
+# goes upstream); --pool routes pooled scripts through tushare_worker_pool.py.
+
+# Data ends on the latest weekday, as on a trading day at the close
+LAST_DATE = latest_weekday(date.today()).strftime("%Y%m%d")
+START = "20230101"
+
+
+LATEST = ("get_cffex_index_futures_latest", [])
+ROUTES = {
+    "nanhua": [("get_nanhua_index", [])],
+    "basis/far": [LATEST, ("get_spot_indices_close", [])],
+    "basis/near": [LATEST, ("get_spot_indices_close", [])],
+    "basis/timeseries": [("get_basis_timeseries", [START, LAST_DATE, "--kind", "timeseries"])],
+    "basis/diff-timeseries": [("get_basis_timeseries", [START, LAST_DATE, "--kind", "diff-timeseries"])],
+    "basis/near-timeseries": [("get_basis_timeseries", [START, LAST_DATE, "--kind", "near-timeseries"])],
+    "basis/near-diff-timeseries": [("get_basis_timeseries", [START, LAST_DATE, "--kind", "near-diff-timeseries"])],
+    "basis/cont-diff-timeseries": [("get_basis_timeseries", [START, LAST_DATE, "--kind", "cont-diff-timeseries"])],
+    "futures/latest": [LATEST],
+    "choice/amount-heatmap": [("get_choice_all_futures_latest", [])],
+}
+POOLED = {
+    "get_cffex_index_futures_range",
+    "get_cffex_index_futures_near_range",
+    "get_cffex_index_futures_continuous_range",
+    "get_cffex_index_futures_latest",
+    "get_spot_indices_close_tushare",
+}
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+
+    def at(q):
+        # Nearest rank
+        return round(values[max(0, math.ceil(q * len(values)) - 1)], 1)
+    return {"n": len(values), "p50": at(0.50), "p90": at(0.90), "p99": at(0.99), "max": round(values[-1], 1)}
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except Exception:
+        pass
+    return 0
+
+
+def _children(pid: int):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="ascii") as fh:
+            return [int(p) for p in fh.read().split()]
+    except Exception:
+        return []
+
+
+class Monitor:
+    # Samples live fetch processes (spawned scripts, or the pool and its
+    # workers) for peak count and summed RSS
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.pids = set()
+        self.roots = []
+        self.peak_procs = 0
+        self.peak_rss_kb = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def add(self, pid):
+        with self._lock:
+            self.pids.add(pid)
+
+    def discard(self, pid):
+        with self._lock:
+            self.pids.discard(pid)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                pids = set(self.pids)
+            for root in self.roots:
+                pids.add(root)
+                pids.update(_children(root))
+            self.peak_procs = max(self.peak_procs, len(pids))
+            self.peak_rss_kb = max(self.peak_rss_kb, sum(_rss_kb(p) for p in pids))
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def child_env(data_dir: Path, emq_log: Path, args, tushare_url: str):
+    drop = ("TUSHARE_TOKEN", "TUSHARE_POOL_", "EMQ_", "MA_")
+    env = {k: v for k, v in os.environ.items() if not k.startswith(drop)}
+    env.update({
+        "PYTHONPATH": str(SCRIPTS_DIR),
+        "MA_DOTENV": "0",
+        "MA_DATA_DIR": str(data_dir),
+        "MA_TUSHARE_FACTORY": "marketdata.fakes:http_pro",
+        "MA_FAKE_TUSHARE_URL": tushare_url,
+        "MA_EMQ_FACTORY": "marketdata.fakes:fake_emquant",
+        "MA_FAKE_LAST_DATE": LAST_DATE,
+        "MA_FAKE_LATENCY": args.emq_latency,
+        "MA_FAKE_ERROR_RATE": str(args.error_rate),
+        "MA_FAKE_CALL_LOG": str(emq_log),
+        "TUSHARE_TOKEN": "loadtest",
+        "EMQ_USERNAME": "loadtest",
+        "EMQ_PASSWORD": "loadtest",
+        "EMQ_BROKER_DISABLE": "1",
+    })
+    if args.cache == "cold":
+        env.update({"RESULT_CACHE_DISABLE": "1", "FUT_STORE_DISABLE": "1"})
+    return env
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_pool(env, workers: int):
+    port = _free_port()
+    pool_env = dict(env, TUSHARE_POOL_PORT=str(port), TUSHARE_POOL_WORKERS=str(workers))
+    proc = subprocess.Popen([sys.executable, str(SCRIPTS_DIR / "tushare_worker_pool.py")], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=pool_env)
+    ready = proc.stdout.readline()
+    if not ready:
+        raise RuntimeError("tushare_worker_pool.py did not start")
+    return proc, port
+
+
+def run_pooled(port: int, script: str, argv):
+    payload = json.dumps({"script": f"{script}.py", "args": argv, "env": {}}) + "\n"
+    with socket.create_connection(("127.0.0.1", port), timeout=300) as sock:
+        sock.sendall(payload.encode("utf-8"))
+        buf = b""
+        while not buf.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            buf += chunk
+    try:
+        return int(json.loads(buf.decode("utf-8")).get("code") or 0)
+    except Exception:
+        return 1
+
+
+class LoadTest:
+    def __init__(self, args, env, monitor: Monitor, pool_port=None):
+        self.args = args
+        self.env = env
+        self.monitor = monitor
+        self.pool_port = pool_port
+        self.lock = threading.Lock()
+        self.scripts = {}
+        self.routes = {}
+        self.pages = []
+        self.proc_rss_kb = []
+        self.failures = {}
+
+    def _record(self, table, name, ms):
+        with self.lock:
+            table.setdefault(name, []).append(ms)
+
+    def run_script(self, script: str, argv):
+        t0 = time.perf_counter()
+        if self.pool_port and script in POOLED:
+            code = run_pooled(self.pool_port, script, argv)
+        else:
+            proc = subprocess.Popen([sys.executable, str(SCRIPTS_DIR / f"{script}.py"), *argv], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=self.env, cwd=self.env["MA_DATA_DIR"])
+            self.monitor.add(proc.pid)
+            _, status, usage = os.wait4(proc.pid, 0)
+            self.monitor.discard(proc.pid)
+            code = os.waitstatus_to_exitcode(status)
+            with self.lock:
+                self.proc_rss_kb.append(usage.ru_maxrss)
+        self._record(self.scripts, script, (time.perf_counter() - t0) * 1000)
+        if code != 0:
+            with self.lock:
+                self.failures[script] = self.failures.get(script, 0) + 1
+
+    def run_route(self, route: str):
+        t0 = time.perf_counter()
+        for script, argv in ROUTES[route]:
+            self.run_script(script, argv)
+        self._record(self.routes, route, (time.perf_counter() - t0) * 1000)
+
+    def run_user(self, ex: ThreadPoolExecutor, user: int, routes):
+        time.sleep(self.args.ramp * user / max(1, self.args.users))
+        for _ in range(self.args.iterations):
+            t0 = time.perf_counter()
+            for fut in [ex.submit(self.run_route, r) for r in routes]:
+                fut.result()
+            with self.lock:
+                self.pages.append((time.perf_counter() - t0) * 1000)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=20, help="concurrent dashboard users")
+    ap.add_argument("--iterations", type=int, default=1, help="page loads per user")
+    ap.add_argument("--ramp", type=float, default=0.0, help="seconds over which users arrive")
+    ap.add_argument("--routes", help="comma-separated subset of routes")
+    ap.add_argument("--tushare-latency", default="lognormal:0.15,0.5", help="per-call latency at the Tushare stand-in")
+    ap.add_argument("--emq-latency", default="lognormal:0.3,0.4", help="per-call latency of the fake EmQuant client")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls that fail")
+    ap.add_argument("--cache", choices=("shared", "cold"), default="shared", help="shared: one data dir with result cache; cold: no caches")
+    ap.add_argument("--pool", action="store_true", help="serve pooled scripts from tushare_worker_pool.py")
+    ap.add_argument("--pool-workers", type=int, default=4)
+    ap.add_argument("--save", help="also write the report to this JSON file")
+    args = ap.parse_args()
+    routes = args.routes.split(",") if args.routes else list(ROUTES)
+
+    server = serve_tushare(config=FakeConfig(latency=args.tushare_latency, error_rate=args.error_rate, last_date=LAST_DATE, call_log=""))
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    pool = None
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        emq_log = tmp / "emquant_calls.log"
+        env = child_env(tmp, emq_log, args, url)
+        pool_port = None
+        if args.pool:
+            pool, pool_port = start_pool(env, args.pool_workers)
+        try:
+            with Monitor() as monitor:
+                if pool is not None:
+                    monitor.roots.append(pool.pid)
+                test = LoadTest(args, env, monitor, pool_port)
+                workers = args.users * (len(routes) + 1)
+                t0 = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=workers) as ex:
+                    users = [ex.submit(test.run_user, ex, u, routes) for u in range(args.users)]
+                    for u in users:
+                        u.result()
+                wall = time.perf_counter() - t0
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.wait()
+        emq_calls = {}
+        if emq_log.exists():
+            for line in emq_log.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    emq_calls[line.strip()] = emq_calls.get(line.strip(), 0) + 1
+    server.shutdown()
+
+    runs = sum(len(v) for v in test.scripts.values())
+    upstream = {f"tushare {k}": v for k, v in sorted(server.pro.calls.items())}
+    upstream.update(sorted(emq_calls.items()))
+    report = {
+        "users": args.users,
+        "iterations": args.iterations,
+        "routes": routes,
+        "cache": args.cache,
+        "pool": args.pool,
+        "tushare_latency": args.tushare_latency,
+        "emq_latency": args.emq_latency,
+        "error_rate": args.error_rate,
+        "wall_s": round(wall, 2),
+        "script_runs": runs,
+        "scripts_per_s": round(runs / wall, 2) if wall else None,
+        "pages_per_min": round(len(test.pages) / wall * 60, 1) if wall else None,
+        "page_ms": percentiles(test.pages),
+        "route_ms": {r: percentiles(v) for r, v in sorted(test.routes.items())},
+        "script_ms": {s: percentiles(v) for s, v in sorted(test.scripts.items())},
+        "peak_processes": monitor.peak_procs,
+        "peak_rss_mb": round(monitor.peak_rss_kb / 1024, 1),
+        "process_max_rss_mb": percentiles([kb / 1024 for kb in test.proc_rss_kb]),
+        "upstream_calls": upstream,
+        "failed_runs": test.failures,
+    }
+    text = json.dumps(report, indent=1, ensure_ascii=False)
+    print(text)
+    if args.save:
+        Path(args.save).write_text(text, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
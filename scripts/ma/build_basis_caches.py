@@ -0,0 +1,179 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+from get_cffex_index_futures_latest import cached_latest
+from get_spot_indices_close_tushare import spot_closes
+from marketdata import trace
+from marketdata.basis_inputs import BASES, LEGS, expected_trade_date, fetch_inputs
+from marketdata.paths import data_dir
+from marketdata.runtime import EXIT_IMPORT_FAILED, lazy_import, load_env, run_main
+from marketdata.scheduler import PRIORITY_LATEST
+from marketdata.tushare_client import get_pro
+
+# NumPy-backed; imported once the run gets past the credential checks
+basis = lazy_import("marketdata.basis")
+basis_cache = lazy_import("marketdata.basis_cache")
+basis_stats = lazy_import("marketdata.basis_stats")
+
+# Rebuilds all seven data/basis_*cache.json files in one pass: the 16
+# continuous legs ({IH,IF,IC,IM} x {L,L1,L2,L3}) and the four spot series
+# are fetched once, aligned by date and computed with NumPy. The snapshot
+# caches (basis_cache.json, basis_near_cache.json) come from the same
+# latest-day futures payload the near/far routes used.
+#   python scripts/ma/build_basis_caches.py [start_ymd end_ymd]
+
+def _write_json(path: Path, obj):
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(obj, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _read_entries(path: Path) -> dict:
+    try:
+        obj = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(obj, dict) and isinstance(obj.get("entries"), dict):
+            return obj
+    except Exception:
+        pass
+    return {"entries": {}}
+
+
+def timeseries_caches(fut, spot, start_ymd, end_ymd):
+    # {file name: payload} for the five range caches
+    cols = {}
+    for base in BASES:
+        index = basis.SpotIndex(spot.get(base))
+        for leg in LEGS:
+            cols[(base, leg)] = basis.basis_series(fut.get(f"{base}{leg}.CFX") or [], index)
+    head = {"start_date": start_ymd, "end_date": end_ymd}
+    return {
+        # Main-contract series is the L1 continuous leg, near is L
+        "basis_timeseries_cache.json": {**head, "data": {b: basis.annualized_rows(cols[(b, "L1")]) for b in BASES}, "calc": "settle"},
+        "basis_near_timeseries_cache.json": {**head, "data": {b: basis.annualized_rows(cols[(b, "L")]) for b in BASES}, "calc": "settle"},
+        "basis_diff_timeseries_cache.json": {**head, "data": {b: basis.diff_rows(cols[(b, "L1")]) for b in BASES}},
+        "basis_near_diff_timeseries_cache.json": {**head, "data": {b: basis.diff_rows(cols[(b, "L")]) for b in BASES}},
+        "basis_cont_diff_timeseries_cache.json": {**head, "data": {b: {leg: basis.diff_rows(cols[(b, leg)]) for leg in LEGS} for b in BASES}},
+    }
+
+
+def snapshot_entries(latest, spot_close):
+    # (basis_near_cache entry, basis_cache entry) for latest["trade_date"]
+    trade_ymd = latest.get("trade_date")
+    near, far = {}, {}
+    for code in BASES:
+        f = (latest.get("data") or {}).get(code) or {}
+        close = spot_close.get(code)
+        near_ts = f.get("near_ts_code") or None
+        near_settle = f.get("near_settle") if isinstance(f.get("near_settle"), (int, float)) else None
+        days, ann = basis.point_basis(trade_ymd, near_settle, close, near_ts)
+        near[code] = {
+            "trade_date": trade_ymd,
+            "near_ts_code": near_ts,
+            "near_settle": near_settle,
+            "spot_close": close,
+            "days_to_maturity": days,
+            "annualized_basis_pct": ann,
+        }
+        # The far route prices the main contract
+        far_ts = f.get("ts_code") or None
+        far_settle = f.get("settle") if isinstance(f.get("settle"), (int, float)) else None
+        days, ann = basis.point_basis(trade_ymd, far_settle, close, far_ts) if far_ts else (None, None)
+        far[code] = {
+            "trade_date": trade_ymd,
+            "far_ts_code": far_ts,
+            "far_close": f.get("close") if isinstance(f.get("close"), (int, float)) else None,
+            "far_settle": far_settle,
+            "spot_close": close,
+            "days_to_maturity": days,
+            "annualized_basis_pct": ann,
+        }
+    return (
+        {"trade_date": trade_ymd, "data": near, "calc": "settle"},
+        {"trade_date": trade_ymd, "data": far, "calc": "settle"},
+    )
+
+
+def main():
+    load_env()
+    token = os.environ.get("TUSHARE_TOKEN")
+    if not token:
+        print(json.dumps({"error": "Missing TUSHARE_TOKEN in environment"}))
+        sys.exit(2)
+    try:
+        pro = get_pro(token)
+    except Exception as e:
+        print(json.dumps({"error": f"Tushare import/init failed: {e}"}))
+        sys.exit(EXIT_IMPORT_FAILED if isinstance(e, ImportError) else 1)
+
+    start_ymd = "20230101"
+    end_ymd = expected_trade_date()
+    if len(sys.argv) >= 3:
+        start_ymd = sys.argv[1]
+        end_ymd = sys.argv[2]
+
+    errors = {}
+    written = []
+    out_dir = data_dir()
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Union of every leg the routes read: L (near), L1 (main) plus L2/L3.
+    # Futures and spot are fetched side by side
+    fut, spot, fetch_errors, timings = fetch_inputs([f"{b}{leg}.CFX" for b in BASES for leg in LEGS], start_ymd, end_ymd)
+    errors.update(fetch_errors)
+
+    # A missing side would blank the cached series; keep the old files
+    if fut is not None and spot is not None:
+        payloads = timeseries_caches(fut, spot, start_ymd, end_ymd)
+        for name, payload in payloads.items():
+            _write_json(out_dir / name, payload)
+            written.append(name)
+            try:
+                # Columnar copy: only days from the last stored one are rewritten
+                basis_cache.store_payload(name[:-5], payload)
+            except Exception as e:
+                errors[f"columnar:{name}"] = str(e)
+        if os.environ.get("BASIS_STATS_DISABLE") != "1":
+            try:
+                # Rolling stats only compute the days after their last run
+                basis_stats.update_all({name[:-5]: payload for name, payload in payloads.items()})
+            except Exception as e:
+                errors["stats"] = str(e)
+
+    trade_ymd = None
+    try:
+        # The snapshot is what the near/far routes are waiting on
+        pro = get_pro(token, priority=PRIORITY_LATEST)
+        with trace.span("latest"):
+            latest = cached_latest(lambda: pro)
+        trade_ymd = latest.get("trade_date")
+        spot_close = {}
+        if spot is not None:
+            spot_close = {b: basis.SpotIndex(spot.get(b)).close_on(trade_ymd) for b in BASES}
+        if any(v is None for v in spot_close.values()) or not spot_close:
+            # Same fallback as the routes: Tushare index_daily closes
+            trace.count("fallback.spot_index_daily")
+            spot_close = {b: (v or {}).get("close") for b, v in spot_closes(pro, trade_ymd).items()}
+        near_entry, far_entry = snapshot_entries(latest, spot_close)
+        for name, entry in (("basis_near_cache.json", near_entry), ("basis_cache.json", far_entry)):
+            cache = _read_entries(out_dir / name)
+            cache["entries"][trade_ymd] = entry
+            _write_json(out_dir / name, cache)
+            written.append(name)
+    except Exception as e:
+        errors["latest"] = str(e)
+
+    print(json.dumps({
+        "ok": not errors,
+        "start_date": start_ymd,
+        "end_date": end_ymd,
+        "trade_date": trade_ymd,
+        "written": written,
+        "errors": errors,
+        "timings_ms": timings,
+    }, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    run_main(main)
@@ -0,0 +1,190 @@
+import json
+import os
+import queue
+import select
+import socket
+import socketserver
+import sys
+import threading
+
+from marketdata.clients import emquant_client
+from marketdata.emq import broker_address, result_to_wire
+from marketdata.runtime import load_env
+
+
+def log_callback(msg):
+    try:
+        if isinstance(msg, bytes):
+            msg_str = msg.decode('utf-8', errors='ignore').strip()
+        else:
+            msg_str = str(msg)
+        if 'heartbeat' in msg_str.lower():
+            return 0
+        print(f"[emq-broker] {msg_str}", file=sys.stderr)
+    except Exception:
+        pass
+    return 0
+
+
+class Session:
+    # Owns the single EmQuant login; every css/csd runs on the worker thread
+    # in arrival order, so callers never contend for the licensed session.
+    def __init__(self, c, options):
+        self.c = c
+        self.options = options
+        self.jobs = queue.Queue()
+        self.calls = 0
+
+    def login(self):
+        res = self.c.start(self.options, log_callback, None)
+        return getattr(res, "ErrorCode", -1), getattr(res, "ErrorMsg", "unknown")
+
+    def _invoke(self, op, args):
+        fn = getattr(self.c, op)
+        return fn(*args)
+
+    def run(self):
+        while True:
+            op, args, done = self.jobs.get()
+            try:
+                try:
+                    res = self._invoke(op, args)
+                except Exception:
+                    # Session dropped (network blip, server-side kick): log in again once
+                    try:
+                        self.c.stop()
+                    except Exception:
+                        pass
+                    code, msg = self.login()
+                    if code != 0:
+                        raise RuntimeError(f"re-login failed: {msg}")
+                    res = self._invoke(op, args)
+                self.calls += 1
+                done["result"] = result_to_wire(res)
+            except Exception as e:
+                done["result"] = {"ErrorCode": -1, "ErrorMsg": str(e)}
+            finally:
+                done["event"].set()
+
+    def submit(self, op, args):
+        done = {"event": threading.Event(), "result": None}
+        self.jobs.put((op, args, done))
+        done["event"].wait()
+        return done["result"]
+
+
+class BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        session = self.server.session
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            req = json.loads(line.decode("utf-8"))
+            op = req.get("op")
+            args = req.get("args") or []
+            if op == "ping":
+                out = {"ErrorCode": 0, "queued": session.jobs.qsize(), "calls": session.calls}
+            elif op in ("css", "csd"):
+                out = session.submit(op, args)
+            elif op == "csq":
+                return self.stream(session, args)
+            else:
+                out = {"ErrorCode": -1, "ErrorMsg": f"unsupported op: {op}"}
+        except Exception as e:
+            out = {"ErrorCode": -1, "ErrorMsg": f"bad request: {e}"}
+        self.wfile.write((json.dumps(out, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def client_closed(self):
+        # Subscribers never send after the request line: readable means EOF
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+        except Exception:
+            return True
+
+    def stream(self, session, args):
+        # Relay a csq subscription on the shared session to this connection
+        codes, indicators, options = (list(args) + ["", "", ""])[:3]
+        pushes = queue.Queue()
+
+        def on_quote(quantdata):
+            try:
+                pushes.put(result_to_wire(quantdata))
+            except Exception:
+                pass
+            return 0
+
+        ack = session.submit("csq", [codes, indicators, options, on_quote, None])
+        self.wfile.write((json.dumps(ack, ensure_ascii=False) + "\n").encode("utf-8"))
+        if ack.get("ErrorCode") != 0:
+            return
+        idle = 0
+        try:
+            while not self.client_closed():
+                try:
+                    wire = pushes.get(timeout=1)
+                    idle = 0
+                except queue.Empty:
+                    idle += 1
+                    if idle < 15:
+                        continue
+                    idle = 0
+                    wire = {"heartbeat": 1}
+                self.wfile.write((json.dumps(wire, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+        except Exception:
+            pass
+        finally:
+            session.submit("csqcancel", [ack.get("SerialID")])
+
+
+class BrokerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main():
+    load_env()
+
+    try:
+        c = emquant_client()
+    except Exception as e:
+        print(json.dumps({"error": f"EmQuantAPI import failed: {e}"}))
+        sys.exit(1)
+
+    username = os.environ.get("EMQ_USERNAME")
+    password = os.environ.get("EMQ_PASSWORD")
+    if not username or not password:
+        print(json.dumps({"error": "Missing EMQ_USERNAME/EMQ_PASSWORD in environment"}))
+        sys.exit(2)
+
+    options = f"UserName={username},PassWord={password},TestLatency=1,ForceLogin=0"
+    extra = os.environ.get("EMQ_OPTIONS_EXTRA")
+    if extra:
+        options = f"{options},{extra}"
+    session = Session(c, options)
+    code, msg = session.login()
+    if code != 0:
+        print(json.dumps({"error": f"login failed: {msg}"}))
+        sys.exit(3)
+
+    host, port = broker_address()
+    server = BrokerServer((host, port), BrokerHandler)
+    server.session = session
+    threading.Thread(target=session.run, daemon=True).start()
+    print(json.dumps({"ok": True, "host": host, "port": port}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            c.stop()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import json
+import sys
+
+from marketdata.basis_cache import load_payload
+from marketdata.basis_stats import BASES, SOURCES, WINDOWS, SeriesStats, update_all
+from marketdata.paths import data_dir
+from marketdata.runtime import load_env
+
+# Rolling mean/stdev/z-score/percentile of annualized_basis_pct and
+# basis_diff over 20/60/250 observations for IH/IF/IC/IM. Reads the stats
+# build_basis_caches.py keeps up to date; days the basis caches have beyond
+# the stored stats are computed first (no upstream calls).
+#   python scripts/ma/get_basis_stats.py [--start YYYYMMDD] [--end YYYYMMDD] [--latest]
+#   python scripts/ma/get_basis_stats.py --rebuild   # recompute from the full caches
+
+
+def _source_payloads():
+    # Columnar copy first (memory-mapped), else the JSON cache
+    out = {}
+    for source in SOURCES.values():
+        payload = None
+        try:
+            payload = load_payload(source)
+        except Exception:
+            payload = None
+        if payload is None:
+            try:
+                payload = json.loads((data_dir() / f"{source}.json").read_text(encoding="utf-8"))
+            except Exception:
+                continue
+        out[source] = payload
+    return out
+
+
+def main():
+    load_env()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", default=None)
+    ap.add_argument("--end", default=None)
+    ap.add_argument("--bases", default=",".join(BASES))
+    ap.add_argument("--metrics", default=",".join(SOURCES))
+    ap.add_argument("--latest", action="store_true", help="only the last day of each series")
+    ap.add_argument("--rebuild", action="store_true", help="drop the rolling state and recompute everything")
+    args = ap.parse_args()
+
+    payloads = _source_payloads()
+    if not payloads:
+        print(json.dumps({"error": "no basis caches found; run build_basis_caches.py first"}))
+        sys.exit(4)
+    updated = update_all(payloads, rebuild=args.rebuild)
+
+    data = {}
+    for metric in [m for m in args.metrics.split(",") if m in SOURCES]:
+        data[metric] = {}
+        for base in [b for b in args.bases.split(",") if b in BASES]:
+            rows = SeriesStats(f"{base}.{metric}").read(args.start, args.end)
+            data[metric][base] = rows[-1:] if args.latest else rows
+    print(json.dumps({
+        "windows": list(WINDOWS),
+        "start_date": args.start,
+        "end_date": args.end,
+        "data": data,
+        "updated": updated,
+    }, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import json
+import sys
+
+from marketdata.basis_inputs import BASES, LEGS, expected_trade_date, fetch_inputs
+from marketdata.runtime import lazy_import, load_env, run_main
+
+basis = lazy_import("marketdata.basis")
+
+# One basis time series, fetched in a single process: the Tushare futures
+# legs (fetch_ranges) and the EmQuant spot series run concurrently, so the
+# refresh costs max(fut, spot) rather than fut + spot plus a second
+# interpreter. Output has the shape of the route's cache file, plus
+# "errors", "partial" and "timings_ms". When one side fails the other is
+# still returned: futures settles without spot, or spot closes without
+# futures, with every basis value null.
+#   python scripts/ma/get_basis_timeseries.py [start_ymd end_ymd] [--kind diff-timeseries]
+
+# Route name -> (continuous leg(s), row builder)
+KINDS = {
+    "timeseries": ("L1", "annualized"),
+    "near-timeseries": ("L", "annualized"),
+    "diff-timeseries": ("L1", "diff"),
+    "near-diff-timeseries": ("L", "diff"),
+    "cont-diff-timeseries": (None, "diff"),
+}
+
+
+def _spot_only(spot_rows):
+    # Futures rows with no settle on every spot date, so the join keeps the
+    # spot side when the futures fetch failed
+    return [{"trade_date": str(r.get("date") or "").replace("-", "")} for r in spot_rows if isinstance(r, dict)]
+
+
+def payload(kind, fut, spot, start_ymd, end_ymd):
+    leg, rows = KINDS[kind]
+    build = basis.annualized_rows if rows == "annualized" else basis.diff_rows
+    out = {"start_date": start_ymd, "end_date": end_ymd, "data": {}}
+    for base in BASES:
+        index = basis.SpotIndex((spot or {}).get(base))
+        legs = LEGS if leg is None else [leg]
+        per_leg = {}
+        for lg in legs:
+            fut_rows = (fut.get(f"{base}{lg}.CFX") or []) if fut is not None else _spot_only((spot or {}).get(base) or [])
+            per_leg[lg] = build(basis.basis_series(fut_rows, index))
+        out["data"][base] = per_leg if leg is None else per_leg[leg]
+    if rows == "annualized":
+        out["calc"] = "settle"
+    return out
+
+
+def main():
+    load_env()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("start", nargs="?", default="20230101")
+    ap.add_argument("end", nargs="?", default=None)
+    ap.add_argument("--kind", choices=sorted(KINDS), default="diff-timeseries")
+    args = ap.parse_args()
+    start_ymd = args.start.replace("-", "")
+    end_ymd = (args.end or expected_trade_date()).replace("-", "")
+
+    leg = KINDS[args.kind][0]
+    codes = [f"{b}{lg}.CFX" for b in BASES for lg in (LEGS if leg is None else [leg])]
+    fut, spot, errors, timings = fetch_inputs(codes, start_ymd, end_ymd)
+    if fut is None and spot is None:
+        print(json.dumps({"error": "futures and spot fetch both failed", "errors": errors, "timings_ms": timings}, ensure_ascii=False))
+        sys.exit(4)
+
+    out = payload(args.kind, fut, spot, start_ymd, end_ymd)
+    out.update({"partial": bool(errors), "errors": errors, "timings_ms": timings})
+    print(json.dumps(out, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    run_main(main)
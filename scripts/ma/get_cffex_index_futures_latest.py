@@ -2,69 +2,42 @@ import json
 import os
 import sys
 from datetime import datetime, timedelta
-from pathlib import Path
 
+from marketdata import trace
+from marketdata.fut_daily_query import FutDailyQuery
+from marketdata.result_cache import single_flight
+from marketdata.runtime import lazy_import, load_env
+from marketdata.scheduler import PRIORITY_LATEST
+from marketdata.trade_calendar import get_calendar, walk_back_days
+from marketdata.tushare_client import get_pro
 
-def _load_env_from_files():
-    candidates = []
-    try:
-        cwd = Path.cwd()
-        candidates.append(cwd)
-    except Exception:
-        pass
-    try:
-        script_dir = Path(__file__).resolve().parent
-        candidates.append(script_dir)
-        candidates.append(script_dir.parent)
-        candidates.append(script_dir.parent.parent)
-    except Exception:
-        pass
-
-    for base in candidates:
-        for fname in (".env", ".env.local"):
-            f = base / fname
-            if f.exists() and f.is_file():
-                try:
-                    for line in f.read_text(encoding="utf-8").splitlines():
-                        line = line.strip()
-                        if not line or line.startswith("#"):
-                            continue
-                        if "=" not in line:
-                            continue
-                        key, val = line.split("=", 1)
-                        key = key.strip()
-                        val = val.strip().strip('"').strip("'")
-                        if key and os.environ.get(key) is None:
-                            os.environ[key] = val
-                except Exception:
-                    pass
+# pandas/numpy load on first use, not on the error and cache-hit paths
+contract_select = lazy_import('marketdata.contract_select')
 
 
 def _latest_trade_date(pro):
     # Use SSE trading calendar as authoritative for A-share indices
+    cal = get_calendar(pro)
+    if cal is not None:
+        latest = cal.latest_open_on_or_before(datetime.today().strftime('%Y%m%d'))
+        if latest:
+            return latest
     try:
         cal = pro.trade_cal(
             exchange='SSE',
             start_date=(datetime.today() - timedelta(days=30)).strftime('%Y%m%d'),
             end_date=datetime.today().strftime('%Y%m%d'),
         )
-        open_days = []
-        for _, row in cal.iterrows():
-            try:
-                val = row['is_open']
-                if isinstance(val, str):
-                    is_open = val.strip() == '1'
-                else:
-                    is_open = int(val) == 1
-            except Exception:
-                is_open = False
-            if is_open:
-                open_days.append(row['cal_date'])
-        if open_days:
-            return max(open_days)
+        import pandas as pd
+
+        is_open = pd.to_numeric(cal['is_open'], errors='coerce') == 1
+        open_days = cal.loc[is_open, 'cal_date'].astype(str)
+        if not open_days.empty:
+            return open_days.max()
     except Exception:
         pass
     # Fallback: walk back from today to find an open day
+    trace.count('fallback.trade_cal_probe')
     d = datetime.today()
     for i in range(0, 15):
         dd = d - timedelta(days=i)
@@ -80,18 +53,23 @@ def _latest_trade_date(pro):
     return d.strftime('%Y%m%d')
 
 def _latest_data_date(pro):
-    # Use CSI 300 index as proxy to detect most recent date with data
+    # Use CSI 300 index as proxy to detect most recent date with data:
+    # one range query over the last 20 days instead of one call per day
     anchor = '000300.SH'
-    d = datetime.today()
-    for i in range(0, 20):
-        dt = (d - timedelta(days=i)).strftime('%Y%m%d')
-        try:
-            df = pro.index_daily(ts_code=anchor, start_date=dt, end_date=dt)
-            if df is not None and not df.empty:
-                return dt
-        except Exception:
-            pass
-    return d.strftime('%Y%m%d')
+    today = datetime.today().strftime('%Y%m%d')
+    try:
+        df = pro.index_daily(ts_code=anchor, start_date=_shift_ymd(today, -19), end_date=today, fields='trade_date')
+        if df is not None and not df.empty:
+            dates = [d for d in df['trade_date'].astype(str).tolist() if d <= today]
+            if dates:
+                return max(dates)
+    except Exception:
+        pass
+    return today
+
+
+def _shift_ymd(ymd: str, days: int) -> str:
+    return (datetime.strptime(ymd, '%Y%m%d') + timedelta(days=days)).strftime('%Y%m%d')
 
 def _adjust_for_weekend(today: datetime) -> str:
     # If Saturday (5) -> Friday; if Sunday (6) -> Friday
@@ -166,123 +144,90 @@ def _fallback_index_daily(pro, index_code, trade_date):
     return None
 
 
-def _fetch_fut_daily_for_date(pro, trade_date):
-    # Try with explicit exchange first, then without
+def _fetch_fut_daily_for_date(query, trade_date):
+    # Whole board for one day; the exchange variant that worked last is tried first
     fields = 'ts_code,trade_date,pre_close,pre_settle,open,high,low,close,settle,vol,oi'
+    return query.fetch(None, trade_date, trade_date=trade_date, fields=fields)
+
+
+def _fetch_continuous_contract(query, ts_code: str, trade_date: str):
+    fields = 'ts_code,trade_date,pre_close,pre_settle,open,high,low,close,settle,vol'
+    # One range query over the past week; the newest row <= trade_date wins
+    with trace.span('continuous', ts_code=ts_code):
+        row = query.last_on_or_before(ts_code, trade_date, _shift_ymd(trade_date, -7), fields)
+    if row is None:
+        trace.count('continuous.missing')
+        return None
     try:
-        df = pro.fut_daily(trade_date=trade_date, exchange='CFFEX', fields=fields)
-        if df is not None and not df.empty:
-            return df
+        # Calendar days between the requested date and the row we got
+        lag = (datetime.strptime(trade_date, '%Y%m%d') - datetime.strptime(str(row.get('trade_date')), '%Y%m%d')).days
+        if lag > 0:
+            trace.count('continuous.walk_back_days', lag)
     except Exception:
         pass
     try:
-        df = pro.fut_daily(trade_date=trade_date, exchange='', fields=fields)
-        if df is not None and not df.empty:
-            return df
+        close = float(row.get('close')) if row.get('close') is not None else None
     except Exception:
-        pass
+        close = None
     try:
-        # Last resort without exchange param at all
-        df = pro.fut_daily(trade_date=trade_date, fields=fields)
-        if df is not None and not df.empty:
-            return df
+        settle = float(row.get('settle')) if row.get('settle') is not None else None
     except Exception:
-        pass
-    return None
-
-
-def _select_main_contract_row(df, prefix: str):
+        settle = None
+    pct = None
     try:
-        cands = df[df['ts_code'].str.startswith(prefix)]
-        if cands is None or cands.empty:
-            return None
-        # Prefer highest open interest, then highest volume, then latest ts_code
-        if 'oi' in cands.columns and cands['oi'].notna().any():
-            cands = cands.sort_values(by=['oi', 'vol', 'ts_code'], ascending=[False, False, False])
-        elif 'vol' in cands.columns and cands['vol'].notna().any():
-            cands = cands.sort_values(by=['vol', 'ts_code'], ascending=[False, False])
-        else:
-            cands = cands.sort_values(by=['ts_code'], ascending=False)
-        return cands.iloc[0]
+        pre_settle = row.get('pre_settle')
+        if pre_settle is not None and close is not None and float(pre_settle) != 0:
+            pct = (close / float(pre_settle) - 1.0) * 100.0
     except Exception:
-        return None
-
-
-def _select_far_month_row(df, prefix: str):
-    try:
-        cands = df[df['ts_code'].str.startswith(prefix)]
-        if cands is None or cands.empty:
-            return None
-        # Far month: pick the largest ts_code (YYMM) lexicographically
-        cands = cands.sort_values(by=['ts_code'], ascending=False)
-        return cands.iloc[0]
-    except Exception:
-        return None
-
-def _fetch_continuous_contract(pro, ts_code: str, trade_date: str):
-    fields = 'ts_code,trade_date,pre_close,pre_settle,open,high,low,close,settle,vol'
-    # Try the given date; if no data, walk back a few days
-    for back in range(0, 8):
-        dt = (datetime.strptime(trade_date, '%Y%m%d') - timedelta(days=back)).strftime('%Y%m%d')
-        # Try with explicit CFFEX exchange, then without, then with empty exchange
-        for exch in ('CFFEX', None, ''):
-            try:
-                kwargs = {'trade_date': dt, 'ts_code': ts_code, 'fields': fields}
-                if exch is not None:
-                    kwargs['exchange'] = exch
-                df = pro.fut_daily(**kwargs)
-                if df is not None and not df.empty:
-                    row = df.iloc[-1]
-                    try:
-                        close = float(row.get('close')) if row.get('close') is not None else None
-                    except Exception:
-                        close = None
-                    try:
-                        settle = float(row.get('settle')) if row.get('settle') is not None else None
-                    except Exception:
-                        settle = None
-                    pct = None
-                    try:
-                        pre_settle = row.get('pre_settle')
-                        if pre_settle is not None and close is not None and float(pre_settle) != 0:
-                            pct = (close / float(pre_settle) - 1.0) * 100.0
-                    except Exception:
-                        pass
-                    if pct is None:
-                        try:
-                            pre_close = row.get('pre_close')
-                            if pre_close is not None and close is not None and float(pre_close) != 0:
-                                pct = (close / float(pre_close) - 1.0) * 100.0
-                        except Exception:
-                            pass
-                    return {
-                        'ts_code': row.get('ts_code') or ts_code,
-                        'trade_date': str(row.get('trade_date', dt)),
-                        'close': close,
-                        'settle': settle,
-                        'settle_return': float(pct) if pct is not None else None,
-                    }
-            except Exception:
-                pass
-    return None
+        pass
+    if pct is None:
+        try:
+            pre_close = row.get('pre_close')
+            if pre_close is not None and close is not None and float(pre_close) != 0:
+                pct = (close / float(pre_close) - 1.0) * 100.0
+        except Exception:
+            pass
+    return {
+        'ts_code': row.get('ts_code') or ts_code,
+        'trade_date': str(row.get('trade_date', trade_date)),
+        'close': close,
+        'settle': settle,
+        'settle_return': float(pct) if pct is not None else None,
+    }
 
 
 def main():
-    _load_env_from_files()
+    load_env()
     token = os.environ.get('TUSHARE_TOKEN')
     if not token:
         print(json.dumps({'error': 'Missing TUSHARE_TOKEN in environment'}))
         sys.exit(2)
 
-    try:
-        import tushare as ts
-        pro = ts.pro_api(token)
-    except Exception as e:
-        print(json.dumps({'error': f'Tushare import/init failed: {e}'}))
-        sys.exit(1)
+    def connect():
+        try:
+            return get_pro(token, priority=PRIORITY_LATEST)
+        except Exception as e:
+            print(json.dumps({'error': f'Tushare import/init failed: {e}'}))
+            sys.exit(1)
+
+    print(json.dumps(cached_latest(connect), ensure_ascii=False))
+
+
+def cached_latest(connect):
+    # futures/latest, basis/near and the basis engine all ask for this on a
+    # page load; concurrent runs share one fetch. connect() -> pro is only
+    # called on a miss, so hits never import tushare. A payload missing a
+    # close is not stored, so the next request fetches again.
+    return single_flight(
+        'cffex_index_futures_latest', [], None, lambda: build_latest(connect()),
+        ok=lambda p: not p.get('error') and all((v or {}).get('close') is not None for v in (p.get('data') or {}).values()),
+    )
 
+
+def build_latest(pro):
     # Prefer actual data presence over calendar on non-trading days
-    trade_date = _latest_data_date(pro)
+    with trace.span('latest_data_date'):
+        trade_date = _latest_data_date(pro)
     if trade_date == datetime.today().strftime('%Y%m%d'):
         # If no data was found, adjust for weekend
         trade_date = _adjust_for_weekend(datetime.today())
@@ -291,52 +236,36 @@ def main():
     prefixes = ['IH', 'IF', 'IC', 'IM']
     result = {}
     used_dates = []
-    df = _fetch_fut_daily_for_date(pro, trade_date)
-    if df is None or df.empty:
-        # walk back to find a day with data
-        for back in range(1, 6):
-            dt = (datetime.strptime(trade_date, '%Y%m%d') - timedelta(days=back)).strftime('%Y%m%d')
-            df = _fetch_fut_daily_for_date(pro, dt)
-            if df is not None and not df.empty:
-                trade_date = dt
-                break
+    # Remembers the working exchange= variant and today's empty answers
+    query = FutDailyQuery(pro)
+    with trace.span('board', trade_date=trade_date):
+        df = _fetch_fut_daily_for_date(query, trade_date)
+        if df is None or df.empty:
+            # walk back to find a day with data
+            for dt in walk_back_days(get_calendar(pro), trade_date, 6):
+                if dt == trade_date:
+                    continue
+                trace.count('fut_daily.walk_back')
+                df = _fetch_fut_daily_for_date(query, dt)
+                if df is not None and not df.empty:
+                    trade_date = dt
+                    break
 
     if df is not None and not df.empty:
+        # One grouped pass picks main/far for every product with vectorized returns
+        picks = contract_select.select_contracts(df, prefixes)
         for code in prefixes:
-            row = _select_main_contract_row(df, code)
-            far_row = _select_far_month_row(df, code)
+            row = (picks.get(code) or {}).get('main')
+            far_row = (picks.get(code) or {}).get('far')
             if row is not None:
-                try:
-                    close = float(row.get('close')) if row.get('close') is not None else None
-                except Exception:
-                    close = None
-                try:
-                    settle = float(row.get('settle')) if row.get('settle') is not None else None
-                except Exception:
-                    settle = None
-                # settle_return: (today close - yesterday settle) / yesterday settle * 100
-                pct = None
-                try:
-                    pre_settle = row.get('pre_settle')
-                    if pre_settle is not None and close is not None and float(pre_settle) != 0:
-                        pct = (close / float(pre_settle) - 1.0) * 100.0
-                except Exception:
-                    pass
-                # Fallback: use pre_close if pre_settle missing
-                if pct is None:
-                    try:
-                        pre_close = row.get('pre_close')
-                        if pre_close is not None and close is not None and float(pre_close) != 0:
-                            pct = (close / float(pre_close) - 1.0) * 100.0
-                    except Exception:
-                        pass
-                used_dates.append(str(row.get('trade_date', trade_date)))
+                close = row['close']
+                settle = row['settle']
+                # settle_return: (today close - yesterday settle) / yesterday settle * 100, pre_close fallback
+                pct = row['settle_return']
+                used_dates.append(str(row.get('trade_date') or trade_date))
                 # Far month details (lexicographically far from daily pool)
-                try:
-                    far_close = float(far_row.get('close')) if (far_row is not None and far_row.get('close') is not None) else None
-                except Exception:
-                    far_close = None
-                far_ts = far_row.get('ts_code') if far_row is not None else None
+                far_close = far_row['close'] if far_row is not None else None
+                far_ts = far_row['ts_code'] if far_row is not None else None
                 # Fallback: if far month not found, use main contract as far to enable basis calc
                 if far_close is None and close is not None:
                     far_close = close
@@ -344,8 +273,8 @@ def main():
                     far_ts = row.get('ts_code')
 
                 # Explicit continuous contracts: near (L) and next (L1)
-                near_cont = _fetch_continuous_contract(pro, f"{code}L.CFX", trade_date)
-                far_cont = _fetch_continuous_contract(pro, f"{code}L1.CFX", trade_date)
+                near_cont = _fetch_continuous_contract(query, f"{code}L.CFX", trade_date)
+                far_cont = _fetch_continuous_contract(query, f"{code}L1.CFX", trade_date)
                 result[code] = {
                     'ts_code': row.get('ts_code'),
                     'trade_date': str(row.get('trade_date', trade_date)),
@@ -378,6 +307,7 @@ def main():
                 }
     else:
         # Fallback: use underlying indices if we cannot get fut_daily (permissions or holiday)
+        trace.count('fallback.index_daily')
         idx_map = {
             'IH': '000016.SH',  # SSE 50
             'IF': '000300.SH',  # CSI 300
@@ -387,8 +317,7 @@ def main():
         for code, index_code in idx_map.items():
             data = None
             date_used = trade_date
-            for back in range(0, 8):
-                dt = (datetime.strptime(trade_date, '%Y%m%d') - timedelta(days=back)).strftime('%Y%m%d')
+            for dt in walk_back_days(get_calendar(pro), trade_date, 8):
                 data = _fallback_index_daily(pro, index_code, dt)
                 if data is not None and (data.get('close') is not None or data.get('settle_return') is not None):
                     date_used = dt
@@ -427,7 +356,7 @@ def main():
         'trade_date': payload_trade_date,
         'data': result,
     }
-    print(json.dumps(payload, ensure_ascii=False))
+    return payload
 
 
 if __name__ == '__main__':
@@ -0,0 +1,41 @@
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+
+from marketdata.heatmap_history import HeatmapHistory
+
+# Reads data/heatmap_history/ without touching EmQuant:
+#   --mode payloads  one treemap payload per day (frames of an animation)
+#   --mode sectors   per-day sector amounts and shares plus range totals
+#   python scripts/ma/get_heatmap_history.py --start 20250901 [--end YYYYMMDD] [--sectors 黑色,有色]
+
+# Ensure UTF-8 stdout on Windows
+try:
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+except Exception:
+    pass
+
+
+def main():
+    today = datetime.today()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", default=(today - timedelta(days=30)).strftime("%Y%m%d"))
+    ap.add_argument("--end", default=today.strftime("%Y%m%d"))
+    ap.add_argument("--mode", choices=("payloads", "sectors"), default="payloads")
+    ap.add_argument("--sectors", default="", help="comma-separated sector names (default all)")
+    args = ap.parse_args()
+
+    sectors = [s for s in args.sectors.split(",") if s] or None
+    history = HeatmapHistory()
+    out = {"start": args.start, "end": args.end, "mode": args.mode}
+    if args.mode == "payloads":
+        out["days"] = history.payloads(args.start, args.end, sectors)
+    else:
+        out.update(history.sector_totals(args.start, args.end, sectors))
+    print(json.dumps(out, ensure_ascii=False, separators=(",", ":")))
+
+
+if __name__ == "__main__":
+    main()
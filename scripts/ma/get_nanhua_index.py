@@ -2,8 +2,33 @@ import json
 import os
 import sys
 from datetime import datetime
-import calendar
-from pathlib import Path
+
+from marketdata import trace
+from marketdata.clients import emquant_client
+from marketdata.emq import connect_broker
+from marketdata.runtime import load_env
+from marketdata.series_store import SeriesStore
+
+# 南华商品指数 and its sector sub-indices, OHLC, from one multi-code,
+# multi-field csd. Series are kept in data/series_store/nanhua_csd/, so a
+# refresh only asks for the days after the last sealed one.
+# NANHUA_SUB_INDICES="CODE:名称,..." overrides the sub-index list;
+# NANHUA_STORE_DISABLE=1 fetches the whole window every time.
+MAIN_CODE = "NHCI.NH"
+SUB_INDICES = {
+    "NHAI.NH": "农产品",
+    "NHII.NH": "工业品",
+    "NHMI.NH": "金属",
+    "NHNFI.NH": "有色金属",
+    "NHPMI.NH": "贵金属",
+    "NHECI.NH": "能化",
+}
+FIELDS = ["OPEN", "HIGH", "LOW", "CLOSE"]
+CSD_OPTIONS = "period=1,adjustflag=1,curtype=1,order=1,market=CNSESH"
+
+
+class CsdError(Exception):
+    pass
 
 
 def log_callback(msg):
@@ -20,225 +45,167 @@ def log_callback(msg):
     return 0
 
 
-def _load_env_from_files():
-    candidates = []
+def sub_indices():
+    spec = os.environ.get("NANHUA_SUB_INDICES")
+    if spec is None:
+        return dict(SUB_INDICES)
+    out = {}
+    for part in spec.split(","):
+        code, _, name = part.partition(":")
+        if code.strip():
+            out[code.strip()] = name.strip() or code.strip()
+    return out
+
+
+def _iso(ymd: str) -> str:
+    return f"{ymd[0:4]}-{ymd[4:6]}-{ymd[6:8]}"
+
+
+def _iso_date(d) -> str:
+    # EmQuant dates come as 'YYYY/M/D' strings or date objects
+    ds = d if isinstance(d, str) else getattr(d, "strftime", lambda *_: str(d))("%Y-%m-%d")
     try:
-        # 1) Current working directory
-        cwd = Path.cwd()
-        candidates.append(cwd)
+        if "/" in ds:
+            ds = datetime.strptime(ds, "%Y/%m/%d").strftime("%Y-%m-%d")
     except Exception:
         pass
+    return ds
+
+
+def _float(v):
     try:
-        # 2) Script directory and its parents
-        script_dir = Path(__file__).resolve().parent
-        candidates.append(script_dir)
-        candidates.append(script_dir.parent)
-        candidates.append(script_dir.parent.parent)
+        f = float(v)
     except Exception:
-        pass
+        return None
+    return None if f != f else f
+
+
+def normalize_fields(data, codes, fields):
+    # {code: [{date, open, high, low, close}]} from a multi-code csd whose
+    # Data is {code: [[field 1 per date], [field 2 per date], ...]}; days
+    # without a close are dropped. A code whose columns cannot be read
+    # raises CsdError, so the store does not seal the window as empty.
+    dates = [_iso_date(d) for d in list(getattr(data, "Dates", None) or getattr(data, "Times", None) or [])]
+    DD = getattr(data, "Data", None) or {}
+    out = {}
+    for code in codes:
+        series = DD.get(code) if isinstance(DD, dict) else None
+        try:
+            columns = [list(col) for col in series] if series is not None else []
+        except Exception:
+            columns = []
+        if len(columns) != len(fields) or any(len(col) != len(dates) for col in columns):
+            raise CsdError(f"unparseable csd result for {code}: {json.dumps(_meta(data), ensure_ascii=False, default=str)}")
+        rows = []
+        for i, d in enumerate(dates):
+            row = {"date": d}
+            for f, col in zip(fields, columns):
+                row[f.lower()] = _float(col[i])
+            if row.get("close") is not None:
+                rows.append(row)
+        out[code] = rows
+    return out
+
+
+def _meta(data):
+    # Shape of an unparseable result, to help debugging
+    try:
+        return {
+            "has_Dates": hasattr(data, "Dates"),
+            "has_Data": hasattr(data, "Data"),
+            "len_Dates": len(getattr(data, "Dates", []) or []),
+            "codes": list((getattr(data, "Data", None) or {}).keys()) if isinstance(getattr(data, "Data", None), dict) else None,
+            "fields": getattr(data, "Indicators", None) or getattr(data, "Fields", None),
+        }
+    except Exception:
+        return None
+
+
+def nanhua_series(c, start_ymd: str, end_ymd: str, codes):
+    # {code: rows} for [start, end]; one csd for every code missing data
+    last = {}
 
-    loaded = False
-    # load order: .env then .env.local so local overrides
-    for base in candidates:
-        for fname in (".env", ".env.local"):
-            f = base / fname
-            if f.exists() and f.is_file():
-                try:
-                    for line in f.read_text(encoding="utf-8").splitlines():
-                        line = line.strip()
-                        if not line or line.startswith("#"):
-                            continue
-                        if "=" not in line:
-                            continue
-                        key, val = line.split("=", 1)
-                        key = key.strip()
-                        val = val.strip().strip('"').strip("'")
-                        # don't overwrite if already set in environment
-                        if key and os.environ.get(key) is None:
-                            os.environ[key] = val
-                    loaded = True
-                except Exception:
-                    # ignore parse errors and continue
-                    pass
-    return loaded
+    def fetch_many(code_list, s, e):
+        data = c.csd(",".join(code_list), ",".join(FIELDS), _iso(s), _iso(e), CSD_OPTIONS)
+        if getattr(data, "ErrorCode", 0) != 0:
+            raise CsdError(f"csd error: {getattr(data, 'ErrorCode', 'unknown')}")
+        last["data"] = data
+        return normalize_fields(data, code_list, FIELDS)
+
+    if os.environ.get("NANHUA_STORE_DISABLE") == "1":
+        sync = lambda keys: fetch_many(keys, start_ymd, end_ymd)  # noqa: E731
+    else:
+        store = SeriesStore("nanhua_csd", date_field="date")
+        sync = lambda keys: store.sync_many(keys, start_ymd, end_ymd, fetch_many)  # noqa: E731
+    try:
+        series = sync(codes)
+    except CsdError:
+        if codes == [MAIN_CODE]:
+            raise
+        # A rejected sub-index code must not take the main series down
+        trace.count("nanhua.main_only")
+        series = sync([MAIN_CODE])
+    return series, last.get("data")
 
 
 def main():
     # Load environment variables from .env files if present
-    _load_env_from_files()
+    load_env()
 
-    # Import EmQuantAPI after env load so failures are reported as JSON
-    try:
-        import EmQuantAPI as Emq  # type: ignore
-        c = Emq.c
-    except Exception as e:
-        print(json.dumps({"error": f"EmQuantAPI import failed: {e}"}))
-        sys.exit(1)
     # Compute last year start through today's date
     today = datetime.today()
     last_year = today.year - 1
     start_date = f"{last_year}-01-01"
     end_date = today.strftime("%Y-%m-%d")
 
-    username = os.environ.get("EMQ_USERNAME")
-    password = os.environ.get("EMQ_PASSWORD")
+    # Prefer the long-lived session broker; log in directly only without one
+    c = connect_broker()
+    if c is None:
+        # Import EmQuantAPI after env load so failures are reported as JSON
+        try:
+            c = emquant_client()
+        except Exception as e:
+            print(json.dumps({"error": f"EmQuantAPI import failed: {e}"}))
+            sys.exit(1)
+
+        username = os.environ.get("EMQ_USERNAME")
+        password = os.environ.get("EMQ_PASSWORD")
 
-    if not username or not password:
-        print(json.dumps({"error": "Missing EMQ_USERNAME/EMQ_PASSWORD in environment"}))
-        sys.exit(2)
+        if not username or not password:
+            print(json.dumps({"error": "Missing EMQ_USERNAME/EMQ_PASSWORD in environment"}))
+            sys.exit(2)
 
-    options = f"UserName={username},PassWord={password},TestLatency=1,ForceLogin=0"
+        options = f"UserName={username},PassWord={password},TestLatency=1,ForceLogin=0"
 
-    loginresult = c.start(options, log_callback, None)
-    if loginresult.ErrorCode != 0:
-        print(json.dumps({"error": f"login failed: {getattr(loginresult, 'ErrorMsg', 'unknown')}"}))
-        sys.exit(3)
+        loginresult = c.start(options, log_callback, None)
+        if loginresult.ErrorCode != 0:
+            print(json.dumps({"error": f"login failed: {getattr(loginresult, 'ErrorMsg', 'unknown')}"}))
+            sys.exit(3)
 
     try:
-        # 南华商品指数: NHCI.NH, field CLOSE, daily
-        data = c.csd(
-            "NHCI.NH",
-            "CLOSE",
-            start_date,
-            end_date,
-            "period=1,adjustflag=1,curtype=1,order=1,market=CNSESH",
-        )
-
-        if data.ErrorCode != 0:
-            print(json.dumps({"error": f"csd error: {data.ErrorCode}"}))
+        subs = sub_indices()
+        codes = [MAIN_CODE] + [code for code in subs if code != MAIN_CODE]
+        try:
+            series, data = nanhua_series(c, start_date.replace("-", ""), end_date.replace("-", ""), codes)
+        except CsdError as e:
+            print(json.dumps({"error": str(e)}))
             sys.exit(4)
 
-        # Attempt to normalize EmQuant result into [{date, close}]
-        result = []
-        dates = getattr(data, "Dates", None) or getattr(data, "dates", None) or getattr(data, "Times", None)
-        values = None
-        # Data may be nested: data.Data is list of columns aligned to fields
-        DD = getattr(data, "Data", None) or getattr(data, "data", None) or getattr(data, "Values", None)
-        if DD is not None:
-            # EmQuant may return Data as dict keyed by field name (e.g., 'CLOSE')
-            if isinstance(DD, dict):
-                values = DD.get("CLOSE")
-                if values is None and len(DD) > 0:
-                    # fallback to first series
-                    try:
-                        values = next(iter(DD.values()))
-                    except Exception:
-                        values = None
-            elif isinstance(DD, (list, tuple)):
-                values = DD[0] if len(DD) > 0 else []
-            else:
-                values = DD
-        # Fallback: try Records
-        if (not dates or not values) and hasattr(data, "Records"):
-            records = getattr(data, "Records")
-            for rec in records:
-                # rec may have fields: rec.Date, rec.Close
-                d = getattr(rec, "Date", None) or getattr(rec, "date", None)
-                v = getattr(rec, "Close", None) or getattr(rec, "close", None)
-                if d is not None and v is not None:
-                    result.append({"date": str(d), "close": float(v)})
-        else:
-            # Some EmQuant versions return date strings in data.Dates and a nested list in Data
-            if dates and values:
-                # Coerce to Python lists for reliable length checks
-                try:
-                    dates = list(dates)
-                except Exception:
-                    pass
-                try:
-                    values = list(values)
-                except Exception:
-                    pass
-                # Flatten values if nested to single series
-                try:
-                    if isinstance(values, (list, tuple)) and len(values) == 1:
-                        # Inner container may be an EmQuant vector; coerce to list
-                        inner = values[0]
-                        try:
-                            values = list(inner)
-                        except Exception:
-                            values = inner
-                    elif isinstance(values, (list, tuple)) and values and isinstance(values[0], (list, tuple)):
-                        values = values[0]
-                except Exception:
-                    pass
-
-                # After flattening, ensure comparable lengths
-                try:
-                    values_len = len(values)
-                except Exception:
-                    # Attempt to coerce to list
-                    try:
-                        values = list(values)
-                        values_len = len(values)
-                    except Exception:
-                        values_len = 0
-
-                if len(dates) == values_len:
-                    for d, v in zip(dates, values):
-                        # Ensure date string format
-                        ds = d if isinstance(d, str) else getattr(d, "strftime", lambda *_: str(d))("%Y-%m-%d")
-                        # Normalize 'YYYY/M/D' to 'YYYY-MM-DD'
-                        try:
-                            if isinstance(ds, str) and "/" in ds:
-                                ds_dt = datetime.strptime(ds, "%Y/%m/%d")
-                                ds = ds_dt.strftime("%Y-%m-%d")
-                        except Exception:
-                            pass
-                        try:
-                            fv = float(v)
-                        except Exception:
-                            fv = None
-                        if fv is not None:
-                            result.append({"date": ds, "close": fv})
-
+        result = series.get(MAIN_CODE) or []
         # Attach meta for debugging if empty
-        meta = None
-        if not result:
-            # Collect simple metadata to help debugging
-            try:
-                sample_date_type = None
-                sample_value_type = None
-                sample_value0_len = None
-                try:
-                    sample_date_type = str(type((getattr(data, "Dates", None) or getattr(data, "Times", None))[0]))
-                except Exception:
-                    pass
-                try:
-                    sample_values = getattr(data, "Data", None)
-                    sample_value_type = str(type(sample_values))
-                    if sample_values is not None:
-                        # try inner
-                        inner0 = None
-                        try:
-                            inner0 = sample_values[0]
-                        except Exception:
-                            inner0 = None
-                        if inner0 is not None:
-                            try:
-                                sample_value0_len = len(inner0)
-                            except Exception:
-                                sample_value0_len = None
-                except Exception:
-                    pass
-                meta = {
-                    "has_Dates": hasattr(data, "Dates"),
-                    "has_Times": hasattr(data, "Times"),
-                    "has_Data": hasattr(data, "Data"),
-                    "len_Dates": len(getattr(data, "Dates", []) or []),
-                    "len_Data": len(getattr(data, "Data", []) or []),
-                    "fields": getattr(data, "Fields", None),
-                    "date0_type": sample_date_type,
-                    "values_type": sample_value_type,
-                    "inner0_len": sample_value0_len,
-                }
-            except Exception:
-                meta = None
-
-        print(json.dumps({"code": "NHCI.NH", "start": start_date, "end": end_date, "data": result, "meta": meta}, ensure_ascii=False))
+        meta = _meta(data) if not result and data is not None else None
+        out = {
+            "code": MAIN_CODE,
+            "start": start_date,
+            "end": end_date,
+            "data": result,
+            "sub_indices": {code: {"name": name, "data": series.get(code) or []} for code, name in subs.items() if code in series},
+            "meta": meta,
+        }
+        print(json.dumps(out, ensure_ascii=False))
     finally:
         try:
-            logout = c.stop()
+            c.stop()
         except Exception:
             pass
 
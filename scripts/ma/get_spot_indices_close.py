@@ -2,69 +2,39 @@ import json
 import os
 import sys
 from datetime import datetime
-from pathlib import Path
 
-
-def _load_env_from_files():
-    candidates = []
-    try:
-        cwd = Path.cwd()
-        candidates.append(cwd)
-    except Exception:
-        pass
-    try:
-        script_dir = Path(__file__).resolve().parent
-        candidates.append(script_dir)
-        candidates.append(script_dir.parent)
-        candidates.append(script_dir.parent.parent)
-    except Exception:
-        pass
-
-    for base in candidates:
-        for fname in (".env", ".env.local"):
-            f = base / fname
-            if f.exists() and f.is_file():
-                try:
-                    for line in f.read_text(encoding="utf-8").splitlines():
-                        line = line.strip()
-                        if not line or line.startswith("#"):
-                            continue
-                        if "=" not in line:
-                            continue
-                        key, val = line.split("=", 1)
-                        key = key.strip()
-                        val = val.strip().strip('"').strip("'")
-                        if key and os.environ.get(key) is None:
-                            os.environ[key] = val
-                except Exception:
-                    pass
+from marketdata.clients import emquant_client
+from marketdata.emq import connect_broker
+from marketdata.runtime import load_env
 
 
 def main():
-    _load_env_from_files()
+    load_env()
     date_str = os.environ.get("SPOT_TRADE_DATE") or (sys.argv[1] if len(sys.argv) > 1 else None)
     if not date_str:
         # default to today formatted
         date_str = datetime.today().strftime("%Y-%m-%d")
 
-    try:
-        import EmQuantAPI as Emq  # type: ignore
-        c = Emq.c
-    except Exception as e:
-        print(json.dumps({"error": f"EmQuantAPI import failed: {e}"}))
-        sys.exit(1)
+    # Prefer the long-lived session broker; log in directly only without one
+    c = connect_broker()
+    if c is None:
+        try:
+            c = emquant_client()
+        except Exception as e:
+            print(json.dumps({"error": f"EmQuantAPI import failed: {e}"}))
+            sys.exit(1)
 
-    username = os.environ.get("EMQ_USERNAME")
-    password = os.environ.get("EMQ_PASSWORD")
-    if not username or not password:
-        print(json.dumps({"error": "Missing EMQ_USERNAME/EMQ_PASSWORD in environment"}))
-        sys.exit(2)
+        username = os.environ.get("EMQ_USERNAME")
+        password = os.environ.get("EMQ_PASSWORD")
+        if not username or not password:
+            print(json.dumps({"error": "Missing EMQ_USERNAME/EMQ_PASSWORD in environment"}))
+            sys.exit(2)
 
-    options = f"UserName={username},PassWord={password},TestLatency=1,ForceLogin=0"
-    loginresult = c.start(options, None, None)
-    if loginresult.ErrorCode != 0:
-        print(json.dumps({"error": f"login failed: {getattr(loginresult, 'ErrorMsg', 'unknown')}"}))
-        sys.exit(3)
+        options = f"UserName={username},PassWord={password},TestLatency=1,ForceLogin=0"
+        loginresult = c.start(options, None, None)
+        if loginresult.ErrorCode != 0:
+            print(json.dumps({"error": f"login failed: {getattr(loginresult, 'ErrorMsg', 'unknown')}"}))
+            sys.exit(3)
 
     try:
         codes = ["000016.SH", "000300.SH", "000905.SH", "000852.SH"]
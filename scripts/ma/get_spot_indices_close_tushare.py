@@ -1,43 +1,13 @@
 import json
 import os
 import sys
-from datetime import datetime, timedelta
-from pathlib import Path
+from datetime import datetime
 
-
-def _load_env_from_files():
-    candidates = []
-    try:
-        cwd = Path.cwd()
-        candidates.append(cwd)
-    except Exception:
-        pass
-    try:
-        script_dir = Path(__file__).resolve().parent
-        candidates.append(script_dir)
-        candidates.append(script_dir.parent)
-        candidates.append(script_dir.parent.parent)
-    except Exception:
-        pass
-
-    for base in candidates:
-        for fname in (".env", ".env.local"):
-            f = base / fname
-            if f.exists() and f.is_file():
-                try:
-                    for line in f.read_text(encoding="utf-8").splitlines():
-                        line = line.strip()
-                        if not line or line.startswith("#"):
-                            continue
-                        if "=" not in line:
-                            continue
-                        key, val = line.split("=", 1)
-                        key = key.strip()
-                        val = val.strip().strip('"').strip("'")
-                        if key and os.environ.get(key) is None:
-                            os.environ[key] = val
-                except Exception:
-                    pass
+from marketdata.result_cache import single_flight
+from marketdata.runtime import load_env
+from marketdata.scheduler import PRIORITY_LATEST
+from marketdata.trade_calendar import get_calendar, walk_back_days
+from marketdata.tushare_client import get_pro
 
 
 def _ymd_to_str(dt: str) -> str:
@@ -50,7 +20,7 @@ def _ymd_to_str(dt: str) -> str:
 
 
 def main():
-    _load_env_from_files()
+    load_env()
     token = os.environ.get("TUSHARE_TOKEN")
     if not token:
         print(json.dumps({"error": "Missing TUSHARE_TOKEN in environment"}))
@@ -61,13 +31,26 @@ def main():
         date_iso = datetime.today().strftime("%Y-%m-%d")
     date_ymd = _ymd_to_str(date_iso)
 
-    try:
-        import tushare as ts
-        pro = ts.pro_api(token)
-    except Exception as e:
-        print(json.dumps({"error": f"Tushare import/init failed: {e}"}))
-        sys.exit(1)
+    def fetch():
+        # tushare is imported only when the result is not cached
+        try:
+            pro = get_pro(token, priority=PRIORITY_LATEST)
+        except Exception as e:
+            print(json.dumps({"error": f"Tushare import/init failed: {e}"}))
+            sys.exit(1)
+        return spot_closes(pro, date_ymd)
+
+    result = single_flight(
+        "spot_indices_close_tushare",
+        [date_ymd],
+        date_ymd,
+        fetch,
+        ok=lambda r: all((v or {}).get("close") is not None for v in r.values()),
+    )
+    print(json.dumps({"trade_date": date_iso, "data": result}, ensure_ascii=False))
 
+
+def spot_closes(pro, date_ymd: str):
     idx_map = {
         "IH": "000016.SH",
         "IF": "000300.SH",
@@ -75,14 +58,14 @@ def main():
         "IM": "000852.SH",
     }
 
+    # Only open days are probed; the calendar is fetched once and kept in data/
+    candidates = walk_back_days(get_calendar(pro), date_ymd, 8)
     result = {}
     for alias, code in idx_map.items():
         close_val = None
         used = date_ymd
         # Try today, else walk back up to 8 days
-        for back in range(0, 8):
-            dt = datetime.strptime(date_ymd, "%Y%m%d") - timedelta(days=back)
-            ds = dt.strftime("%Y%m%d")
+        for ds in candidates:
             try:
                 df = pro.index_daily(ts_code=code, start_date=ds, end_date=ds)
                 if df is not None and not df.empty:
@@ -98,8 +81,7 @@ def main():
             except Exception:
                 pass
         result[alias] = {"code": code, "close": close_val, "trade_date": used}
-
-    print(json.dumps({"trade_date": date_iso, "data": result}, ensure_ascii=False))
+    return result
 
 
 if __name__ == "__main__":
@@ -0,0 +1,2 @@
+# Shared helpers for the scripts/ma data fetchers.
+# Entry-point scripts import from here; keep module imports cheap.
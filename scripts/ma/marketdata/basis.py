@@ -0,0 +1,151 @@
+import math
+import re
+
+import numpy as np
+
+# Vectorized versions of the basis arithmetic in app/ma/api/basis/*: CFFEX
+# index futures expire on the third Friday of the contract month, days to
+# maturity are calendar days (at least 1), and the annualized basis is
+# (settle - spot) / spot * 365 / days * 100.
+
+_TS_EXPIRY = re.compile(r"^[A-Z]{2}(\d{4})")
+
+
+def _ymd_days(ymds):
+    # "YYYYMMDD" strings -> datetime64[D]
+    return np.array([f"{d[0:4]}-{d[4:6]}-{d[6:8]}" for d in ymds], dtype="datetime64[D]")
+
+
+def third_fridays(months):
+    # datetime64[M] -> third Friday of each month as datetime64[D]
+    first = months.astype("datetime64[D]")
+    weekday = (first.astype("int64") + 3) % 7  # 1970-01-01 was a Thursday; Monday = 0
+    return first + ((4 - weekday) % 7 + 14).astype("timedelta64[D]")
+
+
+def nearest_expiry(days):
+    # First third Friday strictly after each date
+    month = days.astype("datetime64[M]")
+    expiry = third_fridays(month)
+    passed = expiry <= days
+    return np.where(passed, third_fridays(month + 1), expiry)
+
+
+def contract_expiry(ts_code):
+    # IF2606.CFX -> 2026-06 third Friday; None for continuous codes (IFL.CFX)
+    m = _TS_EXPIRY.match(ts_code or "")
+    if not m:
+        return None
+    month = np.array([f"20{m.group(1)[0:2]}-{m.group(1)[2:4]}"], dtype="datetime64[M]")
+    return third_fridays(month)[0]
+
+
+def days_to_maturity(days, expiry):
+    return np.maximum(1, (expiry - days).astype("int64"))
+
+
+def annualized_pct(settle, spot, days):
+    basis = (settle - spot) / spot
+    return basis * (365 / days) * 100
+
+
+def _floats(values):
+    return np.array([v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in values], dtype="float64")
+
+
+class SpotIndex:
+    # Sorted spot closes for one underlying, for date alignment by searchsorted
+    def __init__(self, rows):
+        pairs = {}
+        for r in rows if isinstance(rows, list) else []:
+            close = r.get("close") if isinstance(r, dict) else None
+            if isinstance(close, (int, float)) and not isinstance(close, bool):
+                pairs[str(r.get("date") or "").replace("-", "")] = float(close)
+        self.dates = np.array(sorted(pairs), dtype="U8")
+        self.close = np.array([pairs[d] for d in self.dates], dtype="float64")
+
+    def align(self, ymds):
+        ymds = np.asarray(ymds, dtype="U8")
+        if len(self.dates) == 0 or len(ymds) == 0:
+            return np.full(len(ymds), np.nan)
+        idx = np.searchsorted(self.dates, ymds)
+        idx_c = np.minimum(idx, len(self.dates) - 1)
+        hit = (idx < len(self.dates)) & (self.dates[idx_c] == ymds)
+        return np.where(hit, self.close[idx_c], np.nan)
+
+    def close_on(self, ymd):
+        v = self.align([ymd])[0]
+        return None if np.isnan(v) else float(v)
+
+
+def _iso(ymd):
+    return f"{ymd[0:4]}-{ymd[4:6]}-{ymd[6:8]}"
+
+
+def _num(v):
+    # NaN/inf have no JSON form; JSON.stringify writes them as null too
+    return v if math.isfinite(v) else None
+
+
+def basis_series(fut_rows, spot):
+    # One futures leg against its spot index; returns the columns every
+    # time-series variant is built from.
+    ymds = [str(r.get("trade_date")) for r in fut_rows]
+    settle = _floats([r.get("settle") for r in fut_rows])
+    spot_close = spot.align(ymds)
+    ok = ~np.isnan(settle) & ~np.isnan(spot_close)
+    days = days_to_maturity(_ymd_days(ymds), nearest_expiry(_ymd_days(ymds))) if ymds else np.zeros(0, dtype="int64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annualized = np.where(ok, annualized_pct(settle, spot_close, days), np.nan)
+        diff = np.where(ok, settle - spot_close, np.nan)
+    return {
+        "ymd": ymds,
+        "settle": settle.tolist(),
+        "spot": spot_close.tolist(),
+        "ok": ok.tolist(),
+        "days": days.tolist(),
+        "annualized": annualized.tolist(),
+        "diff": diff.tolist(),
+    }
+
+
+def annualized_rows(cols):
+    # Row shape of basis_timeseries_cache.json / basis_near_timeseries_cache.json
+    out = []
+    for ymd, settle, spot, ok, days, ann in zip(cols["ymd"], cols["settle"], cols["spot"], cols["ok"], cols["days"], cols["annualized"]):
+        row = {"date": _iso(ymd), "annualized_basis_pct": _num(ann) if ok else None}
+        if spot == spot:
+            row["spot_close"] = spot
+        if settle == settle:
+            row["futures_settle"] = settle
+        if ok:
+            row["days_to_maturity"] = days
+        out.append(row)
+    return out
+
+
+def diff_rows(cols):
+    # Row shape of the *_diff_timeseries_cache.json files
+    out = []
+    for ymd, settle, spot, ok, diff in zip(cols["ymd"], cols["settle"], cols["spot"], cols["ok"], cols["diff"]):
+        row = {"date": _iso(ymd), "basis_diff": _num(diff) if ok else None}
+        if spot == spot:
+            row["spot_close"] = spot
+        if settle == settle:
+            row["futures_settle"] = settle
+        out.append(row)
+    return out
+
+
+def point_basis(trade_ymd, settle, spot_close, ts_code=None):
+    # Single-day annualized basis for the near/far snapshot routes. Without
+    # a dated ts_code the nearest upcoming third Friday is used.
+    if not isinstance(settle, (int, float)) or not isinstance(spot_close, (int, float)):
+        return None, None
+    day = _ymd_days([trade_ymd])
+    expiry = contract_expiry(ts_code)
+    if expiry is None:
+        expiry = nearest_expiry(day)[0]
+    days = int(days_to_maturity(day, expiry)[0])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return days, _num(float(annualized_pct(np.float64(settle), np.float64(spot_close), days)))
@@ -0,0 +1,148 @@
+import numpy as np
+
+from marketdata.columnar import ColumnarCache
+
+# Mapping between the JSON basis time-series caches and their columnar form.
+# Field order is the JSON key order of a row; "missing" says how NaN is
+# written back: "null" keeps the key, "omit" drops it (JSON.stringify
+# skips undefined values). "_row" flags which dates a series has a row for.
+
+ROW_FLAG = {"name": "_row", "dtype": "u1"}
+ANNUALIZED_FIELDS = [
+    ROW_FLAG,
+    {"name": "annualized_basis_pct", "dtype": "<f8", "missing": "null"},
+    {"name": "spot_close", "dtype": "<f8", "missing": "omit"},
+    {"name": "futures_settle", "dtype": "<f8", "missing": "omit"},
+    {"name": "days_to_maturity", "dtype": "<f8", "missing": "omit", "int": True},
+]
+DIFF_FIELDS = [
+    ROW_FLAG,
+    {"name": "basis_diff", "dtype": "<f8", "missing": "null"},
+    {"name": "spot_close", "dtype": "<f8", "missing": "omit"},
+    {"name": "futures_settle", "dtype": "<f8", "missing": "omit"},
+]
+# cache name -> (fields, nested by leg)
+BASIS_CACHES = {
+    "basis_timeseries_cache": (ANNUALIZED_FIELDS, False),
+    "basis_near_timeseries_cache": (ANNUALIZED_FIELDS, False),
+    "basis_diff_timeseries_cache": (DIFF_FIELDS, False),
+    "basis_near_diff_timeseries_cache": (DIFF_FIELDS, False),
+    "basis_cont_diff_timeseries_cache": (DIFF_FIELDS, True),
+}
+
+
+def _flatten(data, nested):
+    # {series name: rows}; nested caches use "IH.L"-style names
+    out = {}
+    for code, v in (data or {}).items():
+        if nested and isinstance(v, dict):
+            for leg, rows in v.items():
+                out[f"{code}.{leg}"] = rows if isinstance(rows, list) else []
+        else:
+            out[code] = v if isinstance(v, list) else []
+    return out
+
+
+def payload_to_columns(payload, fields, nested):
+    by_series = _flatten(payload.get("data"), nested)
+    dates = sorted({str(r.get("date") or "").replace("-", "") for rows in by_series.values() for r in rows} - {""})
+    pos = {d: i for i, d in enumerate(dates)}
+    columns = {}
+    for s, rows in by_series.items():
+        for f in fields:
+            columns[(s, f["name"])] = np.zeros(len(dates), dtype="u1") if f is ROW_FLAG else np.full(len(dates), np.nan)
+        for r in rows:
+            i = pos.get(str(r.get("date") or "").replace("-", ""))
+            if i is None:
+                continue
+            columns[(s, "_row")][i] = 1
+            for f in fields[1:]:
+                v = r.get(f["name"])
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    columns[(s, f["name"])][i] = v
+    head = {k: v for k, v in payload.items() if k != "data"}
+    return dates, columns, list(by_series), head
+
+
+def columns_to_payload(dates, columns, meta):
+    # Rebuild the JSON shape the basis routes serve
+    fields = meta["fields"][1:]
+    isos = [f"{d // 10000:04d}-{d // 100 % 100:02d}-{d % 100:02d}" for d in (int(x) for x in dates)]
+    data = {}
+    for s in meta["series"]:
+        flags = columns[(s, "_row")].tolist()
+        cols = [(f, columns[(s, f["name"])].tolist()) for f in fields]
+        rows = []
+        for i, iso in enumerate(isos):
+            if not flags[i]:
+                continue
+            row = {"date": iso}
+            for f, vals in cols:
+                v = vals[i]
+                if v != v or v in (float("inf"), float("-inf")):
+                    if f["missing"] == "null":
+                        row[f["name"]] = None
+                    continue
+                row[f["name"]] = int(v) if f.get("int") else v
+            rows.append(row)
+        if meta.get("nested"):
+            code, leg = s.split(".", 1)
+            data.setdefault(code, {})[leg] = rows
+        else:
+            data[s] = rows
+    head = dict(meta.get("head") or {})
+    out = {k: v for k, v in head.items() if k != "calc"}
+    out["data"] = data
+    if "calc" in head:
+        out["calc"] = head["calc"]
+    return out
+
+
+def _first_change(stored, dates, columns):
+    # Index of the first row where the new columns differ from the stored
+    # ones (dates included, NaN equal to NaN); len(stored dates) when the
+    # stored rows are an unchanged prefix
+    old_dates, old_columns, _ = stored
+    new_dates = np.asarray([int(d) for d in dates], dtype=old_dates.dtype)
+    n = min(len(old_dates), len(new_dates))
+    first = n
+    diff = np.flatnonzero(old_dates[:n] != new_dates[:n])
+    if len(diff):
+        first = int(diff[0])
+    for key, old in old_columns.items():
+        new = np.asarray(columns[key], dtype=old.dtype)[:first]
+        old = old[:first]
+        same = (old == new) | (np.isnan(old) & np.isnan(new)) if old.dtype.kind == "f" else old == new
+        diff = np.flatnonzero(~same)
+        if len(diff):
+            first = int(diff[0])
+    return first if first < n else len(old_dates)
+
+
+def store_payload(name, payload, root=None):
+    # Write a basis payload to its columnar cache. When the layout matches,
+    # only the rows from the first changed (or new) day on are rewritten;
+    # revisions of earlier days are found by comparing with what is stored.
+    fields, nested = BASIS_CACHES[name]
+    dates, columns, series, head = payload_to_columns(payload, fields, nested)
+    cache = ColumnarCache(name, root)
+    meta = cache.meta()
+    if meta and dates and meta["series"] == series and meta["fields"] == fields:
+        stored = cache.read()
+        i = _first_change(stored, dates, columns) if stored is not None else 0
+        if i == len(dates):
+            cache.set_head(head)
+            return "unchanged"
+        if 0 < i and cache.append(dates[i:], {k: v[i:] for k, v in columns.items()}, head=head):
+            return "append"
+    cache.write(dates, columns, series, fields, head=head, nested=nested)
+    return "write"
+
+
+def load_payload(name, start=None, end=None, root=None):
+    # JSON-shaped payload for start <= date <= end (YYYYMMDD), or None
+    got = ColumnarCache(name, root).read(start, end)
+    if got is None:
+        return None
+    dates, columns, meta = got
+    return columns_to_payload(dates, columns, meta)
@@ -0,0 +1,87 @@
+import os
+from datetime import datetime, timedelta
+
+from marketdata.clients import emquant_client
+from marketdata.emq import connect_broker
+from marketdata.fanout import run_parallel
+from marketdata.futures_store import fetch_ranges
+from marketdata.spot_csd import spot_series
+
+# Inputs of the basis series: the continuous CFFEX legs from Tushare and the
+# four spot index series from EmQuant, fetched side by side. Shared by
+# build_basis_caches.py (every leg) and get_basis_timeseries.py (one route).
+
+BASES = ["IH", "IF", "IC", "IM"]
+LEGS = ["L", "L1", "L2", "L3"]
+
+
+def expected_trade_date() -> str:
+    # Same weekend roll-back as expectedTradeDate() in the basis routes
+    now = datetime.today()
+    if now.weekday() == 5:
+        now -= timedelta(days=1)
+    elif now.weekday() == 6:
+        now -= timedelta(days=2)
+    return now.strftime("%Y%m%d")
+
+
+def _iso(ymd: str) -> str:
+    return f"{ymd[0:4]}-{ymd[4:6]}-{ymd[6:8]}"
+
+
+def _emquant():
+    # Broker first, else a direct login; None when EmQuant is unavailable
+    c = connect_broker()
+    if c is not None:
+        return c, None
+    try:
+        c = emquant_client()
+    except Exception as e:
+        return None, f"EmQuantAPI import failed: {e}"
+    username = os.environ.get("EMQ_USERNAME")
+    password = os.environ.get("EMQ_PASSWORD")
+    if not username or not password:
+        return None, "Missing EMQ_USERNAME/EMQ_PASSWORD in environment"
+    options = f"UserName={username},PassWord={password},TestLatency=1,ForceLogin=0"
+    extra = os.environ.get("EMQ_OPTIONS_EXTRA")
+    if extra:
+        options = f"{options},{extra}"
+    login = c.start(options, None, None)
+    if getattr(login, "ErrorCode", -1) != 0:
+        return None, f"login failed: {getattr(login, 'ErrorMsg', 'unknown')}"
+    return c, None
+
+
+def fetch_spot(start_ymd: str, end_ymd: str):
+    # {alias: [{date, close}]} from EmQuant; raises when it is unavailable
+    c, err = _emquant()
+    if c is None:
+        raise RuntimeError(err)
+    try:
+        spot = spot_series(c, _iso(start_ymd), _iso(end_ymd))
+    finally:
+        try:
+            c.stop()
+        except Exception:
+            pass
+    bad = [v.get("error") for v in spot.values() if isinstance(v, dict)]
+    if bad:
+        raise RuntimeError(bad[0])
+    return spot
+
+
+def fetch_inputs(fut_codes, start_ymd: str, end_ymd: str):
+    # (fut, spot, errors, timings_ms): the futures legs and the spot series
+    # fetched concurrently; a failed side is None with its error under
+    # "fut" or "spot"
+    results, errs, timings = run_parallel({
+        "fut_ranges": lambda: fetch_ranges(fut_codes, start_ymd, end_ymd),
+        "spot_series": lambda: fetch_spot(start_ymd, end_ymd),
+    })
+    errors = {}
+    if "fut_ranges" in errs:
+        errors["fut"] = errs["fut_ranges"]
+    if "spot_series" in errs:
+        errors["spot"] = errs["spot_series"]
+    timings = {"fut": timings.get("fut_ranges"), "spot": timings.get("spot_series"), "total": timings.get("total")}
+    return results["fut_ranges"], results["spot_series"], errors, timings
@@ -0,0 +1,256 @@
+import bisect
+import json
+import math
+import os
+from collections import deque
+
+import numpy as np
+
+from marketdata import trace
+from marketdata.columnar import ColumnarCache
+from marketdata.series_store import sealed_through
+
+# Rolling mean, stdev, z-score and percentile rank of the basis series over
+# 20/60/250 observations, one columnar cache per (base, metric) under
+# data/columnar/basis_stats.<BASE>.<metric>/ plus its rolling state:
+#   state.json  {"windows", "last_date", "values": [last 250 sealed values],
+#                "dates": [their YYYYMMDD]}
+# A run only computes the days after last_date. A sealed value that the
+# basis payload has since revised (or a day that gained or lost its value)
+# inside the stored window rolls the state back to the day before the
+# first change and recomputes from there; a state without dates is rebuilt. For one new day the
+# windows are rebuilt from the stored values (O(w log w)) and the day is
+# pushed through RollingWindows (Welford mean/stdev, rank from a sorted
+# window); a backlog (first run, catch-up) is computed with NumPy over the
+# stored values plus the new ones. Days that may still be revised
+# (today) are written but not folded into the state, so the next run
+# recomputes them. Days without a value are kept with NaN stats and do not
+# count towards a window.
+
+WINDOWS = (20, 60, 250)
+STATS = ("mean", "std", "z", "pct")
+BASES = ("IH", "IF", "IC", "IM")
+# metric -> basis cache it is read from (main-contract L1 leg)
+SOURCES = {
+    "annualized_basis_pct": "basis_timeseries_cache",
+    "basis_diff": "basis_diff_timeseries_cache",
+}
+
+
+def stat_fields(windows=WINDOWS):
+    fields = [{"name": "value", "dtype": "<f8", "missing": "null"}]
+    return fields + [{"name": f"{s}_{w}", "dtype": "<f8", "missing": "null"} for w in windows for s in STATS]
+
+
+def series_points(payload, base: str, metric: str):
+    # [(YYYYMMDD, float or None)] in date order from a basis payload
+    out = {}
+    for r in ((payload or {}).get("data") or {}).get(base) or []:
+        ymd = str(r.get("date") or "").replace("-", "")
+        v = r.get(metric)
+        if ymd:
+            out[ymd] = float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v) else None
+    return sorted(out.items())
+
+
+class RollingWindows:
+    # Last max(windows) values with a running mean and sum of squared
+    # deviations (Welford, updated in place as values enter and leave) and
+    # a sorted copy per window. Rebuilt from the stored values on each run.
+    def __init__(self, windows=WINDOWS, values=()):
+        self.windows = tuple(windows)
+        self.values = deque()
+        self.mean = {w: 0.0 for w in self.windows}
+        self.m2 = {w: 0.0 for w in self.windows}
+        self.sorted = {w: [] for w in self.windows}
+        for x in values:
+            self.push(x)
+
+    def push(self, x: float) -> dict:
+        # Add x and return its stats ({"mean_20": ...}); NaN while a window
+        # is not full yet
+        self.values.append(x)
+        n = len(self.values)
+        out = {}
+        for w in self.windows:
+            mean = self.mean[w]
+            bisect.insort(self.sorted[w], x)
+            if n > w:
+                # Slide: x replaces the value leaving the window
+                old = self.values[-w - 1]
+                new_mean = mean + (x - old) / w
+                self.m2[w] += (x - old) * (x - new_mean + old - mean)
+                del self.sorted[w][bisect.bisect_left(self.sorted[w], old)]
+            else:
+                new_mean = mean + (x - mean) / n
+                self.m2[w] += (x - mean) * (x - new_mean)
+            self.mean[w] = new_mean
+            if n < w:
+                out.update({f"{s}_{w}": math.nan for s in STATS})
+                continue
+            std = math.sqrt(max(self.m2[w], 0.0) / (w - 1))
+            out[f"mean_{w}"] = new_mean
+            out[f"std_{w}"] = std
+            out[f"z_{w}"] = (x - new_mean) / std if std > 0 else math.nan
+            out[f"pct_{w}"] = bisect.bisect_right(self.sorted[w], x) * 100.0 / w
+        if n > max(self.windows):
+            self.values.popleft()
+        return out
+
+
+def rolling_frame(values, windows=WINDOWS, start: int = 0) -> dict:
+    # Vectorized stats for values[start:], each over the observations
+    # ending at that position: {"mean_20": array, ...}
+    arr = np.asarray(values, dtype="float64")
+    n = len(arr) - start
+    out = {}
+    for w in windows:
+        cols = {s: np.full(n, np.nan) for s in STATS}
+        first = max(start, w - 1)
+        if len(arr) >= w and first < len(arr):
+            win = np.lib.stride_tricks.sliding_window_view(arr, w)[first - (w - 1):]
+            x = arr[first:]
+            mean = win.mean(axis=1)
+            std = win.std(axis=1, ddof=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                z = np.where(std > 0, (x - mean) / std, np.nan)
+            pct = (win <= x[:, None]).sum(axis=1) * 100.0 / w
+            for s, col in (("mean", mean), ("std", std), ("z", z), ("pct", pct)):
+                cols[s][first - start:] = col
+        for s in STATS:
+            out[f"{s}_{w}"] = cols[s]
+    return out
+
+
+class SeriesStats:
+    def __init__(self, key: str, windows=WINDOWS, root=None):
+        self.key = key
+        self.windows = tuple(windows)
+        self.fields = stat_fields(self.windows)
+        self.cache = ColumnarCache(f"basis_stats.{key}", root)
+        self.state_path = self.cache.dir / "state.json"
+
+    def _load_state(self):
+        try:
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            if tuple(state.get("windows") or ()) == self.windows:
+                return state
+        except Exception:
+            pass
+        return None
+
+    def _save_state(self, last_date, history):
+        # history: [(YYYYMMDD, value)] of the sealed days with a value
+        self.cache.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(f".{os.getpid()}.tmp")
+        history = list(history)[-max(self.windows):]
+        payload = {
+            "windows": list(self.windows),
+            "last_date": last_date,
+            "values": [x for _, x in history],
+            "dates": [d for d, _ in history],
+        }
+        tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.state_path)
+
+    def _first_revision(self, points, last_date, history):
+        # Earliest date in (first stored date, last_date] where points no
+        # longer match the stored values; None when nothing changed
+        if not history:
+            return None
+        start = history[0][0]
+        now = [(d, x) for d, x in points if start <= d <= last_date and x is not None]
+        for (d0, x0), (d1, x1) in zip(history, now):
+            if d0 != d1 or x0 != x1:
+                return min(d0, d1)
+        if len(now) != len(history):
+            return (now if len(now) > len(history) else history)[min(len(now), len(history))][0]
+        return None
+
+    def update(self, points, rebuild: bool = False) -> dict:
+        # points: [(YYYYMMDD, value or None)] ascending. Returns
+        # {"mode": "noop" | "incremental" | "vectorized", "rows": n}
+        state = None if rebuild else self._load_state()
+        if state is not None and state.get("last_date") and "dates" not in state:
+            # Written before dates were stored; revisions cannot be located
+            return self.update(points, rebuild=True)
+        last_date = state.get("last_date") if state else None
+        history = list(zip(state.get("dates") or [], state.get("values") or [])) if state else []
+        changed = self._first_revision(points, last_date, history) if last_date else None
+        if changed is not None:
+            # Roll back to the day before the first revised one
+            trace.count("basis_stats.revised")
+            before = [(d, x) for d, x in points if d < changed]
+            if not before:
+                return self.update(points, rebuild=True)
+            last_date = before[-1][0]
+            history = [(d, x) for d, x in before if x is not None][-max(self.windows):]
+        new = [(d, x) for d, x in points if last_date is None or d > last_date]
+        if not new:
+            return {"mode": "noop", "rows": 0}
+        sealed = sealed_through()
+        present = [x for _, x in new if x is not None]
+        rows = {f["name"]: np.full(len(new), np.nan) for f in self.fields}
+        rows["value"] = np.asarray([math.nan if x is None else x for _, x in new], dtype="float64")
+        idx = [i for i, (_, x) in enumerate(new) if x is not None]
+
+        if len(present) <= 1:
+            mode = "incremental"
+            rw = RollingWindows(self.windows, [x for _, x in history])
+            for i in idx:
+                for name, v in rw.push(new[i][1]).items():
+                    rows[name][i] = v
+        else:
+            mode = "vectorized"
+            frame = rolling_frame([x for _, x in history] + present, self.windows, start=len(history))
+            for name, col in frame.items():
+                rows[name][idx] = col
+
+        # Only sealed days enter the state
+        committed = history + [(d, x) for d, x in new if x is not None and d <= sealed]
+        sealed_dates = [d for d, _ in new if d <= sealed]
+        dates = [d for d, _ in new]
+        columns = {(self.key, f["name"]): rows[f["name"]] for f in self.fields}
+        if state is None or not self.cache.append(dates, columns):
+            if state is not None:
+                # Stored layout no longer matches; recompute everything
+                return self.update(points, rebuild=True)
+            self.cache.write(dates, columns, [self.key], self.fields)
+        if sealed_dates:
+            self._save_state(sealed_dates[-1], committed)
+        elif state is None:
+            self._save_state(None, [])
+        return {"mode": mode, "rows": len(new)}
+
+    def read(self, start=None, end=None):
+        # [{"date", "value", "w20": {"mean", "std", "z", "pct"}, ...}]
+        got = self.cache.read(start, end)
+        if got is None:
+            return []
+        dates, columns, _ = got
+        cols = {f["name"]: columns[(self.key, f["name"])].tolist() for f in self.fields}
+
+        def num(v):
+            return v if v == v and math.isfinite(v) else None
+
+        out = []
+        for i, d in enumerate(dates.tolist()):
+            row = {"date": f"{d // 10000:04d}-{d // 100 % 100:02d}-{d % 100:02d}", "value": num(cols["value"][i])}
+            for w in self.windows:
+                row[f"w{w}"] = {s: num(cols[f"{s}_{w}"][i]) for s in STATS}
+            out.append(row)
+        return out
+
+
+def update_all(payloads: dict, rebuild: bool = False, root=None) -> dict:
+    # payloads: {cache name: payload}, e.g. timeseries_caches() output keyed
+    # without ".json". Returns {"<BASE>.<metric>": {"mode", "rows"}}.
+    out = {}
+    for metric, source in SOURCES.items():
+        payload = payloads.get(source)
+        if payload is None:
+            continue
+        for base in BASES:
+            key = f"{base}.{metric}"
+            out[key] = SeriesStats(key, root=root).update(series_points(payload, base, metric), rebuild=rebuild)
+    return out
@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from marketdata import trace
+from marketdata.fut_daily_query import FutDailyQuery
+from marketdata.paths import data_dir
+from marketdata.series_store import sealed_through
+
+# Daily history of the whole CFFEX board (every dated and continuous
+# contract), one fut_daily call per trade_date, kept under
+# data/cffex_history/:
+#   chunks/<YYYYMM>.json  {"fields": [...], "rows": [[...]], "days": {ymd: rows}}
+#   checkpoint.json       {"chunks": {"<YYYYMM>": {"rows", "days", "at"}}}
+# A chunk is one whole calendar month (cut at today). It is checkpointed once
+# every open day in it was answered, the month has ended and it holds rows,
+# so an interrupted or failed run resumes with the missing months only.
+# Days are asked for through FutDailyQuery, in its exchange= variant order.
+
+BOARD_FIELDS = "ts_code,trade_date,pre_close,pre_settle,open,high,low,close,settle,vol,amount,oi,oi_chg"
+# IF listed 2010-04-16; IH/IC 2015-04-16, IM 2022-07-22
+CFFEX_INCEPTION = "20100416"
+
+
+def _ymd(d: datetime) -> str:
+    return d.strftime("%Y%m%d")
+
+
+def month_chunks(start: str, end: str):
+    # [(first, last)] of every calendar month touching [start, end]; the
+    # current month ends today
+    out = []
+    today = _ymd(datetime.today())
+    d = datetime.strptime(start, "%Y%m%d").replace(day=1)
+    last = datetime.strptime(min(end, today), "%Y%m%d")
+    while d <= last:
+        nxt = (d + timedelta(days=32)).replace(day=1)
+        out.append((_ymd(d), min(today, _ymd(nxt - timedelta(days=1)))))
+        d = nxt
+    return out
+
+
+def chunk_key(chunk) -> str:
+    return chunk[0][:6]
+
+
+class BoardHistory:
+    def __init__(self, root=None):
+        self.root = root or data_dir() / "cffex_history"
+        self.checkpoint_path = self.root / "checkpoint.json"
+        self._lock = threading.Lock()
+
+    def _chunk_path(self, chunk):
+        return self.root / "chunks" / f"{chunk_key(chunk)}.json"
+
+    def _write_json(self, path, payload):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def completed(self) -> dict:
+        try:
+            state = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+            return dict(state.get("chunks") or {})
+        except Exception:
+            return {}
+
+    def pending(self, start: str, end: str):
+        done = self.completed()
+        return [c for c in month_chunks(start, end) if chunk_key(c) not in done or not self._chunk_path(c).exists()]
+
+    def _mark_done(self, chunk, rows: int, days: int):
+        with self._lock:
+            done = self.completed()
+            done[chunk_key(chunk)] = {"rows": rows, "days": days, "at": int(time.time())}
+            self._write_json(self.checkpoint_path, {"chunks": dict(sorted(done.items()))})
+
+    def fetch_chunk(self, pro, chunk, days, query=None):
+        # -> (rows, sealed). Every day is asked for; a failed call raises so
+        # the chunk stays pending. Empty days (holidays, before listing) are
+        # recorded with 0 rows. backfill passes one query shared by its
+        # workers, so they share the variant hint and its file.
+        fields = BOARD_FIELDS.split(",")
+        query = query or FutDailyQuery(pro)
+        rows = []
+        per_day = {}
+        for ymd in days:
+            with trace.span("board_day", trade_date=ymd):
+                df = query.fetch(None, ymd, strict=True, trade_date=ymd, fields=BOARD_FIELDS)
+            n = 0
+            if df is not None and "ts_code" in df.columns:
+                # Without exchange= the answer covers every exchange
+                df = df[df["ts_code"].astype(str).str.endswith(".CFX")]
+            if df is not None and not df.empty:
+                df = df[[f for f in fields if f in df.columns]].reindex(columns=fields)
+                values = df.astype(object).where(df.notna(), None).values.tolist()
+                rows += values
+                n = len(values)
+            per_day[ymd] = n
+        self._write_json(self._chunk_path(chunk), {"fields": fields, "rows": rows, "days": per_day})
+        return rows, chunk[1] <= sealed_through()
+
+    def backfill(self, pro, start: str, end: str, open_days=None, workers: int = 4, progress=None):
+        # open_days(first, last) -> trading days in the chunk (weekdays when
+        # None). Returns a summary dict; progress(msg) gets one line per chunk.
+        chunks = month_chunks(start, end)
+        todo = self.pending(start, end)
+        summary = {"chunks": len(chunks), "skipped": len(chunks) - len(todo), "fetched": 0, "rows": 0, "days": 0, "errors": {}}
+        t0 = time.perf_counter()
+        query = FutDailyQuery(pro)
+
+        def run(chunk):
+            if open_days is not None:
+                days = open_days(*chunk)
+            else:
+                days = [c for c in _days(*chunk) if datetime.strptime(c, "%Y%m%d").weekday() < 5]
+            rows, sealed = self.fetch_chunk(pro, chunk, days, query)
+            # A finished month without a single row is more likely a bad
+            # answer than a month without trading; leave it pending
+            if sealed and rows:
+                self._mark_done(chunk, len(rows), len(days))
+            return len(rows), len(days)
+
+        ex = ThreadPoolExecutor(max_workers=max(1, workers))
+        try:
+            futs = {ex.submit(run, c): c for c in todo}
+            for fut in as_completed(futs):
+                chunk = futs[fut]
+                key = chunk_key(chunk)
+                try:
+                    rows, days = fut.result()
+                except Exception as e:
+                    summary["errors"][key] = str(e)
+                    continue
+                summary["fetched"] += 1
+                summary["rows"] += rows
+                summary["days"] += days
+                if progress is not None:
+                    elapsed = time.perf_counter() - t0
+                    progress(f"{key}: {rows} rows / {days} days; {summary['fetched']}/{len(todo)} chunks, {summary['rows'] / elapsed:.0f} rows/s")
+        finally:
+            # On Ctrl-C finished months are already checkpointed; queued ones are dropped
+            ex.shutdown(wait=True, cancel_futures=True)
+        elapsed = time.perf_counter() - t0
+        summary["elapsed_s"] = round(elapsed, 2)
+        summary["rows_per_s"] = round(summary["rows"] / elapsed, 1) if elapsed > 0 else None
+        return summary
+
+    def read(self, start: str, end: str, products=None):
+        # DataFrame of stored rows in [start, end], optionally only these
+        # products (IF, IH, ...), sorted by trade_date then ts_code
+        import pandas as pd
+
+        frames = []
+        for chunk in month_chunks(start, end):
+            try:
+                payload = json.loads(self._chunk_path(chunk).read_text(encoding="utf-8"))
+            except Exception:
+                continue
+            frames.append(pd.DataFrame(payload.get("rows") or [], columns=payload.get("fields") or BOARD_FIELDS.split(",")))
+        if not frames:
+            return pd.DataFrame(columns=BOARD_FIELDS.split(","))
+        df = pd.concat(frames, ignore_index=True)
+        dates = df["trade_date"].astype(str)
+        df = df[(dates >= start) & (dates <= end)]
+        if products is not None:
+            from marketdata.contract_select import parse_ts_codes
+
+            df = df[parse_ts_codes(df["ts_code"])["product"].isin(list(products))]
+        return df.drop_duplicates(["ts_code", "trade_date"], keep="last").sort_values(["trade_date", "ts_code"]).reset_index(drop=True)
+
+
+def _days(first: str, last: str):
+    d = datetime.strptime(first, "%Y%m%d")
+    end = datetime.strptime(last, "%Y%m%d")
+    out = []
+    while d <= end:
+        out.append(_ymd(d))
+        d += timedelta(days=1)
+    return out
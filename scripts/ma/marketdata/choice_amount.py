@@ -0,0 +1,230 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+from marketdata import trace
+from marketdata.contract_registry import categorize, get_registry
+from marketdata.heatmap_history import HeatmapHistory
+from marketdata.paths import data_dir
+
+BASE_FIELDS = ["NAME", "CLEARDIFFERRANGE", "AMOUNT"]
+# Substitutes for a missing AMOUNT, in order of preference; CLOSE*VOLUME last
+FALLBACK_FIELDS = ["TURNOVER", "VALUE", "CLOSE", "VOLUME"]
+
+# Heatmap codes list from dashboard
+CODES = "A0.DCE,AD0.SHF,AG0.SHF,AL0.SHF,AO0.SHF,AP0.CZC,AU0.SHF,B0.DCE,BB0.DCE,BCM.INE,BR0.SHF,BU0.SHF,BZ0.DCE,C0.DCE,CF0.CZC,CJ0.CZC,CS0.DCE,CU0.SHF,CY0.CZC,EB0.DCE,ECM.INE,EG0.DCE,FB0.DCE,FG0.CZC,FU0.SHF,HC0.SHF,I0.DCE,J0.DCE,JD0.DCE,JM0.DCE,JR0.CZC,L0.DCE,LCM.GFE,LF0.DCE,LG0.DCE,LH0.DCE,LR0.CZC,LUM.INE,M0.DCE,MA0.CZC,NI0.SHF,NRM.INE,OI0.CZC,OP0.SHF,P0.DCE,PB0.SHF,PDM.GFE,PF0.CZC,PG0.DCE,PK0.CZC,PL0.CZC,PM0.CZC,PP0.DCE,PPF0.DCE,PR0.CZC,PSM.GFE,PTM.GFE,PX0.CZC,RB0.SHF,RI0.CZC,RM0.CZC,RR0.DCE,RS0.CZC,RU0.SHF,SA0.CZC,SCM.INE,SF0.CZC,SH0.CZC,SIM.GFE,SM0.CZC,SN0.SHF,SP0.SHF,SR0.CZC,SS0.SHF,TA0.CZC,UR0.CZC,V0.DCE,VF0.DCE,WH0.CZC,WR0.SHF,Y0.DCE,ZC0.CZC,ZN0.SHF"
+
+
+def _to_float(v):
+    try:
+        if v is None:
+            return None
+        if isinstance(v, (int, float)):
+            return float(v)
+        if isinstance(v, bytes):
+            v = v.decode('utf-8', errors='ignore')
+        s = str(v).strip().replace(',', '').replace('%', '')
+        if s == '' or s.lower() in ('none', 'nan'):
+            return None
+        return float(s)
+    except Exception:
+        return None
+
+
+def _to_str(v):
+    try:
+        if v is None:
+            return None
+        if isinstance(v, bytes):
+            return v.decode('utf-8', errors='ignore').strip()
+        return str(v)
+    except Exception:
+        return None
+
+
+def _positive(v) -> bool:
+    return isinstance(v, (int, float)) and v > 0
+
+
+def field_values(data_obj, fields, name):
+    # {code: raw value} for one indicator across the three css shapes:
+    # dict keyed by code (values in request order), dict keyed by field,
+    # or list-of-lists aligned with Fields.
+    codes = list(getattr(data_obj, 'Codes', None) or [])
+    Data = getattr(data_obj, 'Data', None)
+    Fields = getattr(data_obj, 'Fields', None) or getattr(data_obj, 'Field', None)
+    out = {}
+    try:
+        if isinstance(Data, dict) and any((code in Data) for code in codes):
+            idx = [f.upper() for f in fields].index(name)
+            for code in codes:
+                vals = Data.get(code)
+                if isinstance(vals, (list, tuple)) and idx < len(vals):
+                    out[code] = vals[idx]
+            return out
+        series = None
+        if isinstance(Data, dict):
+            series = Data.get(name) or Data.get(name.lower())
+        elif isinstance(Data, (list, tuple)) and isinstance(Fields, (list, tuple)):
+            flds = [str(f).upper() for f in Fields]
+            if name in flds and flds.index(name) < len(Data):
+                series = Data[flds.index(name)]
+        for i, v in enumerate(list(series or [])):
+            if i < len(codes):
+                out[codes[i]] = v
+    except Exception:
+        pass
+    return out
+
+
+def fill_amounts(items, data_obj, fields):
+    # Fill non-positive amounts per code from whatever substitutes data_obj
+    # carries, recording the source that supplied each value.
+    have = set(f.upper() for f in fields)
+    series = {f: field_values(data_obj, fields, f) for f in FALLBACK_FIELDS if f in have}
+    for it in items:
+        if _positive(it.get('amount')):
+            continue
+        code = it.get('code')
+        for f in ("TURNOVER", "VALUE"):
+            v = _to_float(series.get(f, {}).get(code))
+            if _positive(v):
+                it['amount'] = v
+                it['amount_source'] = f
+                break
+        else:
+            cv = _to_float(series.get("CLOSE", {}).get(code))
+            vv = _to_float(series.get("VOLUME", {}).get(code))
+            if _positive(cv) and _positive(vv):
+                it['amount'] = cv * vv
+                it['amount_source'] = "CLOSE*VOLUME"
+
+
+def fetch_amounts(c, codes: str, opts: str, normalize):
+    # Plan: one css with base + substitute indicators covers the common case
+    # in a single round trip. If the vendor rejects the combined indicator
+    # set, fetch base fields and re-query substitutes only for the codes
+    # whose amount is still missing. Returns (first css result, items).
+    fields = BASE_FIELDS + FALLBACK_FIELDS
+    try:
+        data = c.css(codes, ",".join(fields), opts)
+    except Exception:
+        data = None
+    if data is None or getattr(data, "ErrorCode", 0) != 0:
+        trace.count("choice.base_fields_only")
+        fields = BASE_FIELDS
+        data = c.css(codes, ",".join(fields), opts)
+        if getattr(data, "ErrorCode", 0) != 0:
+            return data, None
+    items = normalize(data)
+    for it in items:
+        it['amount_source'] = "AMOUNT" if _positive(it.get('amount')) else None
+    fill_amounts(items, data, fields)
+    missing = [it for it in items if not _positive(it.get('amount'))]
+    if missing and fields == BASE_FIELDS:
+        trace.count("choice.fallback_requery")
+        try:
+            data2 = c.css(",".join(it['code'] for it in missing), ",".join(FALLBACK_FIELDS), opts)
+            if getattr(data2, "ErrorCode", 0) == 0:
+                fill_amounts(missing, data2, FALLBACK_FIELDS)
+        except Exception:
+            pass
+    return data, items
+
+
+def source_counts(items):
+    counts = {}
+    for it in items or []:
+        key = it.get('amount_source') or "missing"
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def heatmap_codes() -> str:
+    # CODES plus the main contract of every commodity product the registry
+    # lists, so new listings show up without editing CODES
+    codes = CODES.split(",")
+    seen = set(codes)
+    for code in get_registry().main_codes():
+        if code not in seen:
+            codes.append(code)
+            seen.add(code)
+    return ",".join(codes)
+
+
+def normalize_items(data):
+    # Normalize supporting three shapes: dict-of-fields, list-of-lists, dict keyed by codes -> [NAME, RET, AMT]
+    Codes = list(getattr(data, 'Codes', []) or [])
+    Data = getattr(data, 'Data', {}) or {}
+    Fields = getattr(data, 'Fields', None) or getattr(data, 'Field', None)
+    def pick(dic, key):
+        return dic.get(key) or dic.get(key.lower()) if isinstance(dic, dict) else None
+    items = []
+    if isinstance(Data, dict) and any((code in Data) for code in Codes):
+        for code in Codes:
+            vals = Data.get(code)
+            name = _to_str(vals[0]) if isinstance(vals, (list, tuple)) and len(vals) > 0 else None
+            ret = _to_float(vals[1]) if isinstance(vals, (list, tuple)) and len(vals) > 1 else None
+            amt = _to_float(vals[2]) if isinstance(vals, (list, tuple)) and len(vals) > 2 else None
+            items.append({'code': code, 'name': name, 'return_pct': ret, 'amount': amt})
+    else:
+        names = []; rets = []; amts = []
+        if isinstance(Data, dict):
+            names = pick(Data, 'NAME') or []
+            rets = pick(Data, 'CLEARDIFFERRANGE') or []
+            amts = pick(Data, 'AMOUNT') or []
+        elif isinstance(Data, (list, tuple)) and isinstance(Fields, (list, tuple)):
+            flds = [(_to_str(f) or '').upper() for f in Fields]
+            def series_by_name(name: str):
+                try:
+                    idx = flds.index(name)
+                    return list(Data[idx]) if idx >= 0 and idx < len(Data) else []
+                except Exception:
+                    return []
+            names = series_by_name('NAME')
+            rets = series_by_name('CLEARDIFFERRANGE')
+            amts = series_by_name('AMOUNT')
+        for i, code in enumerate(Codes):
+            items.append({
+                'code': code,
+                'name': _to_str(names[i]) if i < len(names) else None,
+                'return_pct': _to_float(rets[i]) if i < len(rets) else None,
+                'amount': _to_float(amts[i]) if i < len(amts) else None,
+            })
+    return items
+
+
+def build_payload(trade_date, items):
+    # Group
+    groups = {}
+    total = 0.0
+    for it in items:
+        cat = categorize(it['code'])
+        amt = it['amount'] if isinstance(it['amount'], (int,float)) else 0.0
+        total += amt
+        display = it['name'] if it['name'] else it['code']
+        groups.setdefault(cat, { 'name': cat, 'children': [] })
+        groups[cat]['children'].append({ 'name': display, 'value': amt, 'ret': it['return_pct'] })
+    return { 'trade_date': trade_date, 'total_amount': total, 'data': list(groups.values()) }
+
+
+def write_payload(payload, out_file=None):
+    # Write to data/commodity_amount_heatmap.json (MA_DATA_DIR aware) or out_file
+    out_file = Path(out_file) if out_file else data_dir() / 'commodity_amount_heatmap.json'
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_file.with_suffix(f'.{os.getpid()}.tmp')
+    tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+    os.replace(tmp, out_file)
+
+
+def record_history(trade_date, items):
+    # Append the day to data/heatmap_history/ (HEATMAP_HISTORY_DISABLE=1 skips)
+    if os.environ.get("HEATMAP_HISTORY_DISABLE") == "1":
+        return
+    try:
+        HeatmapHistory().append(trade_date, [dict(it, sector=categorize(it['code'])) for it in items])
+    except Exception as e:
+        # Never fails the refresh, but a lost day must be visible
+        trace.count("heatmap_history.write_failed")
+        print(f"heatmap history append failed for {trade_date}: {e}", file=sys.stderr)
@@ -0,0 +1,48 @@
+import importlib
+import os
+
+from marketdata.trace import traced
+
+# Client factories. Every entry point gets its Tushare pro_api and EmQuant `c`
+# from here, so another implementation (the fakes in marketdata.fakes, a
+# recorder) can be swapped in without touching the scripts:
+#   MA_TUSHARE_FACTORY=module:callable   called with the token, returns pro
+#   MA_EMQ_FACTORY=module:callable       called without arguments, returns c
+# set_factory() does the same in-process and takes precedence over the env.
+# With MA_TRACE set the clients come back wrapped by marketdata.trace.
+
+_factories = {}
+
+
+def set_factory(kind: str, fn):
+    # kind is "tushare" or "emquant"; None restores the default client
+    if fn is None:
+        _factories.pop(kind, None)
+    else:
+        _factories[kind] = fn
+
+
+def _from_env(name: str):
+    spec = os.environ.get(name)
+    if not spec:
+        return None
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr or "factory")
+
+
+def tushare_api(token):
+    fn = _factories.get("tushare") or _from_env("MA_TUSHARE_FACTORY")
+    if fn is not None:
+        return traced(fn(token), "tushare")
+    import tushare as ts
+
+    return traced(ts.pro_api(token), "tushare")
+
+
+def emquant_client():
+    fn = _factories.get("emquant") or _from_env("MA_EMQ_FACTORY")
+    if fn is not None:
+        return traced(fn(), "emquant")
+    import EmQuantAPI as Emq  # type: ignore
+
+    return traced(Emq.c, "emquant")
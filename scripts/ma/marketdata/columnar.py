@@ -0,0 +1,173 @@
+import json
+import os
+
+import numpy as np
+
+from marketdata.paths import data_dir
+
+# Column store for the basis time-series caches. One directory per cache:
+#   meta.json        rows, series, fields (name/dtype/missing) and header keys
+#   dates.i4         sorted trade dates as little-endian int32 YYYYMMDD
+#   <series>.<field> one little-endian column per (series, field)
+# Columns are plain arrays, so readers memory-map them and only touch the
+# rows of the date range they slice. Readers only ever see whole files:
+#   - new days after the stored ones are written past the end of the live
+#     files, then meta.json raises "rows" (readers stop at the old count);
+#   - anything that replaces stored rows writes a new generation ("gen" in
+#     meta.json, files suffixed .<gen>) and switches meta.json to it. The
+#     previous generation is kept for readers still on the old meta.json.
+
+DATES_DTYPE = "<i4"
+
+
+class ColumnarCache:
+    def __init__(self, name: str, root=None):
+        self.dir = (root or data_dir() / "columnar") / name
+
+    def _path(self, fname: str, gen: int = 0):
+        return self.dir / (f"{fname}.{gen}" if gen else fname)
+
+    def _files(self, meta):
+        return ["dates.i4"] + [self.col_file(s, f["name"]) for f in meta["fields"] for s in meta["series"]]
+
+    def col_file(self, series: str, field: str) -> str:
+        return f"{series}.{field}"
+
+    def meta(self):
+        try:
+            meta = json.loads(self._path("meta.json").read_text(encoding="utf-8"))
+            if isinstance(meta, dict) and meta.get("version") == 1:
+                return meta
+        except Exception:
+            pass
+        return None
+
+    def _write_meta(self, meta: dict):
+        tmp = self._path(f"meta.json.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self._path("meta.json"))
+
+    def set_head(self, head: dict):
+        # Replace the header keys only (rows unchanged)
+        meta = self.meta()
+        if meta is not None and meta.get("head") != head:
+            meta["head"] = head
+            self._write_meta(meta)
+
+    def _rows_on_disk(self, meta) -> int:
+        # meta.json is written last, so bound `rows` by what is on disk
+        n = meta.get("rows") or 0
+        try:
+            n = min(n, os.path.getsize(self._path("dates.i4", meta.get("gen") or 0)) // np.dtype(DATES_DTYPE).itemsize)
+        except OSError:
+            return 0
+        return n
+
+    def write(self, dates, columns: dict, series, fields, head=None, nested=False):
+        # Full rewrite into a new generation. dates: sorted YYYYMMDD;
+        # columns: {(series, field): array}
+        self.dir.mkdir(parents=True, exist_ok=True)
+        old = self.meta()
+        gen = (old.get("gen") or 0) + 1 if old else 0
+        meta = {
+            "version": 1,
+            "gen": gen,
+            "rows": len(dates),
+            "series": list(series),
+            "fields": list(fields),
+            "nested": nested,
+            "head": head or {},
+        }
+        files = [("dates.i4", np.asarray([int(d) for d in dates], dtype=DATES_DTYPE))]
+        for f in fields:
+            for s in series:
+                files.append((self.col_file(s, f["name"]), np.asarray(columns[(s, f["name"])], dtype=f["dtype"])))
+        for fname, arr in files:
+            tmp = self._path(f"{fname}.{os.getpid()}.tmp")
+            arr.tofile(tmp)
+            os.replace(tmp, self._path(fname, gen))
+        self._write_meta(meta)
+        if old:
+            self._drop_generations(old, keep=(gen, old.get("gen") or 0))
+
+    def _drop_generations(self, meta, keep):
+        # Files of generations older than the two in `keep`
+        names = set(self._files(meta))
+        for p in self.dir.iterdir():
+            base, _, suffix = p.name.rpartition(".")
+            if base in names and suffix.isdigit() and int(suffix) not in keep:
+                p.unlink(missing_ok=True)
+            elif p.name in names and 0 not in keep:
+                p.unlink(missing_ok=True)
+
+    def bounds(self):
+        # (first, last) stored YYYYMMDD as ints, or None when empty
+        meta = self.meta()
+        n = self._rows_on_disk(meta) if meta else 0
+        if n == 0:
+            return None
+        dates = np.memmap(self._path("dates.i4", meta.get("gen") or 0), dtype=DATES_DTYPE, mode="r", shape=(n,))
+        return int(dates[0]), int(dates[-1])
+
+    def append(self, dates, columns: dict, head=None) -> bool:
+        # Add rows for new days. Stored rows dated on/after dates[0] are
+        # replaced (the latest day may have been revised); rows before it
+        # are kept as they are, so the caller must only pass dates[0] at or
+        # before the first row that changed. Returns False when nothing is
+        # stored yet or the column layout differs, so the caller writes the
+        # cache in full instead.
+        meta = self.meta()
+        if meta is None or not len(dates):
+            return False
+        if any((s, f["name"]) not in columns for s in meta["series"] for f in meta["fields"]):
+            return False
+        gen = meta.get("gen") or 0
+        n = self._rows_on_disk(meta)
+        stored = np.memmap(self._path("dates.i4", gen), dtype=DATES_DTYPE, mode="r", shape=(n,)) if n else np.zeros(0, dtype=DATES_DTYPE)
+        new_dates = np.asarray([int(d) for d in dates], dtype=DATES_DTYPE)
+        keep = int(np.searchsorted(stored, new_dates[0], side="left"))
+        del stored
+        parts = [("dates.i4", new_dates)]
+        parts += [(self.col_file(s, f["name"]), np.asarray(columns[(s, f["name"])], dtype=f["dtype"])) for s in meta["series"] for f in meta["fields"]]
+        if keep < n:
+            # Stored rows change: copy the kept prefix into a new generation
+            full = {}
+            for fname, arr in parts:
+                prefix = np.fromfile(self._path(fname, gen), dtype=arr.dtype, count=keep)
+                full[fname] = np.concatenate([prefix, arr])
+            cols = {(s, f["name"]): full[self.col_file(s, f["name"])] for s in meta["series"] for f in meta["fields"]}
+            dates_out = [str(d) for d in full["dates.i4"].tolist()]
+            self.write(dates_out, cols, meta["series"], meta["fields"], head=meta["head"] if head is None else head, nested=meta.get("nested"))
+            return True
+        # Only new days: extend the live files past the rows readers use
+        for fname, arr in parts:
+            with open(self._path(fname, gen), "r+b") as fh:
+                fh.seek(keep * arr.dtype.itemsize)
+                arr.tofile(fh)
+                fh.truncate()
+        meta["rows"] = keep + len(new_dates)
+        if head is not None:
+            meta["head"] = head
+        self._write_meta(meta)
+        return True
+
+    def read(self, start=None, end=None, series=None, fields=None):
+        # (dates, {(series, field): array}, meta) for start <= date <= end,
+        # reading through memory maps so untouched rows are never loaded.
+        meta = self.meta()
+        if meta is None:
+            return None
+        n = self._rows_on_disk(meta)
+        names = set(fields) if fields else None
+        wanted = [(s, f) for s in series or meta["series"] for f in meta["fields"] if names is None or f["name"] in names]
+        if n == 0:
+            return np.zeros(0, dtype=DATES_DTYPE), {(s, f["name"]): np.zeros(0, dtype=f["dtype"]) for s, f in wanted}, meta
+        gen = meta.get("gen") or 0
+        dates = np.memmap(self._path("dates.i4", gen), dtype=DATES_DTYPE, mode="r", shape=(n,))
+        i0 = int(np.searchsorted(dates, int(start), side="left")) if start else 0
+        i1 = int(np.searchsorted(dates, int(end), side="right")) if end else n
+        out = {}
+        for s, f in wanted:
+            col = np.memmap(self._path(self.col_file(s, f["name"]), gen), dtype=f["dtype"], mode="r", shape=(n,))
+            out[(s, f["name"])] = np.array(col[i0:i1])
+        return np.array(dates[i0:i1]), out, meta
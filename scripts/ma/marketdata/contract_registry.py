@@ -0,0 +1,213 @@
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from marketdata import trace
+from marketdata.paths import data_dir
+
+# Futures product metadata (exchange, sector, multiplier, tick size, listing
+# status) kept in data/contract_registry.json and refreshed from Tushare's
+# fut_basic listing. Lookups go through reverse indexes built once per load:
+#   prefix -> sector, code -> product, product -> EmQuant main code
+# so classifying a contract is a dict lookup. Codes not in the listing
+# still resolve through the prefix rule, memoized per code.
+#   CONTRACT_REGISTRY_MAX_AGE_HOURS  refresh() is a no-op younger than this
+#                                    (default 168)
+
+SECTOR_RULES = {
+    # 农产
+    "农产": {"C", "CS", "WH", "PM", "RR", "RI", "JR", "LR", "A", "B", "M", "Y", "RM", "OI", "RS", "PK", "P", "SR", "CF", "CY", "AP", "CJ", "LH", "JD", "LG", "SP", "OP"},
+    # 贵金属
+    "贵金属": {"AU", "AG", "PT", "PD"},
+    # 有色
+    "有色": {"CU", "BC", "AL", "AO", "AD", "ZN", "PB", "NI", "SN"},
+    # 新能源
+    "新能源": {"LC", "PS", "SI"},
+    # 黑色
+    "黑色": {"I", "SF", "SM", "RB", "HC", "SS", "WR", "JM", "J", "ZC", "FG", "BB", "FB"},
+    # 能源化工
+    "能源化工": {"SC", "FU", "LU", "PG", "BU", "TA", "EG", "PF", "PR", "PL", "PP", "L", "BZ", "PX", "EB", "RU", "BR", "NR", "SA", "SH", "V", "UR", "MA"},
+    # 航运
+    "航运": {"EC"},
+    # 股指
+    "股指": {"IH", "IF", "IC", "IM", "MO"},
+    # 国债
+    "国债": {"TS", "TF", "T", "TL"},
+}
+PREFIX_SECTOR = {p: sector for sector, prefixes in SECTOR_RULES.items() for p in prefixes}
+FINANCIAL_SECTORS = {"股指", "国债"}
+OTHER = "其他"
+
+# Tushare exchange -> (fut_basic ts_code suffix, EmQuant suffix)
+EXCHANGES = {
+    "SHFE": ("SHF", "SHF"),
+    "DCE": ("DCE", "DCE"),
+    "CZCE": ("ZCE", "CZC"),
+    "INE": ("INE", "INE"),
+    "GFEX": ("GFE", "GFE"),
+    "CFFEX": ("CFX", "CFE"),
+}
+# EmQuant main-contract codes end in M on these exchanges, 0 elsewhere
+_MAIN_M = {"INE", "GFE"}
+BASIC_FIELDS = "ts_code,exchange,name,fut_code,multiplier,per_unit,quote_unit_desc,list_date,delist_date"
+
+
+def product_prefix(code: str) -> str:
+    head = (code.split(".")[0] or "").upper()
+    # Strip trailing digits
+    p = ''.join([ch for ch in head if not ch.isdigit()])
+    # Remove common single-letter suffixes (M/F/X) only when length > 2
+    if len(p) > 2 and p[-1] in {"M", "F", "X"}:
+        p = p[:-1]
+    return p
+
+
+def main_code(prefix: str, emq_suffix: str) -> str:
+    return f"{prefix}{'M' if emq_suffix in _MAIN_M else '0'}.{emq_suffix}"
+
+
+def _tick(desc):
+    m = re.search(r"\d+(?:\.\d+)?", str(desc or ""))
+    return float(m.group(0)) if m else None
+
+
+def _num(v):
+    try:
+        f = float(v)
+    except Exception:
+        return None
+    return None if f != f else f
+
+
+class ContractRegistry:
+    def __init__(self, path=None):
+        self.path = path or data_dir() / "contract_registry.json"
+        self.fetched_at = None
+        self.products = {}
+        self._code_product = {}
+        self._memo = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        self.fetched_at = state.get("at")
+        self._index(state.get("products") or {}, state.get("contracts") or {})
+
+    def _index(self, products, contracts):
+        self.products = products
+        code_product = dict(contracts)
+        for prefix, meta in products.items():
+            if meta.get("main_code"):
+                code_product[meta["main_code"]] = prefix
+        self._code_product = code_product
+        self._memo = {}
+
+    def _save(self, products, contracts):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        payload = {"at": self.fetched_at, "products": products, "contracts": contracts}
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def stale(self) -> bool:
+        max_age = float(os.environ.get("CONTRACT_REGISTRY_MAX_AGE_HOURS", "168")) * 3600
+        return self.fetched_at is None or time.time() - self.fetched_at > max_age
+
+    def refresh(self, pro, force: bool = False) -> bool:
+        # One fut_basic per exchange; products listed on none of them are
+        # dropped. Returns False when nothing could be fetched.
+        if not force and not self.stale():
+            return True
+        today = datetime.today().strftime("%Y%m%d")
+        products = {}
+        contracts = {}
+        ok = False
+        for exchange, (_, emq_suffix) in EXCHANGES.items():
+            try:
+                with trace.span("fut_basic", exchange=exchange):
+                    df = pro.fut_basic(exchange=exchange, fut_type="1", fields=BASIC_FIELDS)
+            except Exception:
+                continue
+            ok = True
+            if df is None or df.empty:
+                continue
+            for row in df.to_dict("records"):
+                prefix = str(row.get("fut_code") or "").upper() or product_prefix(str(row.get("ts_code") or ""))
+                if not prefix:
+                    continue
+                delist = str(row.get("delist_date") or "")
+                listed = not delist or delist >= today
+                meta = products.get(prefix)
+                if meta is None:
+                    meta = products[prefix] = {
+                        "exchange": exchange,
+                        "sector": PREFIX_SECTOR.get(prefix, OTHER),
+                        "name": re.sub(r"\d+$", "", str(row.get("name") or "")) or prefix,
+                        "multiplier": None,
+                        "tick_size": None,
+                        "listed": False,
+                        "list_date": None,
+                        "main_code": main_code(prefix, emq_suffix),
+                    }
+                meta["multiplier"] = _num(row.get("multiplier")) or _num(row.get("per_unit")) or meta["multiplier"]
+                meta["tick_size"] = _tick(row.get("quote_unit_desc")) or meta["tick_size"]
+                list_date = str(row.get("list_date") or "") or None
+                if list_date and (meta["list_date"] is None or list_date < meta["list_date"]):
+                    meta["list_date"] = list_date
+                if listed:
+                    meta["listed"] = True
+                    contracts[str(row["ts_code"])] = prefix
+        if not ok:
+            return False
+        with self._lock:
+            self.fetched_at = int(time.time())
+            self._save(products, contracts)
+            self._index(products, contracts)
+        return True
+
+    def prefix_of(self, code: str) -> str:
+        prefix = self._code_product.get(code)
+        if prefix is None:
+            prefix = self._memo.get(code)
+            if prefix is None:
+                prefix = self._memo[code] = product_prefix(code)
+        return prefix
+
+    def product(self, code: str):
+        # Metadata dict for the product behind code, or None when unlisted
+        return self.products.get(self.prefix_of(code))
+
+    def sector(self, code: str) -> str:
+        return PREFIX_SECTOR.get(self.prefix_of(code), OTHER)
+
+    def main_codes(self, include_financial: bool = False):
+        # EmQuant main-contract codes of every listed product
+        return sorted(
+            meta["main_code"] for meta in self.products.values()
+            if meta.get("listed") and meta.get("main_code") and (include_financial or meta.get("sector") not in FINANCIAL_SECTORS)
+        )
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ContractRegistry:
+    # Process-wide registry, loaded from disk once
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ContractRegistry()
+    return _registry
+
+
+def categorize(code: str) -> str:
+    return get_registry().sector(code)
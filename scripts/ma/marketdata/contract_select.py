@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+# Grouped contract selection over a fut_daily board (one exchange or all).
+# ts_code is parsed once into product / delivery month; main, near, next and
+# far are then picked for every (exchange, product) with a few sorts instead of one
+# filter+sort per product.
+#   IF2606.CFX -> product IF, month 2606 (dated)
+#   IFL1.CFX   -> product IF, continuous leg L1 (not dated)
+#   SR605.CZC  -> product SR, month 605 (CZCE drops the decade digit)
+#   AL.SHF     -> product AL (not a continuous leg of A: the L is only read
+#                 as a leg suffix when what is left is a known product on
+#                 that exchange and the whole head is not)
+
+_TS_CODE = r"^(?P<head>[A-Z]+)(?P<digits>\d*)\.(?P<exchange>[A-Z]+)$"
+CFFEX_PRODUCTS = {"IF", "IH", "IC", "IM", "T", "TF", "TS", "TL"}
+
+
+def _known_products(dated_pairs):
+    # {(ts_code exchange suffix, product)} from the dated contracts being
+    # parsed, the CFFEX list and whatever the contract registry lists
+    known = set(dated_pairs) | {("CFX", p) for p in CFFEX_PRODUCTS}
+    try:
+        from marketdata.contract_registry import EXCHANGES, get_registry
+
+        for prefix, meta in get_registry().products.items():
+            suffix = EXCHANGES.get(meta.get("exchange"), (None,))[0]
+            if suffix:
+                known.add((suffix, prefix))
+    except Exception:
+        pass
+    return known
+
+
+def _product(head: str, digits: str, exchange: str, known) -> str:
+    # Product of an undated code: IFL1 / IFL -> IF, AL -> AL, TL -> TL
+    if (exchange, head) in known and not digits:
+        return head
+    if head.endswith("L") and len(head) > 1 and ((exchange, head[:-1]) in known or digits):
+        return head[:-1]
+    return None if digits else head
+
+
+def parse_ts_codes(ts_codes: pd.Series) -> pd.DataFrame:
+    parts = ts_codes.astype(str).str.extract(_TS_CODE)
+    digits = parts["digits"].fillna("")
+    dated = digits.str.len().between(3, 4) & parts["head"].notna()
+    product = parts["head"].where(dated)
+    undated = parts[~dated & parts["head"].notna()]
+    if not undated.empty:
+        known = _known_products(zip(parts["exchange"][dated], parts["head"][dated]))
+        keys = list(zip(undated["head"], digits[undated.index], undated["exchange"]))
+        products = {k: _product(*k, known) for k in set(keys)}
+        product.loc[undated.index] = [products[k] for k in keys]
+    return pd.DataFrame({
+        "product": product,
+        "exchange": parts["exchange"],
+        "dated": dated,
+        "month": pd.to_numeric(digits.where(dated), errors="coerce"),
+    }, index=ts_codes.index)
+
+
+def _num(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64")
+
+
+def settle_returns(df: pd.DataFrame) -> np.ndarray:
+    # (close / pre_settle - 1) * 100, falling back to pre_close when
+    # pre_settle is missing or zero
+    close = _num(df, "close")
+    pre_settle = _num(df, "pre_settle")
+    pre_close = _num(df, "pre_close")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        by_settle = (close / pre_settle - 1.0) * 100.0
+        by_close = (close / pre_close - 1.0) * 100.0
+    use_settle = ~np.isnan(pre_settle) & (pre_settle != 0) & ~np.isnan(close)
+    use_close = ~np.isnan(pre_close) & (pre_close != 0) & ~np.isnan(close)
+    return np.where(use_settle, by_settle, np.where(use_close, by_close, np.nan))
+
+
+def _records(df: pd.DataFrame) -> dict:
+    # {group: row dict} with NaN turned into None
+    out = {}
+    cols = [c for c in ("ts_code", "trade_date", "close", "settle", "settle_return", "oi", "vol", "month") if c in df.columns]
+    values = df[cols].astype(object).where(df[cols].notna(), None)
+    for group, row in zip(df["group"].tolist(), values.to_dict("records")):
+        out[group] = row
+    return out
+
+
+def select_contracts(df, products=None, dated_only: bool = False) -> dict:
+    # {product: {"main", "near", "next", "far"}}; each value is a row dict
+    # (ts_code, trade_date, close, settle, settle_return, oi, vol, month) or
+    # None. main = max oi, then vol, then ts_code; far = max ts_code, which
+    # is the latest delivery month among dated contracts. near/next are the
+    # two earliest dated contracts. With dated_only=False continuous codes
+    # (IFL.CFX ...) on the board take part in main/far ranking, as the
+    # startswith() selection of get_cffex_index_futures_latest.py always did.
+    # Contracts are grouped by (exchange, product); a product traded on
+    # more than one exchange of the board is keyed "<product>.<exchange>".
+    if df is None or df.empty or "ts_code" not in df.columns:
+        return {}
+    board = df.join(parse_ts_codes(df["ts_code"]))
+    board = board[board["product"].notna()]
+    if products is not None:
+        board = board[board["product"].isin(list(products))]
+    if dated_only:
+        board = board[board["dated"]]
+    if board.empty:
+        return {}
+    board = board.assign(
+        group=board["product"] + "." + board["exchange"],
+        close=_num(board, "close"),
+        settle=_num(board, "settle"),
+        oi=_num(board, "oi"),
+        vol=_num(board, "vol"),
+        settle_return=settle_returns(board),
+        trade_date=board["trade_date"].astype(str) if "trade_date" in board.columns else None,
+    )
+
+    main = board.sort_values(["group", "oi", "vol", "ts_code"], ascending=[True, False, False, False]).drop_duplicates("group")
+    far = board.sort_values(["group", "ts_code"], ascending=[True, False]).drop_duplicates("group")
+    dated = board[board["dated"]].sort_values(["group", "month"])
+    rank = dated.groupby("group").cumcount()
+
+    picks = {
+        "main": _records(main),
+        "far": _records(far),
+        "near": _records(dated[rank == 0]),
+        "next": _records(dated[rank == 1]),
+    }
+    groups = board[["group", "product"]].drop_duplicates()
+    shared = set(groups["product"][groups["product"].duplicated()])
+    out = {}
+    for group, product in zip(groups["group"].tolist(), groups["product"].tolist()):
+        out[group if product in shared else product] = {k: picks[k].get(group) for k in ("main", "near", "next", "far")}
+    return out
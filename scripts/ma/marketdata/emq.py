@@ -0,0 +1,151 @@
+import json
+import os
+import socket
+import threading
+from datetime import date, datetime
+
+from marketdata.trace import traced
+
+DEFAULT_BROKER_HOST = "127.0.0.1"
+DEFAULT_BROKER_PORT = 9731
+
+
+def broker_address():
+    host = os.environ.get("EMQ_BROKER_HOST") or DEFAULT_BROKER_HOST
+    try:
+        port = int(os.environ.get("EMQ_BROKER_PORT") or DEFAULT_BROKER_PORT)
+    except Exception:
+        port = DEFAULT_BROKER_PORT
+    return host, port
+
+
+def _plain(v):
+    # Coerce EmQuant vectors/bytes/dates into JSON-friendly values
+    if v is None or isinstance(v, (bool, int, float, str)):
+        return v
+    if isinstance(v, bytes):
+        return v.decode("utf-8", errors="ignore")
+    if isinstance(v, (datetime, date)):
+        return v.strftime("%Y-%m-%d")
+    if isinstance(v, dict):
+        return {str(_plain(k)): _plain(val) for k, val in v.items()}
+    try:
+        return [_plain(x) for x in list(v)]
+    except Exception:
+        return str(v)
+
+
+def result_to_wire(data_obj):
+    out = {}
+    for attr in ("ErrorCode", "ErrorMsg", "SerialID", "Codes", "Fields", "Indicators", "Dates", "Data"):
+        if hasattr(data_obj, attr):
+            out[attr] = _plain(getattr(data_obj, attr))
+    return out
+
+
+class EmqResult:
+    # Mirrors the attributes of an EmQuant result object so the existing
+    # normalize_* helpers can consume broker responses unchanged.
+    def __init__(self, wire):
+        self.ErrorCode = wire.get("ErrorCode", 0)
+        self.ErrorMsg = wire.get("ErrorMsg")
+        for attr in ("SerialID", "Codes", "Fields", "Indicators", "Dates", "Data"):
+            if attr in wire:
+                setattr(self, attr, wire[attr])
+
+    def __str__(self):
+        return json.dumps(self.__dict__, ensure_ascii=False)
+
+
+def _recv_line(sock):
+    buf = b""
+    while not buf.endswith(b"\n"):
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        buf += chunk
+    return buf
+
+
+class BrokerClient:
+    # Drop-in stand-in for EmQuantAPI.c backed by the session broker.
+    def __init__(self, host, port, timeout=120.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._subs = {}
+
+    def _call(self, op, args):
+        req = json.dumps({"op": op, "args": list(args)}, ensure_ascii=False) + "\n"
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as sock:
+            sock.sendall(req.encode("utf-8"))
+            line = _recv_line(sock)
+        if not line:
+            return EmqResult({"ErrorCode": -1, "ErrorMsg": "broker closed connection"})
+        return EmqResult(json.loads(line.decode("utf-8")))
+
+    def css(self, codes, indicators, options=""):
+        return self._call("css", [codes, indicators, options])
+
+    def csd(self, codes, indicators, start_date, end_date, options=""):
+        return self._call("csd", [codes, indicators, start_date, end_date, options])
+
+    def csq(self, codes, indicators, options, callback, userparams=None):
+        # Quote subscription over a dedicated connection: the broker writes one
+        # JSON line per push until csqcancel() closes the socket.
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        req = json.dumps({"op": "csq", "args": [codes, indicators, options]}, ensure_ascii=False) + "\n"
+        sock.sendall(req.encode("utf-8"))
+        rfile = sock.makefile("rb")
+        ack = EmqResult(json.loads(rfile.readline().decode("utf-8") or "{}"))
+        if getattr(ack, "ErrorCode", -1) != 0:
+            sock.close()
+            return ack
+        sock.settimeout(None)
+
+        def pump():
+            try:
+                for line in rfile:
+                    wire = json.loads(line.decode("utf-8"))
+                    if wire.get("heartbeat"):
+                        continue
+                    callback(EmqResult(wire))
+            except Exception:
+                pass
+
+        threading.Thread(target=pump, daemon=True).start()
+        self._subs[getattr(ack, "SerialID", None)] = sock
+        return ack
+
+    def csqcancel(self, serial_id):
+        sock = self._subs.pop(serial_id, None)
+        if sock is not None:
+            try:
+                sock.close()
+            except Exception:
+                pass
+        return EmqResult({"ErrorCode": 0})
+
+    def ping(self):
+        return self._call("ping", [])
+
+    def stop(self):
+        # The broker owns the session; callers must not log it out
+        return EmqResult({"ErrorCode": 0})
+
+
+def connect_broker():
+    # Return a BrokerClient when a broker is listening, else None so the
+    # caller falls back to its own c.start() login.
+    if os.environ.get("EMQ_BROKER_DISABLE") == "1":
+        return None
+    host, port = broker_address()
+    try:
+        client = BrokerClient(host, port, timeout=2.0)
+        res = client.ping()
+        if getattr(res, "ErrorCode", -1) != 0:
+            return None
+        client.timeout = 120.0
+        return traced(client, "emquant")
+    except Exception:
+        return None
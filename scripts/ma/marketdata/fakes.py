@@ -0,0 +1,494 @@
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+import zlib
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from marketdata.emq import EmqResult, result_to_wire
+
+# Offline stand-ins for tushare's pro_api and EmQuantAPI.c, plugged in via
+# marketdata.clients:
+#   MA_TUSHARE_FACTORY=marketdata.fakes:fake_pro
+#   MA_EMQ_FACTORY=marketdata.fakes:fake_emquant
+# A call recorded in MA_FAKE_FIXTURES (tushare.jsonl / emquant.jsonl, written
+# by recording_pro / recording_emquant against the real services) is replayed
+# exactly; anything else is synthesized deterministically: a CFFEX board with
+# dated and continuous contracts, index closes, a weekday trade calendar,
+# a fut_basic listing, css/csd/csq results shaped like EmQuant's.
+#   MA_FAKE_LATENCY      seconds added to every call (default 0), or a
+#                        distribution: uniform:a,b  lognormal:median,sigma
+#                        exp:mean
+#   MA_FAKE_ERROR_RATE   fraction of calls that fail (default 0)
+#   MA_FAKE_QUOTA_ERRORS=1  failures carry Tushare's minute-quota message
+#   MA_FAKE_SEED         seed for error injection (default 0)
+#   MA_FAKE_LAST_DATE    last YYYYMMDD with data (default: latest weekday)
+#   MA_FAKE_CALL_LOG     append "<client> <api>" per call, to count calls
+#                        across processes
+#   MA_FAKE_TUSHARE_URL  for http_pro: a serve_tushare() stand-in speaking
+#                        Tushare's HTTP protocol, shared by many processes
+
+CFFEX_PRODUCTS = {"IH": 2700.0, "IF": 3900.0, "IC": 5800.0, "IM": 6300.0, "T": 108.0, "TF": 105.0}
+CONTINUOUS_LEGS = ("L", "L1", "L2", "L3")
+# fut_basic listing: exchange -> {product: (name, per_unit, tick)}
+LISTED_PRODUCTS = {
+    "SHFE": {"CU": ("沪铜", 5, 10.0), "AU": ("沪金", 1000, 0.02), "RB": ("螺纹钢", 10, 1.0)},
+    "DCE": {"M": ("豆粕", 10, 1.0), "I": ("铁矿石", 100, 0.5)},
+    "CZCE": {"SR": ("白糖", 10, 1.0), "MA": ("甲醇", 10, 1.0)},
+    "INE": {"SC": ("原油", 1000, 0.1)},
+    "GFEX": {"SI": ("工业硅", 5, 5.0), "LC": ("碳酸锂", 1, 20.0), "PS": ("多晶硅", 3, 5.0), "PT": ("铂金", 1000, 0.05)},
+    "CFFEX": {"IF": ("沪深300", 300, 0.2), "IH": ("上证50", 300, 0.2)},
+}
+TS_SUFFIX = {"SHFE": "SHF", "DCE": "DCE", "CZCE": "ZCE", "INE": "INE", "GFEX": "GFE", "CFFEX": "CFX"}
+FUT_DAILY_COLUMNS = ["ts_code", "trade_date", "pre_close", "pre_settle", "open", "high", "low", "close", "settle", "vol", "amount", "oi", "oi_chg"]
+INDEX_DAILY_COLUMNS = ["ts_code", "trade_date", "close", "open", "high", "low", "pre_close", "change", "pct_chg", "vol", "amount"]
+
+
+def _ymd(d: date) -> str:
+    return d.strftime("%Y%m%d")
+
+
+def _parse(s: str) -> date:
+    s = str(s).replace("-", "").replace("/", "")
+    return datetime.strptime(s[:8], "%Y%m%d").date()
+
+
+def latest_weekday(d: date) -> date:
+    while d.weekday() >= 5:
+        d -= timedelta(days=1)
+    return d
+
+
+def _seed(key: str) -> int:
+    return zlib.crc32(key.encode("utf-8"))
+
+
+def _level(key: str, d: date, base: float) -> float:
+    # Smooth, deterministic price path per key
+    h = _seed(key)
+    x = d.toordinal()
+    return round(base * (1 + 0.06 * math.sin(x / 23.0 + h % 97) + 0.01 * math.sin(x / 3.1 + h % 13)), 1)
+
+
+def latency_sampler(spec):
+    # "0.05" -> fixed; "uniform:a,b", "lognormal:median,sigma", "exp:mean"
+    spec = str(spec or 0).strip()
+    kind, _, params = spec.partition(":")
+    if not params:
+        fixed = float(kind or 0)
+        return lambda rng: fixed
+    p = [float(x) for x in params.split(",")]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(p[0], p[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(p[0]), p[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / p[0])
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+class FakeConfig:
+    def __init__(self, latency=None, error_rate=None, quota_errors=None, seed=None, last_date=None, fixtures=None, call_log=None):
+        env = os.environ
+        self.latency = str(latency if latency is not None else env.get("MA_FAKE_LATENCY") or 0)
+        self.sample_latency = latency_sampler(self.latency)
+        self.error_rate = float(error_rate if error_rate is not None else env.get("MA_FAKE_ERROR_RATE") or 0)
+        self.quota_errors = quota_errors if quota_errors is not None else env.get("MA_FAKE_QUOTA_ERRORS") == "1"
+        self.rng = random.Random(int(seed if seed is not None else env.get("MA_FAKE_SEED") or 0))
+        last = last_date or env.get("MA_FAKE_LAST_DATE")
+        self.last_date = _parse(last) if last else latest_weekday(date.today())
+        fixtures = fixtures or env.get("MA_FAKE_FIXTURES")
+        self.fixtures = Path(fixtures) if fixtures else None
+        self.call_log = call_log or env.get("MA_FAKE_CALL_LOG")
+
+
+class _FakeClient:
+    kind = ""
+
+    def __init__(self, config: FakeConfig = None):
+        self.config = config or FakeConfig()
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._replay = self._load_fixtures()
+
+    def _load_fixtures(self):
+        out = {}
+        if self.config.fixtures is None:
+            return out
+        try:
+            with open(self.config.fixtures / f"{self.kind}.jsonl", encoding="utf-8") as fh:
+                for line in fh:
+                    rec = json.loads(line)
+                    out[_fixture_key(rec["api"], rec["args"])] = rec
+        except FileNotFoundError:
+            pass
+        return out
+
+    def _enter(self, api: str):
+        # Count, log, wait and maybe fail; returns True when this call fails
+        with self._lock:
+            self.calls[api] = self.calls.get(api, 0) + 1
+            fail = self.config.error_rate > 0 and self.config.rng.random() < self.config.error_rate
+            delay = self.config.sample_latency(self.config.rng)
+            if self.config.call_log:
+                with open(self.config.call_log, "a", encoding="utf-8") as fh:
+                    fh.write(f"{self.kind} {api}\n")
+        if delay > 0:
+            time.sleep(delay)
+        return fail
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+def _fixture_key(api, args) -> str:
+    return json.dumps([api, args], sort_keys=True, ensure_ascii=False, default=str)
+
+
+class FakePro(_FakeClient):
+    kind = "tushare"
+
+    def _serve(self, api, kwargs, build):
+        if self._enter(api):
+            if self.config.quota_errors:
+                raise Exception("抱歉，您每分钟最多访问该接口200次")
+            raise Exception(f"fake {api} failure")
+        import pandas as pd
+
+        rec = self._replay.get(_fixture_key(api, kwargs))
+        if rec is not None:
+            return pd.DataFrame(rec["data"], columns=rec["columns"])
+        df = pd.DataFrame(build(), columns=None)
+        fields = kwargs.get("fields")
+        if fields and not df.empty:
+            df = df[[c for c in str(fields).split(",") if c in df.columns]]
+        if not df.empty and "trade_date" in df.columns:
+            # Tushare lists the newest day first
+            df = df.sort_values(["trade_date"] + (["ts_code"] if "ts_code" in df.columns else []), ascending=[False] + ([True] if "ts_code" in df.columns else [])).reset_index(drop=True)
+        return df
+
+    def _days(self, kwargs):
+        if kwargs.get("trade_date"):
+            days = [_parse(kwargs["trade_date"])]
+        else:
+            start = _parse(kwargs.get("start_date") or "19900101")
+            end = _parse(kwargs.get("end_date") or _ymd(self.config.last_date))
+            start = max(start, end - timedelta(days=3660))
+            days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        return [d for d in days if d.weekday() < 5 and d <= self.config.last_date]
+
+    def _board_codes(self, d: date):
+        months = [(d.year, d.month), ((d.year * 12 + d.month) // 12, (d.year * 12 + d.month) % 12 + 1)]
+        y, m = months[-1]
+        while len(months) < 4:
+            m += 1
+            if m > 12:
+                y, m = y + 1, 1
+            if m % 3 == 0:
+                months.append((y, m))
+        codes = []
+        for product in CFFEX_PRODUCTS:
+            codes += [f"{product}{y % 100:02d}{m:02d}.CFX" for y, m in months]
+            codes += [f"{product}{leg}.CFX" for leg in CONTINUOUS_LEGS]
+        return codes
+
+    def _fut_row(self, code: str, d: date):
+        product = code.split(".")[0].rstrip("0123456789")
+        product = product[:-1] if product.endswith("L") else product
+        product = product if product in CFFEX_PRODUCTS else "IF"
+        base = CFFEX_PRODUCTS[product]
+        prev = d - timedelta(days=3 if d.weekday() == 0 else 1)
+        close = _level(code, d, base)
+        pre_close = _level(code, prev, base)
+        tail = code.split(".")[0][len(product):]
+        # Next-month and its continuous leg carry the most open interest
+        rank = {"L1": 0, "L": 1, "L2": 2, "L3": 3}.get(tail, 4 + _seed(code) % 4)
+        oi = float(120000 // (rank + 1))
+        return {
+            "ts_code": code,
+            "trade_date": _ymd(d),
+            "pre_close": pre_close,
+            "pre_settle": round(pre_close + 0.4, 1),
+            "open": pre_close,
+            "high": max(close, pre_close) + 2.0,
+            "low": min(close, pre_close) - 2.0,
+            "close": close,
+            "settle": round(close + 0.4, 1),
+            "vol": float(80000 // (rank + 1)),
+            "amount": round(close * 300 * 80000 / (rank + 1) / 1e4, 2),
+            "oi": oi,
+            "oi_chg": float(_seed(code + _ymd(d)) % 2000 - 1000),
+        }
+
+    def fut_daily(self, **kwargs):
+        def build():
+            rows = []
+            for d in self._days(kwargs):
+                codes = [kwargs["ts_code"]] if kwargs.get("ts_code") else self._board_codes(d)
+                rows += [self._fut_row(code, d) for code in codes]
+            return rows or {c: [] for c in FUT_DAILY_COLUMNS}
+        return self._serve("fut_daily", kwargs, build)
+
+    def index_daily(self, **kwargs):
+        def build():
+            code = kwargs.get("ts_code") or "000300.SH"
+            rows = []
+            for d in self._days(kwargs):
+                prev = d - timedelta(days=3 if d.weekday() == 0 else 1)
+                close = _level(code, d, 4000.0)
+                pre_close = _level(code, prev, 4000.0)
+                rows.append({
+                    "ts_code": code, "trade_date": _ymd(d), "close": close, "open": pre_close,
+                    "high": max(close, pre_close) + 5, "low": min(close, pre_close) - 5, "pre_close": pre_close,
+                    "change": round(close - pre_close, 2), "pct_chg": round((close / pre_close - 1) * 100, 4),
+                    "vol": 1.2e8, "amount": 2.4e8,
+                })
+            return rows or {c: [] for c in INDEX_DAILY_COLUMNS}
+        return self._serve("index_daily", kwargs, build)
+
+    def trade_cal(self, **kwargs):
+        def build():
+            start = _parse(kwargs.get("start_date") or _ymd(self.config.last_date))
+            end = _parse(kwargs.get("end_date") or _ymd(self.config.last_date))
+            days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+            return [{"exchange": kwargs.get("exchange") or "SSE", "cal_date": _ymd(d), "is_open": int(d.weekday() < 5)} for d in reversed(days)]
+        return self._serve("trade_cal", kwargs, build)
+
+    def fut_basic(self, **kwargs):
+        def build():
+            d = self.config.last_date
+            rows = []
+            for exchange, products in LISTED_PRODUCTS.items():
+                if kwargs.get("exchange") and kwargs["exchange"] != exchange:
+                    continue
+                for product, (name, per_unit, tick) in products.items():
+                    for i in range(-2, 4):
+                        y, m = divmod(d.year * 12 + d.month - 1 + i, 12)
+                        delist = date(y, m + 1, 15)
+                        rows.append({
+                            "ts_code": f"{product}{y % 100:02d}{m + 1:02d}.{TS_SUFFIX[exchange]}",
+                            "symbol": f"{product}{y % 100:02d}{m + 1:02d}", "exchange": exchange,
+                            "name": f"{name}{y % 100:02d}{m + 1:02d}", "fut_code": product,
+                            "multiplier": per_unit if exchange == "CFFEX" else None, "trade_unit": "吨",
+                            "per_unit": per_unit, "quote_unit": "元/吨", "quote_unit_desc": f"{tick:g}元/吨",
+                            "list_date": _ymd(delist - timedelta(days=365)), "delist_date": _ymd(delist),
+                        })
+            return rows
+        return self._serve("fut_basic", kwargs, build)
+
+    def __getattr__(self, api):
+        if api.startswith("_"):
+            raise AttributeError(api)
+        # Endpoints without a synthesizer answer empty, like a missing permission
+        return lambda **kwargs: self._serve(api, kwargs, lambda: [])
+
+
+class FakeEmq(_FakeClient):
+    kind = "emquant"
+
+    def _serve(self, api, args, build):
+        if self._enter(api):
+            return EmqResult({"ErrorCode": 10000009, "ErrorMsg": f"fake {api} failure"})
+        rec = self._replay.get(_fixture_key(api, list(args)))
+        if rec is not None:
+            return EmqResult(rec["result"])
+        return EmqResult(build())
+
+    def start(self, options, callback=None, userparams=None):
+        return self._serve("start", [], lambda: {"ErrorCode": 0, "ErrorMsg": "success"})
+
+    def stop(self):
+        return EmqResult({"ErrorCode": 0, "ErrorMsg": "success"})
+
+    def _value(self, code: str, indicator: str, d: date):
+        if indicator == "NAME":
+            return f"{code.split('.')[0]}主力"
+        if indicator in ("AMOUNT", "TURNOVER", "VALUE"):
+            return float(1e8 * (1 + _seed(code + indicator) % 500))
+        if indicator == "VOLUME":
+            return float(1e4 * (1 + _seed(code + indicator) % 300))
+        if "DIFFERRANGE" in indicator or indicator.startswith("PCT"):
+            return round((_seed(code + _ymd(d)) % 800 - 400) / 100.0, 2)
+        return _level(code, d, 1000.0 + _seed(code) % 4000)
+
+    def css(self, codes, indicators, options=""):
+        def build():
+            cs = [c for c in codes.split(",") if c]
+            fs = [f for f in indicators.split(",") if f]
+            d = self.config.last_date
+            m = re.search(r"TradeDate=([\d/-]+)", options or "")
+            if m:
+                d = min(_parse(m.group(1)), d)
+            return {"ErrorCode": 0, "ErrorMsg": "success", "Codes": cs, "Indicators": fs,
+                    "Data": {c: [self._value(c, f, d) for f in fs] for c in cs}}
+        return self._serve("css", [codes, indicators, options], build)
+
+    def csd(self, codes, indicators, start_date, end_date, options=""):
+        def build():
+            cs = [c for c in codes.split(",") if c]
+            fs = [f for f in indicators.split(",") if f]
+            d0, d1 = _parse(start_date), min(_parse(end_date), self.config.last_date)
+            days = [d0 + timedelta(days=i) for i in range((d1 - d0).days + 1)]
+            days = [d for d in days if d.weekday() < 5]
+            return {"ErrorCode": 0, "ErrorMsg": "success", "Codes": cs, "Indicators": fs,
+                    "Dates": [d.strftime("%Y/%m/%d") for d in days],
+                    "Data": {c: [[self._value(c, f, d) for d in days] for f in fs] for c in cs}}
+        return self._serve("csd", [codes, indicators, start_date, end_date, options], build)
+
+    def csq(self, codes, indicators, options, callback, userparams=None):
+        ack = self._serve("csq", [codes, indicators, options], lambda: {"ErrorCode": 0, "ErrorMsg": "success", "SerialID": 1})
+        if ack.ErrorCode != 0:
+            return ack
+        cs = [c for c in codes.split(",") if c]
+        fs = [f for f in indicators.split(",") if f]
+        stop = threading.Event()
+        self._csq_stop = stop
+        ticks = int(os.environ.get("MA_FAKE_CSQ_TICKS") or 50)
+
+        def push():
+            rng = random.Random(1)
+            for i in range(ticks):
+                if stop.wait(0.02):
+                    return
+                code = rng.choice(cs)
+                vals = [self._value(code, f, self.config.last_date) * (1 + i / 1000.0) for f in fs]
+                callback(EmqResult({"ErrorCode": 0, "SerialID": 1, "Indicators": fs, "Data": {code: vals}}))
+        threading.Thread(target=push, daemon=True).start()
+        return ack
+
+    def csqcancel(self, serial_id):
+        stop = getattr(self, "_csq_stop", None)
+        if stop is not None:
+            stop.set()
+        return EmqResult({"ErrorCode": 0, "ErrorMsg": "success"})
+
+
+class _Recorder:
+    # Forwards to the real client and appends each call + result to
+    # <MA_FAKE_FIXTURES>/<kind>.jsonl for later replay by the fakes
+    def __init__(self, client, kind: str, encode):
+        self._client = client
+        self._encode = encode
+        self._path = Path(os.environ["MA_FAKE_FIXTURES"]) / f"{kind}.jsonl"
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def __getattr__(self, api):
+        attr = getattr(self._client, api)
+        if api.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            rec = self._encode(api, args, kwargs, result)
+            if rec is not None:
+                with self._lock, open(self._path, "a", encoding="utf-8") as fh:
+                    fh.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+            return result
+        return call
+
+
+def _encode_tushare(api, args, kwargs, df):
+    if df is None:
+        return None
+    split = json.loads(df.to_json(orient="split", index=False, force_ascii=False))
+    return {"api": api, "args": kwargs, "columns": split["columns"], "data": split["data"]}
+
+
+def _encode_emquant(api, args, kwargs, result):
+    if api not in ("css", "csd"):
+        return None
+    return {"api": api, "args": list(args), "result": result_to_wire(result)}
+
+
+class _TushareHandler(BaseHTTPRequestHandler):
+    # POST {"api_name", "token", "params", "fields"} ->
+    # {"code": 0, "msg": "", "data": {"fields": [...], "items": [[...]]}},
+    # the wire format of api.tushare.pro
+    def do_POST(self):
+        try:
+            req = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            params = dict(req.get("params") or {})
+            if req.get("fields"):
+                params["fields"] = req["fields"]
+            df = getattr(self.server.pro, req.get("api_name") or "")(**params)
+            body = {"code": 0, "msg": "", "data": {"fields": list(df.columns), "items": json.loads(df.to_json(orient="values"))}}
+        except Exception as e:
+            body = {"code": 40203, "msg": str(e), "data": None}
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_tushare(host: str = "127.0.0.1", port: int = 0, config: FakeConfig = None):
+    # Stand-in Tushare HTTP API on a daemon thread, backed by one FakePro, so
+    # latency and call counts are shared by every process pointed at it.
+    # Returns the server; server.pro.calls counts calls, server_address[1]
+    # is the port.
+    server = ThreadingHTTPServer((host, port), _TushareHandler)
+    server.daemon_threads = True
+    server.pro = FakePro(config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class HttpPro:
+    # Minimal pro_api client for serve_tushare(): pro.fut_daily(...) and
+    # pro.query("fut_daily", ...) post the request and build a DataFrame
+    def __init__(self, url: str, token=None, timeout: float = 30.0):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+
+    def query(self, api_name, fields="", **kwargs):
+        import pandas as pd
+
+        req = {"api_name": api_name, "token": self.token, "params": kwargs, "fields": fields}
+        data = json.dumps(req).encode("utf-8")
+        http = urllib.request.Request(self.url, data=data, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(http, timeout=self.timeout) as resp:
+            body = json.loads(resp.read().decode("utf-8"))
+        if body.get("code") != 0:
+            raise Exception(body.get("msg") or f"tushare error {body.get('code')}")
+        return pd.DataFrame(body["data"]["items"], columns=body["data"]["fields"])
+
+    def __getattr__(self, api):
+        if api.startswith("_"):
+            raise AttributeError(api)
+        return lambda **kwargs: self.query(api, **kwargs)
+
+
+def fake_pro(token=None):
+    return FakePro()
+
+
+def http_pro(token=None):
+    return HttpPro(os.environ["MA_FAKE_TUSHARE_URL"], token)
+
+
+def fake_emquant():
+    return FakeEmq()
+
+
+def recording_pro(token=None):
+    import tushare as ts
+
+    return _Recorder(ts.pro_api(token), "tushare", _encode_tushare)
+
+
+def recording_emquant():
+    import EmQuantAPI as Emq  # type: ignore
+
+    return _Recorder(Emq.c, "emquant", _encode_emquant)
@@ -0,0 +1,38 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from marketdata import trace
+
+# Runs independent upstream fetches (Tushare futures, EmQuant spot, ...)
+# side by side in one process, so a refresh costs the slowest fetch instead
+# of their sum. Each job runs in its own trace span, in a copy of the
+# caller's context so spans and counters nest under the caller's.
+
+
+def run_parallel(jobs: dict):
+    # jobs: {name: fn()}. Returns (results, errors, timings_ms); a failed job
+    # has result None and its message in errors, the others are unaffected.
+    def run(name, fn):
+        t0 = time.perf_counter()
+        try:
+            with trace.span(name):
+                return fn()
+        finally:
+            timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+
+    results, errors, timings = {}, {}, {}
+    t0 = time.perf_counter()
+    ex = ThreadPoolExecutor(max_workers=max(1, len(jobs)))
+    try:
+        futs = {name: ex.submit(contextvars.copy_context().run, run, name, fn) for name, fn in jobs.items()}
+        for name, fut in futs.items():
+            try:
+                results[name] = fut.result()
+            except Exception as e:
+                results[name] = None
+                errors[name] = str(e)
+    finally:
+        ex.shutdown(wait=True)
+    timings["total"] = round((time.perf_counter() - t0) * 1000, 1)
+    return results, errors, timings
@@ -0,0 +1,122 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from marketdata import trace
+from marketdata.paths import data_dir
+
+# pro.fut_daily with memory between runs, kept in data/fut_daily_hints.json:
+#   variant  which exchange= form last returned rows ('CFFEX', omitted, '');
+#            it is tried first, the others only when it comes back empty
+#   empty    "no data" answers keyed by (ts_code, date), valid for the day.
+#            For today's date they expire after EMPTY_TODAY_SECONDS since
+#            settlement prices are published after the close.
+# One instance may be shared by worker threads (board backfill); updates to
+# the hints and their file go through _lock.
+
+EXCHANGE_VARIANTS = ('CFFEX', None, '')
+EMPTY_TODAY_SECONDS = 15 * 60
+
+
+def _today() -> str:
+    return datetime.today().strftime('%Y%m%d')
+
+
+class FutDailyQuery:
+    def __init__(self, pro, path=None):
+        self.pro = pro
+        self.path = path or data_dir() / 'fut_daily_hints.json'
+        self.variant = 0
+        self.empty = {}
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            state = json.loads(self.path.read_text(encoding='utf-8'))
+            v = int(state.get('variant') or 0)
+            self.variant = v if 0 <= v < len(EXCHANGE_VARIANTS) else 0
+            if state.get('day') == _today():
+                self.empty = {str(k): float(t) for k, t in (state.get('empty') or {}).items()}
+        except Exception:
+            pass
+
+    def _save(self):
+        # Caller holds _lock
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+            state = {'day': _today(), 'variant': self.variant, 'empty': self.empty}
+            tmp.write_text(json.dumps(state, separators=(',', ':')), encoding='utf-8')
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
+
+    def _key(self, ts_code, ymd) -> str:
+        return f"{ts_code or '*'}@{ymd}"
+
+    def known_empty(self, ts_code, ymd) -> bool:
+        marked = self.empty.get(self._key(ts_code, ymd))
+        if marked is None:
+            return False
+        if ymd >= _today():
+            return time.time() - marked < EMPTY_TODAY_SECONDS
+        return True
+
+    def _order(self):
+        return [self.variant] + [i for i in range(len(EXCHANGE_VARIANTS)) if i != self.variant]
+
+    def fetch(self, ts_code=None, ymd=None, strict=False, **kwargs):
+        # DataFrame, or None when every variant is empty or a call failed.
+        # (ts_code, ymd) keys the negative cache; ymd is the trade_date or
+        # window end queried. Only all-empty answers are cached: a failed
+        # call (network, auth, quota) says nothing about the data. With
+        # strict=True a failed call is raised instead of returning None.
+        if ymd and self.known_empty(ts_code, ymd):
+            trace.count("fut_daily.empty_cached")
+            return None
+        if ts_code:
+            kwargs['ts_code'] = ts_code
+        failed = None
+        for n, i in enumerate(self._order()):
+            if n:
+                trace.count("fut_daily.variant_fallback")
+            exch = EXCHANGE_VARIANTS[i]
+            args = dict(kwargs)
+            if exch is not None:
+                args['exchange'] = exch
+            try:
+                with self._lock:
+                    self.calls += 1
+                df = self.pro.fut_daily(**args)
+            except Exception as e:
+                failed = e
+                continue
+            if df is not None and not df.empty:
+                with self._lock:
+                    if i != self.variant:
+                        self.variant = i
+                        self._save()
+                return df
+        if failed is not None:
+            if strict:
+                raise failed
+        elif ymd:
+            with self._lock:
+                self.empty[self._key(ts_code, ymd)] = time.time()
+                self._save()
+        return None
+
+    def last_on_or_before(self, ts_code: str, ymd: str, start: str, fields: str):
+        # Newest row with trade_date <= ymd from one start..ymd range query
+        df = self.fetch(ts_code, ymd, start_date=start, end_date=ymd, fields=fields)
+        if df is None or 'trade_date' not in df.columns:
+            return None
+        dates = df['trade_date'].astype(str)
+        df = df[dates <= ymd]
+        if df.empty:
+            return None
+        return df.loc[df['trade_date'].astype(str).sort_values(kind='stable').index].iloc[-1]
@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from marketdata.series_store import SeriesStore
+from marketdata.tushare_client import get_pro
+
+FUT_DAILY_FIELDS = "ts_code,trade_date,open,high,low,close,settle,vol,amount,oi,oi_chg"
+
+_store = SeriesStore("fut_daily")
+
+
+def fetch_fut_daily(ts_code: str, start_date: str, end_date: str):
+    pro = get_pro()
+    df = pro.fut_daily(
+        ts_code=ts_code,
+        exchange="CFFEX",
+        start_date=start_date,
+        end_date=end_date,
+        fields=FUT_DAILY_FIELDS,
+    )
+    if df is None or df.empty:
+        return []
+    return fut_daily_records(df)
+
+
+def float_column(df, col):
+    # Column -> list of Python floats with NaN/unparseable values as None
+    if col not in df.columns:
+        return [None] * len(df)
+    import numpy as np
+    import pandas as pd
+
+    vals = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+    out = vals.tolist()
+    for i in np.flatnonzero(np.isnan(vals)).tolist():
+        out[i] = None
+    return out
+
+
+def fut_daily_records(df):
+    # Column-wise conversion of a fut_daily frame into the range payload rows
+    df = df.sort_values("trade_date", ascending=True)
+    dates = df["trade_date"].astype(str).tolist()
+    close = float_column(df, "close")
+    settle = float_column(df, "settle")
+    return [
+        {"trade_date": td, "close": c, "settle": st}
+        for td, c, st in zip(dates, close, settle)
+    ]
+
+
+def fetch_range(ts_code: str, start_date: str, end_date: str):
+    # Serve sealed history from the local store; only the missing head/tail
+    # of the requested window goes to pro.fut_daily.
+    if os.environ.get("FUT_STORE_DISABLE") == "1":
+        return fetch_fut_daily(ts_code, start_date, end_date)
+    return _store.sync(ts_code, start_date, end_date, lambda s, e: fetch_fut_daily(ts_code, s, e))
+
+
+def max_workers() -> int:
+    # Keep well under the per-minute fut_daily quota; override per deployment
+    try:
+        return max(1, int(os.environ.get("TUSHARE_MAX_WORKERS") or 4))
+    except Exception:
+        return 4
+
+
+def fetch_ranges(ts_codes, start_date: str, end_date: str, workers: int = None):
+    # Fetch several series concurrently; results keep the input order so the
+    # merged payload is identical to a sequential loop.
+    ts_codes = list(ts_codes)
+    workers = min(workers or max_workers(), len(ts_codes)) or 1
+    if workers == 1:
+        return {code: fetch_range(code, start_date, end_date) for code in ts_codes}
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futs = {code: ex.submit(fetch_range, code, start_date, end_date) for code in ts_codes}
+        return {code: futs[code].result() for code in ts_codes}
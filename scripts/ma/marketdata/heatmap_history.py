@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from marketdata import trace
+from marketdata.paths import data_dir
+
+# Per-day snapshots of the commodity amount heatmap, one file per trade date
+# under data/heatmap_history/:
+#   <YYYY>/<YYYYMMDD>.json  {"trade_date", "fields", "rows": [[...]],
+#                            "sectors": {sector: {"amount", "count"}},
+#                            "total_amount", "sealed", "at"}
+# Partitions are append-only: once a day is written after its close
+# ("sealed") it is never rewritten. A past day is closed; today is closed
+# from HEATMAP_SEAL_AFTER (HH:MM local, default 15:30, after the day
+# session), so the end-of-day refresh seals its own day and earlier
+# refreshes keep replacing it. Sector totals are kept per partition, so
+# range aggregation reads no rows. A day that answered without amounts is
+# stored with no rows, skipped by the queries and never sealed: a holiday
+# costs a css per backfill, a trading day that came back empty is retried.
+
+FIELDS = ["code", "name", "amount", "return_pct", "sector"]
+DEFAULT_SEAL_AFTER = "15:30"
+
+
+def _ymd(trade_date) -> str:
+    return str(trade_date).replace("-", "").replace("/", "")[:8]
+
+
+def _iso(ymd: str) -> str:
+    return f"{ymd[0:4]}-{ymd[4:6]}-{ymd[6:8]}"
+
+
+def weekdays(start: str, end: str):
+    d = datetime.strptime(_ymd(start), "%Y%m%d")
+    last = datetime.strptime(_ymd(end), "%Y%m%d")
+    out = []
+    while d <= last:
+        if d.weekday() < 5:
+            out.append(d.strftime("%Y%m%d"))
+        d += timedelta(days=1)
+    return out
+
+
+def closed(ymd: str, now=None) -> bool:
+    # True once the day's amounts are final
+    now = now or datetime.now()
+    today = now.strftime("%Y%m%d")
+    seal_after = os.environ.get("HEATMAP_SEAL_AFTER") or DEFAULT_SEAL_AFTER
+    return ymd < today or (ymd == today and now.strftime("%H:%M") >= seal_after)
+
+
+def _amount(v) -> float:
+    return float(v) if isinstance(v, (int, float)) else 0.0
+
+
+class HeatmapHistory:
+    def __init__(self, root=None):
+        self.root = root or data_dir() / "heatmap_history"
+        self._lock = threading.Lock()
+
+    def _path(self, ymd: str):
+        return self.root / ymd[:4] / f"{ymd}.json"
+
+    def _write_json(self, path, payload):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _load(self, ymd: str):
+        try:
+            return json.loads(self._path(ymd).read_text(encoding="utf-8"))
+        except Exception:
+            return None
+
+    def is_sealed(self, trade_date) -> bool:
+        part = self._load(_ymd(trade_date))
+        return bool(part and part.get("sealed"))
+
+    def append(self, trade_date, items) -> bool:
+        # items: [{code, name, amount, return_pct, sector}]. Returns False
+        # when the day is already sealed and the write was skipped.
+        ymd = _ymd(trade_date)
+        rows = []
+        sectors = {}
+        for it in items or []:
+            sector = it.get("sector") or "其他"
+            rows.append([it.get("code"), it.get("name"), it.get("amount"), it.get("return_pct"), sector])
+            agg = sectors.setdefault(sector, {"amount": 0.0, "count": 0})
+            agg["amount"] += _amount(it.get("amount"))
+            agg["count"] += 1
+        if not any(_amount(r[2]) > 0 for r in rows):
+            rows, sectors = [], {}
+        with self._lock:
+            if self.is_sealed(ymd):
+                return False
+            self._write_json(self._path(ymd), {
+                "trade_date": _iso(ymd),
+                "fields": FIELDS,
+                "rows": rows,
+                "sectors": sectors,
+                "total_amount": sum(s["amount"] for s in sectors.values()),
+                "sealed": bool(rows) and closed(ymd),
+                "at": int(time.time()),
+            })
+        return True
+
+    def dates(self, start: str = "19000101", end: str = "99991231", with_rows: bool = True):
+        # Stored YYYYMMDD dates in [start, end], ascending
+        start, end = _ymd(start), _ymd(end)
+        out = []
+        try:
+            years = sorted(p for p in self.root.iterdir() if p.is_dir() and start[:4] <= p.name <= end[:4])
+        except Exception:
+            return out
+        for year in years:
+            for p in sorted(year.glob("*.json")):
+                ymd = p.stem
+                if start <= ymd <= end:
+                    out.append(ymd)
+        if with_rows:
+            out = [d for d in out if (self._load(d) or {}).get("rows")]
+        return out
+
+    def _partitions(self, start: str, end: str):
+        for ymd in self.dates(start, end, with_rows=False):
+            part = self._load(ymd)
+            if part and part.get("rows"):
+                yield part
+
+    def read(self, start: str, end: str, sectors=None):
+        # [{trade_date, items: [{code, name, amount, return_pct, sector}]}]
+        wanted = set(sectors) if sectors else None
+        out = []
+        for part in self._partitions(start, end):
+            fields = part.get("fields") or FIELDS
+            items = [dict(zip(fields, r)) for r in part["rows"]]
+            if wanted is not None:
+                items = [it for it in items if it.get("sector") in wanted]
+            out.append({"trade_date": part["trade_date"], "items": items})
+        return out
+
+    def payloads(self, start: str, end: str, sectors=None):
+        # One treemap payload per day, same shape as the single-day
+        # data/commodity_amount_heatmap.json
+        out = []
+        for day in self.read(start, end, sectors):
+            groups = {}
+            total = 0.0
+            for it in day["items"]:
+                amt = _amount(it.get("amount"))
+                total += amt
+                groups.setdefault(it["sector"], {"name": it["sector"], "children": []})
+                groups[it["sector"]]["children"].append({"name": it.get("name") or it["code"], "value": amt, "ret": it.get("return_pct")})
+            out.append({"trade_date": day["trade_date"], "total_amount": total, "data": list(groups.values())})
+        return out
+
+    def sector_totals(self, start: str, end: str, sectors=None):
+        # Per-day sector amounts and shares plus the range sums, from the
+        # totals stored with each partition
+        wanted = set(sectors) if sectors else None
+        days = []
+        totals = {}
+        for part in self._partitions(start, end):
+            per = {k: v for k, v in (part.get("sectors") or {}).items() if wanted is None or k in wanted}
+            day_total = sum(v["amount"] for v in per.values())
+            days.append({
+                "trade_date": part["trade_date"],
+                "total_amount": day_total,
+                "sectors": {k: {"amount": v["amount"], "share": v["amount"] / day_total if day_total else None} for k, v in per.items()},
+            })
+            for k, v in per.items():
+                totals[k] = totals.get(k, 0.0) + v["amount"]
+        grand = sum(totals.values())
+        return {
+            "days": days,
+            "totals": {k: {"amount": v, "share": v / grand if grand else None} for k, v in sorted(totals.items(), key=lambda kv: -kv[1])},
+            "total_amount": grand,
+        }
+
+    def backfill(self, fetch_day, days, workers: int = 2, progress=None):
+        # fetch_day(YYYY-MM-DD) -> items with sectors, or raises. Sealed days
+        # are skipped; at most `workers` requests are in flight.
+        todo = [d for d in days if not self.is_sealed(d)]
+        summary = {"days": len(days), "skipped": len(days) - len(todo), "fetched": 0, "empty": 0, "rows": 0, "errors": {}}
+        t0 = time.perf_counter()
+
+        def run(ymd):
+            with trace.span("heatmap_day", trade_date=ymd):
+                items = fetch_day(_iso(ymd))
+            self.append(ymd, items)
+            return len(items or []) if any(_amount(it.get("amount")) > 0 for it in items or []) else 0
+
+        ex = ThreadPoolExecutor(max_workers=max(1, workers))
+        try:
+            futs = {ex.submit(run, d): d for d in todo}
+            for fut in as_completed(futs):
+                ymd = futs[fut]
+                try:
+                    rows = fut.result()
+                except Exception as e:
+                    summary["errors"][ymd] = str(e)
+                    continue
+                summary["fetched"] += 1
+                summary["rows"] += rows
+                if not rows:
+                    summary["empty"] += 1
+                if progress is not None:
+                    progress(f"{ymd}: {rows} rows; {summary['fetched']}/{len(todo)} days")
+        finally:
+            ex.shutdown(wait=True, cancel_futures=True)
+        summary["elapsed_s"] = round(time.perf_counter() - t0, 2)
+        return summary
@@ -0,0 +1,10 @@
+import os
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+
+def data_dir() -> Path:
+    # Same data/ directory the routes read their caches from
+    d = os.environ.get("MA_DATA_DIR")
+    return Path(d) if d else REPO_ROOT / "data"
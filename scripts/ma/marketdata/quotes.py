@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+
+from marketdata.choice_amount import _to_float
+
+# Real-time indicators requested from csq, in order: turnover so far today
+# and percent change versus the previous settlement.
+QUOTE_INDICATORS = "AMOUNT,DIFFERRANGE"
+
+
+def parse_quote(quantdata, indicators):
+    # csq pushes Data as {code: [values in indicator order]}; turn one push
+    # into ticks shaped like the replay records: {code, amount, ret}.
+    names = [s.strip().upper() for s in (getattr(quantdata, "Indicators", None) or indicators.split(","))]
+    data = getattr(quantdata, "Data", None) or {}
+    ticks = []
+    if not isinstance(data, dict):
+        return ticks
+    for code, vals in data.items():
+        if not isinstance(vals, (list, tuple)):
+            continue
+        row = dict(zip(names, vals))
+        tick = {"code": code}
+        if "AMOUNT" in row:
+            tick["amount"] = _to_float(row["AMOUNT"])
+        if "DIFFERRANGE" in row:
+            tick["ret"] = _to_float(row["DIFFERRANGE"])
+        ticks.append(tick)
+    return ticks
+
+
+class EmqQuoteSource:
+    # Live ticks from an EmQuant csq subscription (direct login or broker)
+    def __init__(self, c, codes: str, indicators: str = QUOTE_INDICATORS, options: str = ""):
+        self.c = c
+        self.codes = codes
+        self.indicators = indicators
+        self.options = options
+        self.serial = None
+        self.done = threading.Event()
+
+    def start(self, on_tick):
+        def callback(quantdata):
+            if getattr(quantdata, "ErrorCode", 0) != 0:
+                return 0
+            for tick in parse_quote(quantdata, self.indicators):
+                on_tick(tick)
+            return 0
+
+        res = self.c.csq(self.codes, self.indicators, self.options, callback, None)
+        if getattr(res, "ErrorCode", -1) != 0:
+            raise RuntimeError(f"csq error: {getattr(res, 'ErrorMsg', None) or getattr(res, 'ErrorCode', 'unknown')}")
+        self.serial = getattr(res, "SerialID", None)
+
+    def stop(self):
+        try:
+            self.c.csqcancel(self.serial)
+        except Exception:
+            pass
+        self.done.set()
+
+
+class ReplayQuoteSource:
+    # Offline stand-in: replays ticks recorded as JSON lines
+    # {"t": seconds since start, "code": ..., "amount": ..., "ret": ...}
+    # with the original spacing divided by `speed` (0 = as fast as possible).
+    def __init__(self, path, speed: float = 1.0):
+        self.path = path
+        self.speed = speed
+        self.done = threading.Event()
+        self._stop = threading.Event()
+
+    def _ticks(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def start(self, on_tick):
+        def run():
+            t0 = time.monotonic()
+            try:
+                for tick in self._ticks():
+                    if self._stop.is_set():
+                        break
+                    if self.speed > 0:
+                        wait = float(tick.get("t") or 0) / self.speed - (time.monotonic() - t0)
+                        if wait > 0 and self._stop.wait(wait):
+                            break
+                    on_tick({k: v for k, v in tick.items() if k != "t"})
+            finally:
+                self.done.set()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+class TickRecorder:
+    # Tees live ticks to a JSON-lines file that ReplayQuoteSource can replay
+    def __init__(self, path):
+        self.f = open(path, "w", encoding="utf-8")
+        self.t0 = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wrap(self, on_tick):
+        def record(tick):
+            with self.lock:
+                rec = {"t": round(time.monotonic() - self.t0, 3), **tick}
+                self.f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            on_tick(tick)
+        return record
+
+    def close(self):
+        with self.lock:
+            self.f.close()
@@ -0,0 +1,175 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from marketdata import trace
+from marketdata.paths import data_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows: de-duplication within the process only
+    fcntl = None
+
+# Single-flight cache for fetcher output, kept in data/result_cache/. The key
+# is (fetcher, args, trade date). The first process to ask takes a file lock
+# and runs the fetch; identical requests arriving meanwhile block on the lock
+# and then read its result instead of hitting Tushare/EmQuant again.
+# Results fetched after their trade date was over are sealed and kept
+# as long as they keep being read; anything else expires after
+# RESULT_CACHE_TTL seconds (default 60). Range keys carry their end date, so
+# entries stop being asked for as days go by: at most once an hour a writer
+# deletes entries and lock files untouched for RESULT_CACHE_MAX_AGE_DAYS
+# (default 30). RESULT_CACHE_DISABLE=1 runs every fetch directly.
+
+DEFAULT_TTL_SECONDS = 60
+DEFAULT_MAX_AGE_DAYS = 30
+GC_INTERVAL_SECONDS = 3600
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _root():
+    return data_dir() / "result_cache"
+
+
+def _today() -> str:
+    return datetime.today().strftime("%Y%m%d")
+
+
+def _ttl() -> float:
+    try:
+        return float(os.environ.get("RESULT_CACHE_TTL") or DEFAULT_TTL_SECONDS)
+    except Exception:
+        return DEFAULT_TTL_SECONDS
+
+
+def _max_age() -> float:
+    try:
+        return float(os.environ.get("RESULT_CACHE_MAX_AGE_DAYS") or DEFAULT_MAX_AGE_DAYS) * 86400
+    except Exception:
+        return DEFAULT_MAX_AGE_DAYS * 86400
+
+
+def cache_key(name: str, args, trade_date: str) -> str:
+    digest = hashlib.sha1(json.dumps([name, list(args), trade_date]).encode("utf-8")).hexdigest()[:16]
+    return f"{name}-{digest}"
+
+
+def sealed(trade_date: str, stored: float) -> bool:
+    # Final only if fetched after the trade date was over; a result stored
+    # on the day itself may predate the settlement prices
+    return bool(trade_date) and datetime.fromtimestamp(stored).strftime("%Y%m%d") > trade_date
+
+
+def _read(path, trade_date: str):
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if not isinstance(entry, dict) or "payload" not in entry:
+        return None
+    stored = float(entry.get("stored") or 0)
+    if sealed(trade_date, stored):
+        # Reads keep a sealed entry clear of the age-based GC
+        try:
+            os.utime(path)
+        except Exception:
+            pass
+        return entry["payload"]
+    if time.time() - stored < _ttl():
+        return entry["payload"]
+    return None
+
+
+def _write(path, trade_date: str, payload):
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    entry = {"stored": time.time(), "trade_date": trade_date, "payload": payload}
+    tmp.write_text(json.dumps(entry, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def gc(now=None) -> int:
+    # Delete entries and lock files not touched within the max age; returns
+    # how many files went. The .gc marker limits this to once an hour.
+    now = time.time() if now is None else now
+    marker = _root() / ".gc"
+    try:
+        if now - marker.stat().st_mtime < GC_INTERVAL_SECONDS:
+            return 0
+    except FileNotFoundError:
+        pass
+    except Exception:
+        return 0
+    try:
+        marker.touch()
+    except Exception:
+        return 0
+    removed = 0
+    cutoff = now - _max_age()
+    for path in _root().iterdir():
+        if path.suffix not in (".json", ".lock", ".tmp"):
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except Exception:
+            continue
+    if removed:
+        trace.count("result_cache.gc_removed", removed)
+    return removed
+
+
+@contextlib.contextmanager
+def _flight(key: str):
+    # Threads of one process share a lock; processes meet on the flock
+    with _locks_guard:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        with open(_root() / f"{key}.lock", "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def single_flight(name: str, args, trade_date: str, produce, ok=None):
+    # produce() -> JSON-serializable payload; only payloads passing ok() (all
+    # of them when ok is None) are stored, so errors are retried next time.
+    if os.environ.get("RESULT_CACHE_DISABLE") == "1":
+        return produce()
+    trade_date = str(trade_date or _today()).replace("-", "")
+    key = cache_key(name, args, trade_date)
+    path = _root() / f"{key}.json"
+    hit = _read(path, trade_date)
+    if hit is not None:
+        trace.count("result_cache.hit")
+        return hit
+    try:
+        _root().mkdir(parents=True, exist_ok=True)
+    except Exception:
+        return produce()
+    with _flight(key):
+        # Whoever held the lock before us may have just stored it
+        hit = _read(path, trade_date)
+        if hit is not None:
+            trace.count("result_cache.shared")
+            return hit
+        trace.count("result_cache.miss")
+        payload = produce()
+        if ok is None or ok(payload):
+            try:
+                _write(path, trade_date, payload)
+                gc()
+            except Exception:
+                pass
+        return payload
@@ -0,0 +1,91 @@
+import importlib.util
+import json
+import os
+import sys
+from pathlib import Path
+
+from marketdata.paths import REPO_ROOT
+
+# Startup helpers shared by the scripts/ma entry points. Keep this module
+# stdlib-only: it is imported before anything else on every run, including
+# the error and cache-hit paths that never need pandas or tushare.
+
+_env_loaded = False
+
+# Exit code of the basis engine scripts when a dependency (pandas, numpy,
+# tushare) cannot be imported. lib/server/basis-engine.ts reads it as "the
+# engine cannot run here"; any other non-zero exit is an upstream failure.
+EXIT_IMPORT_FAILED = 5
+
+
+def env_candidates():
+    # cwd, then scripts/ma, scripts/ and the repo root; each directory once
+    dirs = []
+    try:
+        dirs.append(Path.cwd())
+    except Exception:
+        pass
+    script_dir = Path(__file__).resolve().parent.parent
+    dirs += [script_dir, script_dir.parent, REPO_ROOT]
+    out = []
+    for d in dirs:
+        if d not in out:
+            out.append(d)
+    return out
+
+
+def _parse_env_file(f: Path):
+    for line in f.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, val = line.split("=", 1)
+        key = key.strip()
+        if key and os.environ.get(key) is None:
+            os.environ[key] = val.strip().strip('"').strip("'")
+
+
+def load_env():
+    # .env then .env.local from each candidate directory, once per process.
+    # Variables already in the environment win; MA_DOTENV=0 skips the files.
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+    if os.environ.get("MA_DOTENV") == "0":
+        return
+    for base in env_candidates():
+        for fname in (".env", ".env.local"):
+            f = base / fname
+            try:
+                if f.is_file():
+                    _parse_env_file(f)
+            except Exception:
+                pass
+
+
+def lazy_import(name: str):
+    # Module object whose import runs on first attribute access, so heavy
+    # modules (pandas/numpy users) cost nothing on paths that exit early
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def run_main(main):
+    # main(), with import errors (lazy ones included) reported as
+    # EXIT_IMPORT_FAILED instead of a traceback exiting 1
+    try:
+        main()
+    except ImportError as e:
+        print(json.dumps({"error": f"import failed: {e}"}))
+        sys.exit(EXIT_IMPORT_FAILED)
@@ -0,0 +1,269 @@
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+from marketdata import trace
+from marketdata.paths import data_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets are per process only
+    fcntl = None
+
+# Every pro.* call goes through one Scheduler per process:
+#   - a token bucket per endpoint (fut_daily, index_daily, trade_cal, ...)
+#     holding its per-minute quota. Bucket state lives in data/tushare_rate/
+#     under a file lock, so pool workers and spawned scripts share a quota.
+#   - a small thread pool that runs the highest-priority queued call whose
+#     endpoint has a token (PRIORITY_LATEST before PRIORITY_BACKFILL).
+#   - quota errors are retried with jittered exponential backoff and pause
+#     the endpoint's bucket for every caller, not just the one that hit it.
+# Limits: TUSHARE_RATE_LIMITS="fut_daily=200,index_daily=500,*=200" calls per
+# minute (burst included), TUSHARE_RATE_BURST (at most half the quota), TUSHARE_SCHED_WORKERS,
+# TUSHARE_RETRIES. TUSHARE_SCHEDULER=0 hands out the bare pro_api client.
+
+PRIORITY_LATEST = 0
+PRIORITY_DEFAULT = 5
+PRIORITY_BACKFILL = 10
+
+DEFAULT_PER_MINUTE = 200
+DEFAULT_BURST = 20
+RETRY_BASE_SECONDS = 2.0
+RETRY_CAP_SECONDS = 60.0
+
+# Tushare reports the minute quota as "抱歉，您每分钟最多访问该接口200次"; the
+# daily quota ("每天最多访问") is not worth retrying.
+_QUOTA_ERROR = re.compile(r"每分钟最多访问|访问频率|too many requests|rate limit", re.I)
+
+
+def is_quota_error(exc) -> bool:
+    return bool(_QUOTA_ERROR.search(str(exc)))
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name) or default)
+    except Exception:
+        return default
+
+
+def rate_limits() -> dict:
+    # {endpoint: calls per minute}; "*" is the default for unlisted endpoints
+    limits = {"*": DEFAULT_PER_MINUTE}
+    for part in (os.environ.get("TUSHARE_RATE_LIMITS") or "").split(","):
+        if "=" not in part:
+            continue
+        name, val = part.split("=", 1)
+        try:
+            limits[name.strip()] = max(1, int(val))
+        except Exception:
+            pass
+    return limits
+
+
+class TokenBucket:
+    # At most per_minute takes in any minute: burst tokens up front, the rest
+    # refilled evenly. The burst is capped at half the quota so the refill
+    # keeps at least the other half. Negative tokens mean the endpoint is
+    # paused.
+    def __init__(self, name: str, per_minute: int, burst: int = DEFAULT_BURST, path=None):
+        self.name = name
+        self.capacity = max(1, min(burst, per_minute // 2))
+        self.rate = max(per_minute - self.capacity, 1) / 60.0
+        self.path = path
+        self._lock = threading.Lock()
+        self._tokens = float(self.capacity)
+        self._stamp = time.time()
+
+    def _update(self, fn):
+        # fn(tokens) -> (tokens, result), applied after refilling up to now
+        with self._lock:
+            fh = None
+            if self.path is not None and fcntl is not None:
+                try:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    fh = open(self.path, "a+")
+                    fcntl.flock(fh, fcntl.LOCK_EX)
+                    fh.seek(0)
+                    parts = fh.read().split()
+                    if len(parts) == 2:
+                        self._tokens, self._stamp = float(parts[0]), float(parts[1])
+                except Exception:
+                    if fh is not None:
+                        fh.close()
+                    fh = None
+            try:
+                now = time.time()
+                tokens = min(self.capacity, self._tokens + max(0.0, now - self._stamp) * self.rate)
+                self._tokens, result = fn(tokens)
+                self._stamp = now
+                if fh is not None:
+                    fh.seek(0)
+                    fh.truncate()
+                    fh.write(f"{self._tokens!r} {self._stamp!r}")
+                    fh.flush()
+                return result
+            finally:
+                if fh is not None:
+                    fh.close()
+
+    def try_take(self) -> float:
+        # 0 when a token was taken, else seconds until one is available
+        def take(tokens):
+            if tokens >= 1:
+                return tokens - 1, 0.0
+            return tokens, (1 - tokens) / self.rate
+        return self._update(take)
+
+    def pause(self, seconds: float):
+        self._update(lambda tokens: (min(tokens, 1 - seconds * self.rate), None))
+
+
+class _Job:
+    __slots__ = ("endpoint", "fn", "args", "kwargs", "future", "attempt", "context", "queued")
+
+    def __init__(self, endpoint, fn, args, kwargs):
+        self.endpoint = endpoint
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.attempt = 0
+        # Runs in the submitter's context so trace spans follow the call
+        self.context = contextvars.copy_context()
+        self.queued = time.perf_counter()
+
+
+class Scheduler:
+    def __init__(self, workers: int = None, limits: dict = None, shared: bool = None):
+        self.workers = workers or _env_int("TUSHARE_SCHED_WORKERS", 4)
+        self.limits = limits or rate_limits()
+        self.burst = _env_int("TUSHARE_RATE_BURST", DEFAULT_BURST)
+        self.retries = _env_int("TUSHARE_RETRIES", 5)
+        if shared is None:
+            shared = os.environ.get("TUSHARE_RATE_SHARED") != "0"
+        self.shared = shared
+        self.buckets = {}
+        self.stats = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._cv = threading.Condition()
+        self._threads = []
+
+    def bucket(self, endpoint: str) -> TokenBucket:
+        b = self.buckets.get(endpoint)
+        if b is None:
+            per_minute = self.limits.get(endpoint, self.limits.get("*", DEFAULT_PER_MINUTE))
+            path = data_dir() / "tushare_rate" / endpoint if self.shared else None
+            b = self.buckets[endpoint] = TokenBucket(endpoint, per_minute, self.burst, path)
+        return b
+
+    def _count(self, endpoint: str, key: str):
+        s = self.stats.setdefault(endpoint, {"calls": 0, "retries": 0, "errors": 0})
+        s[key] += 1
+
+    def _start(self):
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._run, name=f"tushare-sched-{len(self._threads)}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, endpoint: str, fn, *args, priority: int = PRIORITY_DEFAULT, **kwargs) -> Future:
+        job = _Job(endpoint, fn, args, kwargs)
+        job.future.set_running_or_notify_cancel()
+        with self._cv:
+            self._start()
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            self._cv.notify()
+        return job.future
+
+    def call(self, endpoint: str, fn, *args, priority: int = PRIORITY_DEFAULT, **kwargs):
+        return self.submit(endpoint, fn, *args, priority=priority, **kwargs).result()
+
+    def _next_job(self):
+        # Highest-priority job whose endpoint has a token; otherwise wait
+        # until the earliest refill or a new submission
+        with self._cv:
+            while True:
+                wait = None
+                empty = set()
+                for item in sorted(self._heap):
+                    endpoint = item[2].endpoint
+                    if endpoint in empty:
+                        continue
+                    need = self.bucket(endpoint).try_take()
+                    if need == 0:
+                        self._heap.remove(item)
+                        heapq.heapify(self._heap)
+                        return item
+                    empty.add(endpoint)
+                    wait = need if wait is None else min(wait, need)
+                self._cv.wait(min(wait, 1.0) if wait is not None else None)
+
+    def _run(self):
+        while True:
+            priority, _, job = self._next_job()
+            self._count(job.endpoint, "calls")
+            trace.count("tushare.queue_wait_ms", int((time.perf_counter() - job.queued) * 1000))
+            try:
+                result = job.context.run(job.fn, *job.args, **job.kwargs)
+            except Exception as e:
+                if is_quota_error(e) and job.attempt < self.retries:
+                    delay = min(RETRY_CAP_SECONDS, RETRY_BASE_SECONDS * (2 ** job.attempt))
+                    delay = delay / 2 + random.uniform(0, delay / 2)
+                    job.attempt += 1
+                    self._count(job.endpoint, "retries")
+                    trace.count("tushare.retries")
+                    self.bucket(job.endpoint).pause(delay)
+                    job.queued = time.perf_counter()
+                    with self._cv:
+                        heapq.heappush(self._heap, (priority, next(self._seq), job))
+                        self._cv.notify()
+                    continue
+                self._count(job.endpoint, "errors")
+                if is_quota_error(e):
+                    sys.stderr.write(f"tushare {job.endpoint}: quota retries exhausted: {e}\n")
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+
+
+class ScheduledPro:
+    # Drop-in for a pro_api client: pro.fut_daily(...) blocks on a
+    # scheduler slot for the fut_daily endpoint at this priority.
+    def __init__(self, pro, scheduler: Scheduler, priority: int = PRIORITY_DEFAULT):
+        self._pro = pro
+        self._scheduler = scheduler
+        self._priority = priority
+
+    def with_priority(self, priority: int):
+        return ScheduledPro(self._pro, self._scheduler, priority)
+
+    def __getattr__(self, name):
+        attr = getattr(self._pro, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            endpoint = args[0] if name == "query" and args else name
+            return self._scheduler.call(endpoint, attr, *args, priority=self._priority, **kwargs)
+        return call
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
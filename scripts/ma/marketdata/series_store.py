@@ -0,0 +1,122 @@
+import json
+import os
+import re
+from datetime import datetime, timedelta
+
+from marketdata.paths import data_dir
+
+
+def _shift(ymd: str, days: int) -> str:
+    return (datetime.strptime(ymd, "%Y%m%d") + timedelta(days=days)).strftime("%Y%m%d")
+
+
+def sealed_through() -> str:
+    # Past trading days never change; today's row may still be revised
+    return _shift(datetime.today().strftime("%Y%m%d"), -1)
+
+
+class SeriesStore:
+    # On-disk daily series keyed by (series key, YYYYMMDD date). Each series
+    # remembers the contiguous window it has fetched: `first` and the sealed
+    # high-water mark `covered_through`. sync() only asks upstream for the
+    # parts of a request that fall outside that window.
+    def __init__(self, name: str, date_field: str = "trade_date"):
+        self.root = data_dir() / "series_store" / name
+        self.date_field = date_field
+
+    def row_date(self, row) -> str:
+        # Rows may carry YYYYMMDD or ISO dates; the store indexes by YYYYMMDD
+        return str(row.get(self.date_field) or "").replace("-", "")
+
+    def _path(self, key: str):
+        safe = re.sub(r"[^A-Za-z0-9._-]", "_", key)
+        return self.root / f"{safe}.json"
+
+    def load(self, key: str) -> dict:
+        try:
+            state = json.loads(self._path(key).read_text(encoding="utf-8"))
+            if isinstance(state, dict) and isinstance(state.get("rows"), dict):
+                return state
+        except Exception:
+            pass
+        return {"key": key, "first": None, "covered_through": None, "rows": {}}
+
+    def save(self, key: str, state: dict):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(state, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def missing(self, state: dict, start: str, end: str):
+        first = state.get("first")
+        covered = state.get("covered_through")
+        if not first or not covered:
+            return [(start, end)]
+        # Gaps always extend to the stored window so coverage stays contiguous
+        gaps = []
+        if start < first:
+            gaps.append((start, _shift(first, -1)))
+        if end > covered:
+            gaps.append((_shift(covered, 1), end))
+        return gaps
+
+    def sync(self, key: str, start: str, end: str, fetch):
+        # fetch(start, end) -> list of row dicts carrying self.date_field
+        state = self.load(key)
+        gaps = self.missing(state, start, end)
+        if gaps:
+            rows = []
+            for s, e in gaps:
+                got = fetch(s, e) or []
+                self._merge(state, got)
+                rows += got
+            self._advance(state, start, end, rows)
+            self.save(key, state)
+        return self.slice(state, start, end)
+
+    def sync_many(self, keys, start: str, end: str, fetch_many):
+        # One upstream request for every key that is missing data:
+        # fetch_many(keys, start, end) -> {key: rows}. The window is the
+        # union of the per-key gaps, so keys kept in step cost one call.
+        states = {key: self.load(key) for key in keys}
+        gaps = {key: self.missing(states[key], start, end) for key in keys}
+        stale = [key for key in keys if gaps[key]]
+        if stale:
+            ws = min(g[0] for key in stale for g in gaps[key])
+            we = max(g[1] for key in stale for g in gaps[key])
+            fetched = fetch_many(stale, ws, we) or {}
+            for key in stale:
+                self._merge(states[key], fetched.get(key))
+                self._advance(states[key], start, end, fetched.get(key))
+                self.save(key, states[key])
+        return {key: self.slice(states[key], start, end) for key in keys}
+
+    def _merge(self, state: dict, rows):
+        dest = state["rows"]
+        for row in rows or []:
+            d = self.row_date(row)
+            if d:
+                dest[d] = row
+
+    def _advance(self, state: dict, start: str, end: str, rows):
+        # Move the high-water mark only over sealed days upstream actually
+        # answered: an empty or unparseable reply leaves the gap open, so it
+        # is asked for again next time. A leading gap is closed regardless,
+        # since the stored rows after it show the series had started.
+        dates = [d for d in (self.row_date(r) for r in rows or []) if d]
+        first = state.get("first")
+        covered = state.get("covered_through")
+        hwm = min(end, sealed_through())
+        if first and covered:
+            state["first"] = min(first, start)
+            tail = [d for d in dates if d > covered]
+            if tail:
+                state["covered_through"] = max(covered, min(hwm, max(tail)))
+        elif dates and hwm >= start:
+            state["first"] = start
+            state["covered_through"] = min(hwm, max(dates))
+
+    def slice(self, state: dict, start: str, end: str):
+        rows = state.get("rows") or {}
+        return [rows[d] for d in sorted(rows) if start <= d <= end]
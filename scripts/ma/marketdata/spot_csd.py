@@ -0,0 +1,131 @@
+import os
+from types import SimpleNamespace
+
+from marketdata.series_store import SeriesStore
+
+# Daily CLOSE of the four CFFEX underlyings from EmQuant csd, shared by
+# get_spot_indices_timeseries.py and the basis engine. One multi-code csd
+# per gap; days already sealed in data/series_store/spot_csd/ are not
+# requested again (SPOT_STORE_DISABLE=1 fetches the whole window).
+
+
+def normalize_csd(data_obj):
+    result = []
+    try:
+        from datetime import datetime as dt
+        dates = getattr(data_obj, "Dates", None) or getattr(data_obj, "Times", None)
+        DD = getattr(data_obj, "Data", None) or getattr(data_obj, "Values", None)
+        values = None
+        if DD is not None:
+            if isinstance(DD, dict):
+                values = DD.get("CLOSE")
+                if values is None and len(DD) > 0:
+                    try:
+                        values = next(iter(DD.values()))
+                    except Exception:
+                        values = None
+            elif isinstance(DD, (list, tuple)):
+                values = DD[0] if len(DD) > 0 else []
+            else:
+                values = DD
+        if dates and values:
+            try:
+                dates = list(dates)
+            except Exception:
+                pass
+            try:
+                values = list(values)
+            except Exception:
+                pass
+            try:
+                if isinstance(values, (list, tuple)) and len(values) == 1:
+                    inner = values[0]
+                    try:
+                        values = list(inner)
+                    except Exception:
+                        values = inner
+                elif isinstance(values, (list, tuple)) and values and isinstance(values[0], (list, tuple)):
+                    values = values[0]
+            except Exception:
+                pass
+            if len(dates) == len(values):
+                for d, v in zip(dates, values):
+                    ds = d if isinstance(d, str) else getattr(d, "strftime", lambda *_: str(d))("%Y-%m-%d")
+                    try:
+                        if isinstance(ds, str) and "/" in ds:
+                            ds_dt = dt.strptime(ds, "%Y/%m/%d")
+                            ds = ds_dt.strftime("%Y-%m-%d")
+                    except Exception:
+                        pass
+                    try:
+                        fv = float(v)
+                    except Exception:
+                        fv = None
+                    if fv is not None:
+                        result.append({"date": ds, "close": fv})
+    except Exception:
+        pass
+    return result
+
+
+def normalize_csd_multi(data_obj, codes):
+    # Multi-code csd returns Data keyed by code over shared Dates; split it
+    # into one single-code view per code and reuse normalize_csd.
+    out = {}
+    dates = getattr(data_obj, "Dates", None) or getattr(data_obj, "Times", None)
+    DD = getattr(data_obj, "Data", None) or getattr(data_obj, "Values", None)
+    for code in codes:
+        series = DD.get(code) if isinstance(DD, dict) else None
+        view = SimpleNamespace(Dates=dates, Data={code: series} if series is not None else None)
+        out[code] = normalize_csd(view)
+    return out
+
+
+class CsdError(Exception):
+    pass
+
+
+def _iso(ymd: str) -> str:
+    return f"{ymd[0:4]}-{ymd[4:6]}-{ymd[6:8]}"
+
+
+def spot_series(c, start_date: str, end_date: str):
+    # {alias: [{date, close}]} for the four CFFEX underlyings; every alias
+    # carries {"error": ...} when the csd call is rejected.
+    codes = {
+        "IH": "000016.SH",  # 上证50
+        "IF": "000300.SH",  # 沪深300
+        "IC": "000905.SH",  # 中证500
+        "IM": "000852.SH",  # 中证1000
+    }
+
+    def fetch_many(code_list, s, e):
+        # One csd call for every index that needs data in [s, e]
+        data = c.csd(
+            ",".join(code_list),
+            "CLOSE",
+            _iso(s),
+            _iso(e),
+            "period=1,adjustflag=1,curtype=1,order=1,market=CNSESH",
+        )
+        if getattr(data, "ErrorCode", 0) != 0:
+            raise CsdError(f"csd error: {getattr(data, 'ErrorCode', 'unknown')}")
+        return normalize_csd_multi(data, code_list)
+
+    out = {}
+    start_ymd = start_date.replace("-", "")
+    end_ymd = end_date.replace("-", "")
+    code_list = list(codes.values())
+    try:
+        if os.environ.get("SPOT_STORE_DISABLE") == "1":
+            series_by_code = fetch_many(code_list, start_ymd, end_ymd)
+        else:
+            # Only days after the last stored (sealed) day are requested
+            store = SeriesStore("spot_csd", date_field="date")
+            series_by_code = store.sync_many(code_list, start_ymd, end_ymd, fetch_many)
+        for key, code in codes.items():
+            out[key] = series_by_code.get(code) or []
+    except CsdError as e:
+        for key in codes:
+            out[key] = {"error": str(e)}
+    return out
@@ -0,0 +1,196 @@
+import atexit
+import contextvars
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Structured tracing for the fetch scripts. Off unless MA_TRACE is set:
+#   MA_TRACE=stderr (or 1)  JSON lines to stderr
+#   MA_TRACE=<path>         JSON lines appended to that file
+# stdout is never touched, so the routes' JSON contract is unchanged.
+# Records:
+#   {"type": "call"}     one per pro.* / c.* call: client, api, params, ms,
+#                        rows, outcome (ok / empty / error), error, span
+#   {"type": "span"}     named stages (span("latest_data_date") ...) with ms
+#   {"type": "summary"}  at exit: calls/errors/rows/ms per api, counters
+#                        (retries, walk-back steps, fallbacks taken) and
+#                        span totals for the run
+# Upstream exceptions are recorded before they propagate, so failures the
+# scripts swallow with `except Exception: pass` still show up here.
+
+PARAM_MAX = 200
+# c.start("UserName=..,PassWord=..") must not end up in a trace file
+_SECRET = re.compile(r"((?:pass\w*|token)=)[^,;]*", re.I)
+
+_lock = threading.Lock()
+_span = contextvars.ContextVar("ma_trace_span", default=None)
+_sink = None
+_started = time.time()
+_calls = {}
+_counters = {}
+_spans = {}
+
+
+def _target():
+    return (os.environ.get("MA_TRACE") or "").strip()
+
+
+def enabled() -> bool:
+    return bool(_target()) and _target() != "0"
+
+
+def _emit(rec: dict):
+    global _sink
+    line = json.dumps(rec, ensure_ascii=False, default=str) + "\n"
+    with _lock:
+        try:
+            if _sink is None:
+                target = _target()
+                if target in ("1", "stderr"):
+                    _sink = sys.stderr
+                else:
+                    _sink = open(target, "a", encoding="utf-8")
+            _sink.write(line)
+            _sink.flush()
+        except Exception:
+            pass
+
+
+def _param(v):
+    s = v if isinstance(v, (int, float, bool)) or v is None else _SECRET.sub(r"\1***", str(v))
+    if isinstance(s, str) and len(s) > PARAM_MAX:
+        s = s[:PARAM_MAX] + f"...({len(s)} chars)"
+    return s
+
+
+def _rows(result):
+    # (rows, error message) for a DataFrame or an EmQuant result object;
+    # rows is None for acks without data (c.start, c.stop, csq)
+    if result is None:
+        return 0, None
+    code = getattr(result, "ErrorCode", None)
+    if code is not None:
+        if code != 0:
+            return 0, f"ErrorCode {code}: {getattr(result, 'ErrorMsg', '')}"
+        codes = getattr(result, "Codes", None) or []
+        dates = getattr(result, "Dates", None) or []
+        if codes:
+            return len(codes) * max(1, len(dates)), None
+        data = getattr(result, "Data", None)
+        return (len(data) if data else None), None
+    try:
+        return len(result), None
+    except Exception:
+        return 1, None
+
+
+def count(name: str, n: int = 1):
+    # Summary counter, e.g. count("fut_daily.walk_back")
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+@contextmanager
+def span(name: str, **attrs):
+    if not enabled():
+        yield
+        return
+    parent = _span.get()
+    path = f"{parent}/{name}" if parent else name
+    token = _span.set(path)
+    t0 = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        _span.reset(token)
+        with _lock:
+            s = _spans.setdefault(path, {"count": 0, "ms": 0.0})
+            s["count"] += 1
+            s["ms"] += ms
+        _emit({"type": "span", "span": path, "ms": round(ms, 2), "outcome": outcome, **{k: _param(v) for k, v in attrs.items()}})
+
+
+def _record(client: str, api: str, args, kwargs, t0: float, result=None, exc=None):
+    ms = (time.perf_counter() - t0) * 1000
+    if exc is not None:
+        rows, error, outcome = 0, f"{type(exc).__name__}: {exc}", "error"
+    else:
+        rows, error = _rows(result)
+        outcome = "error" if error else ("empty" if rows == 0 else "ok")
+    key = f"{client} {api}"
+    with _lock:
+        s = _calls.setdefault(key, {"calls": 0, "errors": 0, "empty": 0, "rows": 0, "ms": 0.0})
+        s["calls"] += 1
+        s["errors"] += outcome == "error"
+        s["empty"] += outcome == "empty"
+        s["rows"] += rows or 0
+        s["ms"] += ms
+    rec = {"type": "call", "client": client, "api": api, "ms": round(ms, 2), "rows": rows, "outcome": outcome, "span": _span.get()}
+    if args:
+        rec["args"] = [_param(a) for a in args]
+    if kwargs:
+        rec["params"] = {k: _param(v) for k, v in kwargs.items()}
+    if error:
+        rec["error"] = error[:PARAM_MAX]
+    _emit(rec)
+
+
+class Traced:
+    # Wraps a pro_api client or EmQuant `c`; every public method call is
+    # timed and recorded. csq callbacks are not traced, only the subscribe.
+    def __init__(self, client, kind: str):
+        self._client = client
+        self._kind = kind
+
+    def __getattr__(self, api):
+        attr = getattr(self._client, api)
+        if api.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                _record(self._kind, api, args, kwargs, t0, exc=e)
+                raise
+            _record(self._kind, api, args, kwargs, t0, result=result)
+            return result
+        return call
+
+
+def traced(client, kind: str):
+    if client is None or not enabled() or isinstance(client, Traced):
+        return client
+    return Traced(client, kind)
+
+
+def summary() -> dict:
+    with _lock:
+        return {
+            "type": "summary",
+            "script": os.path.basename(sys.argv[0] or "") or None,
+            "pid": os.getpid(),
+            "wall_ms": round((time.time() - _started) * 1000, 1),
+            "calls": {k: dict(v, ms=round(v["ms"], 2)) for k, v in sorted(_calls.items())},
+            "total_calls": sum(v["calls"] for v in _calls.values()),
+            "counters": dict(sorted(_counters.items())),
+            "spans": {k: {"count": v["count"], "ms": round(v["ms"], 2)} for k, v in sorted(_spans.items())},
+        }
+
+
+def _summary():
+    _emit(summary())
+
+
+if enabled():
+    atexit.register(_summary)
@@ -0,0 +1,132 @@
+import bisect
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from marketdata.paths import data_dir
+
+# Years that may still get holiday amendments are refreshed after this age
+REFRESH_SECONDS = 30 * 24 * 3600
+
+
+def _ymd(d: datetime) -> str:
+    return d.strftime("%Y%m%d")
+
+
+def _shift(ymd: str, days: int) -> str:
+    return _ymd(datetime.strptime(ymd, "%Y%m%d") + timedelta(days=days))
+
+
+class TradeCalendar:
+    # Sorted open days for one exchange, persisted under data/trade_calendar/.
+    # Each year is fetched from pro.trade_cal once; lookups are bisect/set based.
+    def __init__(self, exchange: str = "SSE"):
+        self.exchange = exchange
+        self.path = data_dir() / "trade_calendar" / f"{exchange}.json"
+        self.years = {}
+        self.open_days = []
+        self._open_set = set()
+        self._load()
+
+    def _load(self):
+        try:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+            self.years = {str(k): v for k, v in (state.get("years") or {}).items()}
+            self._index(state.get("open_days") or [])
+        except Exception:
+            pass
+
+    def _index(self, days):
+        self.open_days = sorted(set(str(d) for d in days))
+        self._open_set = set(self.open_days)
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        payload = {"exchange": self.exchange, "years": self.years, "open_days": self.open_days}
+        tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _stale(self, year: int) -> bool:
+        fetched_at = self.years.get(str(year))
+        if fetched_at is None:
+            return True
+        # A year fetched after it ended is final; otherwise holidays may still change
+        if datetime.fromtimestamp(fetched_at).year > year:
+            return False
+        return time.time() - fetched_at > REFRESH_SECONDS
+
+    def ensure(self, pro, first_year: int, last_year: int) -> bool:
+        stale = [y for y in range(first_year, last_year + 1) if self._stale(y)]
+        if not stale:
+            return True
+        try:
+            cal = pro.trade_cal(
+                exchange=self.exchange,
+                start_date=f"{min(stale)}0101",
+                end_date=f"{max(stale)}1231",
+                fields="cal_date,is_open",
+            )
+        except Exception:
+            return False
+        if cal is None or cal.empty:
+            return False
+        import pandas as pd
+
+        is_open = pd.to_numeric(cal["is_open"], errors="coerce") == 1
+        fetched = set(cal.loc[is_open, "cal_date"].astype(str))
+        keep = [d for d in self.open_days if not (min(stale) <= int(d[:4]) <= max(stale))]
+        self._index(keep + list(fetched))
+        now = time.time()
+        for y in range(min(stale), max(stale) + 1):
+            self.years[str(y)] = now
+        try:
+            self._save()
+        except Exception:
+            pass
+        return True
+
+    def covers(self, start: str, end: str) -> bool:
+        return all(str(y) in self.years for y in range(int(start[:4]), int(end[:4]) + 1))
+
+    def is_open(self, ymd: str) -> bool:
+        return ymd in self._open_set
+
+    def latest_open_on_or_before(self, ymd: str):
+        i = bisect.bisect_right(self.open_days, ymd)
+        return self.open_days[i - 1] if i > 0 else None
+
+    def previous_open(self, ymd: str):
+        i = bisect.bisect_left(self.open_days, ymd)
+        return self.open_days[i - 1] if i > 0 else None
+
+    def open_days_between(self, start: str, end: str):
+        lo = bisect.bisect_left(self.open_days, start)
+        hi = bisect.bisect_right(self.open_days, end)
+        return self.open_days[lo:hi]
+
+
+_calendars = {}
+
+
+def get_calendar(pro, exchange: str = "SSE", years_back: int = 1):
+    # Returns None if the calendar cannot be loaded; callers then keep their
+    # day-by-day probing as a fallback.
+    cal = _calendars.get(exchange)
+    if cal is None:
+        cal = TradeCalendar(exchange)
+        _calendars[exchange] = cal
+    this_year = datetime.today().year
+    if not cal.ensure(pro, this_year - years_back, this_year):
+        return None
+    return cal
+
+
+def walk_back_days(cal, ymd: str, lookback: int):
+    # Candidate dates in [ymd - lookback + 1, ymd], newest first. With a
+    # calendar only open days are returned, so holidays cost no requests.
+    start = _shift(ymd, -(lookback - 1))
+    if cal is None or not cal.covers(start, ymd):
+        return [_shift(ymd, -i) for i in range(0, lookback)]
+    return list(reversed(cal.open_days_between(start, ymd)))
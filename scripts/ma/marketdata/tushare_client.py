@@ -0,0 +1,21 @@
+import os
+
+from marketdata.clients import tushare_api
+from marketdata.scheduler import PRIORITY_DEFAULT, ScheduledPro, get_scheduler
+
+# One pro_api client per token for the life of the process. Scripts used to
+# build a new client for every ts_code; the worker pool keeps this warm.
+# Calls are routed through the rate-limited scheduler; the priority decides
+# who goes first when an endpoint's quota is the bottleneck.
+_clients = {}
+
+
+def get_pro(token=None, priority: int = PRIORITY_DEFAULT):
+    token = token or os.environ.get("TUSHARE_TOKEN")
+    pro = _clients.get(token)
+    if pro is None:
+        pro = tushare_api(token)
+        _clients[token] = pro
+    if os.environ.get("TUSHARE_SCHEDULER") == "0":
+        return pro
+    return ScheduledPro(pro, get_scheduler(), priority)
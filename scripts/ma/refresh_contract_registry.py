@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from marketdata.contract_registry import get_registry
+from marketdata.runtime import load_env
+from marketdata.tushare_client import get_pro
+
+# Refreshes data/contract_registry.json from Tushare's fut_basic listing (one
+# call per exchange). Without --force a registry younger than
+# CONTRACT_REGISTRY_MAX_AGE_HOURS is kept as is.
+#   python scripts/ma/refresh_contract_registry.py [--force] [--status]
+
+# Ensure UTF-8 stdout on Windows
+try:
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+except Exception:
+    pass
+
+
+def summary(registry):
+    listed = [p for p, meta in registry.products.items() if meta.get("listed")]
+    sectors = {}
+    for p in listed:
+        sector = registry.products[p].get("sector")
+        sectors[sector] = sectors.get(sector, 0) + 1
+    return {
+        "fetched_at": datetime.fromtimestamp(registry.fetched_at).isoformat(timespec="seconds") if registry.fetched_at else None,
+        "products": len(registry.products),
+        "listed": len(listed),
+        "sectors": sectors,
+        "unclassified": sorted(p for p in listed if registry.products[p].get("sector") == "其他"),
+    }
+
+
+def main():
+    load_env()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--force", action="store_true", help="refresh even when the registry is fresh")
+    ap.add_argument("--status", action="store_true", help="only report what is stored")
+    args = ap.parse_args()
+
+    registry = get_registry()
+    if args.status:
+        print(json.dumps(dict(summary(registry), stale=registry.stale()), ensure_ascii=False))
+        return
+
+    token = os.environ.get("TUSHARE_TOKEN")
+    if not token:
+        print(json.dumps({"error": "Missing TUSHARE_TOKEN in environment"}))
+        sys.exit(2)
+    try:
+        pro = get_pro(token)
+    except Exception as e:
+        print(json.dumps({"error": f"Tushare import/init failed: {e}"}))
+        sys.exit(1)
+
+    if not registry.refresh(pro, force=args.force):
+        print(json.dumps({"error": "fut_basic failed for every exchange"}))
+        sys.exit(4)
+    print(json.dumps(dict(summary(registry), ok=True), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
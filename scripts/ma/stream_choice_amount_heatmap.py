@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from marketdata.choice_amount import (
+    build_payload,
+    fetch_amounts,
+    heatmap_codes,
+    normalize_items,
+    write_payload,
+)
+from marketdata.clients import emquant_client
+from marketdata.contract_registry import categorize
+from marketdata.emq import connect_broker
+from marketdata.quotes import EmqQuoteSource, ReplayQuoteSource, TickRecorder
+from marketdata.runtime import load_env
+
+# Intraday treemap: subscribe to real-time quotes for the heatmap codes, keep amount and
+# return per contract in memory and print only the nodes that changed as
+# NDJSON deltas on stdout, at most --max-rate lines per second. The full
+# payload is rewritten to data/commodity_amount_heatmap.json every
+# --snapshot-seconds, so the end-of-day reader keeps working unchanged.
+# A replay never touches that file: its snapshots are only written to --out.
+#   python scripts/ma/stream_choice_amount_heatmap.py [trade_date]
+#   python scripts/ma/stream_choice_amount_heatmap.py --replay ticks.jsonl --speed 10 [--out replay.json]
+
+
+class HeatmapState:
+    def __init__(self, codes):
+        self.lock = threading.Lock()
+        self.nodes = {}
+        for code in codes:
+            self.nodes[code] = {'code': code, 'name': None, 'return_pct': None, 'amount': None, 'sector': categorize(code)}
+        self.dirty = set()
+        self.changed_since_snapshot = False
+
+    def seed(self, items):
+        with self.lock:
+            for it in items or []:
+                node = self.nodes.get(it.get('code'))
+                if node is None:
+                    continue
+                for key in ('name', 'return_pct', 'amount'):
+                    if it.get(key) is not None:
+                        node[key] = it[key]
+
+    def apply(self, tick):
+        code = tick.get('code')
+        with self.lock:
+            node = self.nodes.get(code)
+            if node is None:
+                return
+            changed = False
+            for key, field in (('amount', 'amount'), ('ret', 'return_pct'), ('name', 'name')):
+                v = tick.get(key)
+                if v is not None and node[field] != v:
+                    node[field] = v
+                    changed = True
+            if changed:
+                self.dirty.add(code)
+                self.changed_since_snapshot = True
+
+    def take_delta(self):
+        with self.lock:
+            codes, self.dirty = self.dirty, set()
+            nodes = []
+            for code in sorted(codes):
+                node = self.nodes[code]
+                nodes.append({
+                    'code': code,
+                    'sector': node['sector'],
+                    'name': node['name'] or code,
+                    'value': node['amount'] if isinstance(node['amount'], (int, float)) else 0.0,
+                    'ret': node['return_pct'],
+                })
+            return nodes
+
+    def items(self):
+        with self.lock:
+            return [dict(node) for node in self.nodes.values()]
+
+
+def emit(msg):
+    sys.stdout.write(json.dumps(msg, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def _login():
+    # Prefer the long-lived session broker; log in directly only without one
+    c = connect_broker()
+    if c is None:
+        try:
+            c = emquant_client()
+        except Exception as e:
+            print(json.dumps({"error": f"EmQuantAPI import failed: {e}"}))
+            sys.exit(1)
+
+        username = os.environ.get("EMQ_USERNAME")
+        password = os.environ.get("EMQ_PASSWORD")
+        if not username or not password:
+            print(json.dumps({"error": "Missing EMQ_USERNAME/EMQ_PASSWORD"}))
+            sys.exit(2)
+
+        options = f"UserName={username},PassWord={password},TestLatency=1,ForceLogin=1"
+        login = c.start(options, None, None)
+        if login.ErrorCode != 0:
+            print(json.dumps({"error": f"login failed: {getattr(login,'ErrorMsg','unknown')}"}))
+            sys.exit(3)
+    return c
+
+
+def parse_args():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("trade_date", nargs="?", default=None)
+    ap.add_argument("--replay", help="replay recorded ticks instead of subscribing")
+    ap.add_argument("--speed", type=float, default=1.0, help="replay speed-up, 0 = no delays")
+    ap.add_argument("--record", help="also write live ticks to this JSON-lines file")
+    ap.add_argument("--max-rate", type=float, default=float(os.environ.get("CHOICE_STREAM_MAX_RATE") or 2))
+    ap.add_argument("--snapshot-seconds", type=float, default=float(os.environ.get("CHOICE_STREAM_SNAPSHOT_SECONDS") or 60))
+    ap.add_argument("--out", help="write snapshots here instead of data/commodity_amount_heatmap.json")
+    ap.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    return ap.parse_args()
+
+
+def main():
+    load_env()
+    args = parse_args()
+    trade_date = os.environ.get("CHOICE_TRADE_DATE") or args.trade_date or datetime.today().strftime("%Y-%m-%d")
+    all_codes = heatmap_codes()
+    codes = all_codes.split(",")
+    state = HeatmapState(codes)
+
+    c = None
+    recorder = None
+    if args.replay:
+        source = ReplayQuoteSource(args.replay, speed=args.speed)
+    else:
+        c = _login()
+        # Start from the current snapshot so the first frame has every node
+        data, items = fetch_amounts(c, all_codes, f"TradeDate={trade_date}", normalize_items)
+        if items is None:
+            print(json.dumps({"error": f"css error: {getattr(data,'ErrorCode','unknown')}"}))
+            sys.exit(4)
+        state.seed(items)
+        source = EmqQuoteSource(c, all_codes)
+
+    on_tick = state.apply
+    if args.record:
+        recorder = TickRecorder(args.record)
+        on_tick = recorder.wrap(on_tick)
+
+    emit({'type': 'snapshot', **build_payload(trade_date, state.items())})
+    try:
+        source.start(on_tick)
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(4)
+
+    interval = 1.0 / args.max_rate if args.max_rate > 0 else 0.5
+    started = time.monotonic()
+    last_snapshot = started
+    seq = 0
+
+    def flush():
+        nonlocal seq
+        nodes = state.take_delta()
+        if nodes:
+            seq += 1
+            emit({'type': 'delta', 'seq': seq, 'ts': datetime.now().strftime("%H:%M:%S"), 'nodes': nodes})
+
+    # Replayed ticks must not replace the live cache for the trade date
+    write_snapshots = not args.replay or args.out
+
+    def snapshot():
+        if state.changed_since_snapshot and write_snapshots:
+            state.changed_since_snapshot = False
+            write_payload(build_payload(trade_date, state.items()), args.out)
+
+    try:
+        while True:
+            # One wait per frame caps output at max-rate regardless of tick volume
+            finished = source.done.wait(interval)
+            flush()
+            now = time.monotonic()
+            if now - last_snapshot >= args.snapshot_seconds:
+                snapshot()
+                last_snapshot = now
+            if finished or (args.duration is not None and now - started >= args.duration):
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        source.stop()
+        flush()
+        snapshot()
+        if recorder is not None:
+            recorder.close()
+        if c is not None:
+            try:
+                c.stop()
+            except Exception:
+                pass
+        emit({'type': 'end', 'frames': seq})
+
+
+if __name__ == '__main__':
+    main()
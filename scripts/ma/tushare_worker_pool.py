@@ -0,0 +1,137 @@
+import contextlib
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import socketserver
+import sys
+import traceback
+
+from marketdata.runtime import load_env
+from marketdata.tushare_client import get_pro
+
+# Entry points the pool may run; each is imported once per worker and its
+# main() is invoked with the job's argv, exactly as `python <script> ...`.
+POOLED_SCRIPTS = (
+    "get_cffex_index_futures_range",
+    "get_cffex_index_futures_near_range",
+    "get_cffex_index_futures_continuous_range",
+    "get_cffex_index_futures_latest",
+    "get_spot_indices_close_tushare",
+)
+DEFAULT_POOL_HOST = "127.0.0.1"
+DEFAULT_POOL_PORT = 9732
+# Seconds a job may run before the client is told it timed out; below the
+# 120 s the routes wait on the socket
+DEFAULT_JOB_TIMEOUT = 110
+
+
+def _preload():
+    for name in POOLED_SCRIPTS:
+        importlib.import_module(name)
+    # The entry points import these lazily; load them here so forks share them
+    for name in ("marketdata.contract_select", "marketdata.basis"):
+        try:
+            vars(importlib.import_module(name))
+        except Exception:
+            pass
+    try:
+        import pandas  # noqa: F401
+        import tushare  # noqa: F401
+    except Exception:
+        pass
+
+
+def _init_worker():
+    load_env()
+    _preload()
+    try:
+        if os.environ.get("TUSHARE_TOKEN"):
+            get_pro()
+    except Exception:
+        pass
+
+
+def run_job(script, args, env):
+    if script not in POOLED_SCRIPTS:
+        return {"code": 2, "stdout": json.dumps({"error": f"script not pooled: {script}"}), "stderr": ""}
+    mod = importlib.import_module(script)
+    saved_env = {k: os.environ.get(k) for k in env}
+    saved_argv = sys.argv
+    out = io.StringIO()
+    err = io.StringIO()
+    code = 0
+    try:
+        os.environ.update({k: str(v) for k, v in env.items()})
+        sys.argv = [f"{script}.py"] + [str(a) for a in args]
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                mod.main()
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    finally:
+        sys.argv = saved_argv
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return {"code": code, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+
+class PoolHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            req = json.loads(line.decode("utf-8"))
+            script = (req.get("script") or "").replace(".py", "")
+            args = req.get("args") or []
+            env = req.get("env") or {}
+            job = self.server.pool.apply_async(run_job, (script, args, env))
+            out = job.get(timeout=self.server.job_timeout)
+        except multiprocessing.TimeoutError:
+            # The worker keeps running the job; the caller must not start a
+            # second copy of it, so say so instead of looking unavailable
+            timeout = self.server.job_timeout
+            out = {"code": 124, "timeout": True, "stdout": json.dumps({"error": f"pool job timed out after {timeout:g}s"}), "stderr": ""}
+        except Exception as e:
+            out = {"code": 1, "stdout": "", "stderr": f"pool error: {e}"}
+        self.wfile.write((json.dumps(out, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+class PoolServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main():
+    load_env()
+    host = os.environ.get("TUSHARE_POOL_HOST") or DEFAULT_POOL_HOST
+    port = int(os.environ.get("TUSHARE_POOL_PORT") or DEFAULT_POOL_PORT)
+    workers = int(os.environ.get("TUSHARE_POOL_WORKERS") or 4)
+    job_timeout = float(os.environ.get("TUSHARE_POOL_JOB_TIMEOUT") or DEFAULT_JOB_TIMEOUT)
+
+    # Import in the parent so forked workers start with pandas/tushare loaded
+    _preload()
+    pool = multiprocessing.Pool(processes=workers, initializer=_init_worker)
+    server = PoolServer((host, port), PoolHandler)
+    server.pool = pool
+    server.job_timeout = job_timeout
+    print(json.dumps({"ok": True, "host": host, "port": port, "workers": workers}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.terminate()
+
+
+if __name__ == "__main__":
+    main()